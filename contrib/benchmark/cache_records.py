@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# This file is related to Radicale - CalDAV and CardDAV server
+#  benchmark for loading entries of the 'item' cache
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compare the load time per entry of the 'item' cache stored as binary
+record and in pickle format of Radicale < 3.6.1:
+
+    python3 cache_records.py --entries=1000
+
+Entries are loaded from files (including open and read) and from memory.
+
+"""
+
+import argparse
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from typing import Callable, List
+
+from radicale.storage.multifilesystem import records
+
+EVENT = """\
+BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//Radicale//NONSGML Benchmark//EN
+BEGIN:VEVENT
+UID:event-%(i)d
+DTSTAMP:20260101T000000Z
+DTSTART:20260101T100000Z
+DTEND:20260101T103000Z
+SUMMARY:Benchmark event %(i)d
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def entry(i: int) -> tuple:
+    # cache hash, uid, etag, text, name, tag, start, end
+    return ("%064x" % i, "event-%d" % i, "\"%032x\"" % i, EVENT % {"i": i},
+            "VEVENT", "VCALENDAR", 1767261600, 1767263400)
+
+
+def measure(name: str, entries: int, load: Callable[[int], object]) -> None:
+    start = time.perf_counter()
+    for i in range(entries):
+        load(i)
+    duration = time.perf_counter() - start
+    print("%-24s %8.2f µs/entry" % (name, duration / entries * 1e6))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--folder", help="parent folder for the files")
+    parser.add_argument("--entries", type=int, default=1000)
+    args = parser.parse_args()
+    folder = tempfile.mkdtemp(dir=args.folder)
+    try:
+        pickled: List[bytes] = []
+        recorded: List[bytes] = []
+        for i in range(args.entries):
+            pickled.append(pickle.dumps(entry(i)))
+            recorded.append(records.dumps(records.ITEM, entry(i)))
+            for suffix, data in (("pickle", pickled[-1]),
+                                 ("record", recorded[-1])):
+                with open(os.path.join(folder, "%d.%s" % (i, suffix)),
+                          "wb") as f:
+                    f.write(data)
+        print("average size: pickle %d bytes, record %d bytes" % (
+            sum(map(len, pickled)) // args.entries,
+            sum(map(len, recorded)) // args.entries))
+
+        def load_file(suffix: str, loads: Callable[[bytes], object]
+                      ) -> Callable[[int], object]:
+            def load(i: int) -> object:
+                with open(os.path.join(folder, "%d.%s" % (i, suffix)),
+                          "rb") as f:
+                    return loads(f.read())
+            return load
+
+        def load_record(data: bytes) -> object:
+            return records.loads(data, records.ITEM, b"ssssssii")
+
+        measure("pickle (memory)", args.entries,
+                lambda i: pickle.loads(pickled[i]))
+        measure("record (memory)", args.entries,
+                lambda i: load_record(recorded[i]))
+        measure("pickle (file)", args.entries,
+                load_file("pickle", pickle.loads))
+        measure("record (file)", args.entries,
+                load_file("record", load_record))
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# This file is related to Radicale - CalDAV and CardDAV server
+#  benchmark for PUT throughput of the storage
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the PUT throughput of concurrent clients with the given storage
+options, e.g. with and without group commit:
+
+    python3 put_throughput.py --storage-group_commit=False
+    python3 put_throughput.py --storage-group_commit=True
+
+The storage folder should be located on the file system of interest
+(option --folder), all data is synced to disk.
+
+"""
+
+import argparse
+import base64
+import io
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import wsgiref.util
+from typing import Any, Dict
+
+from radicale import Application, config
+
+EVENT = """\
+BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//Radicale//NONSGML Benchmark//EN
+BEGIN:VEVENT
+UID:%(uid)s
+DTSTAMP:20260101T000000Z
+DTSTART:20260101T%(hour)02d0000Z
+DTEND:20260101T%(hour)02d3000Z
+SUMMARY:Benchmark event %(uid)s
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def request(application: Application, method: str, path: str,
+            data: str = "") -> int:
+    environ: Dict[str, Any] = {
+        "REQUEST_METHOD": method, "PATH_INFO": path,
+        "HTTP_AUTHORIZATION": "Basic " + base64.b64encode(
+            b"benchmark:").decode()}
+    if data:
+        data_bytes = data.encode()
+        environ["wsgi.input"] = io.BytesIO(data_bytes)
+        environ["CONTENT_LENGTH"] = str(len(data_bytes))
+    environ["wsgi.errors"] = sys.stderr
+    wsgiref.util.setup_testing_defaults(environ)
+    status = 0
+
+    def start_response(status_: str, headers: list) -> None:
+        nonlocal status
+        status = int(status_.split()[0])
+    for _ in application(environ, start_response):
+        pass
+    return status
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--folder", help="parent folder for the storage")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=50,
+                        help="number of PUT requests per client")
+    parser.add_argument("--storage-type", default="multifilesystem")
+    args, options = parser.parse_known_args()
+    folder = tempfile.mkdtemp(dir=args.folder)
+    try:
+        configuration = config.load()
+        storage_options = {"type": args.storage_type,
+                           "filesystem_folder": folder,
+                           "_filesystem_fsync": "True"}
+        for option in options:
+            key, _, value = option[len("--storage-"):].partition("=")
+            storage_options[key] = value
+        configuration.update({"auth": {"type": "none"},
+                              "storage": storage_options}, "benchmark",
+                             privileged=True)
+        application = Application(configuration)
+        for i in range(args.clients):
+            assert request(application, "MKCALENDAR",
+                           "/benchmark/calendar%d.ics/" % i) == 201
+        errors = []
+
+        def client(i: int) -> None:
+            for j in range(args.requests):
+                uid = "event-%d-%d" % (i, j)
+                path = "/benchmark/calendar%d.ics/%s.ics" % (i, uid)
+                status = request(application, "PUT", path,
+                                 EVENT % {"uid": uid, "hour": j % 24})
+                if status != 201:
+                    errors.append(status)
+        threads = [threading.Thread(target=client, args=(i,))
+                   for i in range(args.clients)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.monotonic() - start
+        total = args.clients * args.requests
+        print("storage options: %s" % " ".join(options))
+        print("%d PUT requests from %d clients in %.2f seconds: "
+              "%.1f requests/second" % (total, args.clients, duration,
+                                        total / duration))
+        if errors:
+            print("%d failed requests" % len(errors))
+            sys.exit(1)
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
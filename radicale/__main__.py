@@ -65,8 +65,17 @@ def run() -> None:
     parser.add_argument("--version", action="version", version=VERSION)
     parser.add_argument("--verify-storage", action="store_true",
                         help="check the storage for errors and exit")
+    parser.add_argument("--verify-storage-processes", type=int,
+                        metavar="N", default=1,
+                        help="number of processes for checking the storage "
+                        "(default: 1)")
+    parser.add_argument("--verify-storage-incremental", action="store_true",
+                        help="skip collections unchanged since their last "
+                        "successful check")
     parser.add_argument("--verify-item", action="store", nargs=1,
                         help="check the provided item file for errors and exit")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="fill the cache of the storage and exit")
     parser.add_argument("-C", "--config",
                         help="use specific configuration files", nargs="*")
     parser.add_argument("-D", "--debug", action="store_const", const="debug",
@@ -187,7 +196,13 @@ def run() -> None:
         try:
             storage_ = storage.load(configuration)
             with storage_.acquire_lock("r"):
-                if not storage_.verify():
+                if storage_.supports_verify_options:
+                    verified = storage_.verify(
+                        processes=args_ns.verify_storage_processes,
+                        incremental=args_ns.verify_storage_incremental)
+                else:
+                    verified = storage_.verify()
+                if not verified:
                     logger.critical("Storage verification failed")
                     sys.exit(1)
         except Exception as e:
@@ -196,6 +211,18 @@ def run() -> None:
             sys.exit(1)
         return
 
+    if args_ns.warm_cache:
+        logger.info("Warming storage cache")
+        try:
+            storage_ = storage.load(configuration)
+            if not storage_.warm_cache(os.cpu_count() or 1):
+                logger.warning("Storage contains broken items")
+        except Exception as e:
+            logger.critical("An exception occurred during cache warming: "
+                            "%s", e, exc_info=True)
+            sys.exit(1)
+        return
+
     if args_ns.verify_item:
         encoding = configuration.get("encoding", "stock")
         logger.info("Item verification start using 'stock' encoding: %s", encoding)
@@ -174,6 +174,10 @@ class Application(ApplicationPartDelete, ApplicationPartHead,
         self.profiler_per_request_method_starttime = datetime.datetime.now()
         self.profiler_per_request_method_logtime = self.profiler_per_request_method_starttime
 
+    def start_cache_warmer(self) -> None:
+        """Fill the caches of the storage in the background."""
+        self._storage.start_cache_warmer()
+
     def __del__(self) -> None:
         """Shutdown application."""
         if self._profiling_per_request_method:
@@ -227,6 +231,8 @@ class Application(ApplicationPartDelete, ApplicationPartHead,
                 answers = [answer]
             start_response(status_text, headers)
         if environ.get("REQUEST_METHOD") == "HEAD":
+            if isinstance(answers, httputils.ResponseStream):
+                answers.close()
             return []
         return answers
 
@@ -244,13 +250,13 @@ class Application(ApplicationPartDelete, ApplicationPartHead,
 
         """Manage a request."""
         def response(status: int, headers: types.WSGIResponseHeaders,
-                     answer: Union[None, str, bytes],
+                     answer: Union[None, str, bytes, Iterable[bytes]],
                      xml_request: Union[None, str] = None) -> _IntermediateResponse:
             """Helper to create response from internal types.WSGIResponse"""
             headers = dict(headers)
             content_encoding = "plain"
             # Set content length
-            answers = []
+            answers: Iterable[bytes] = []
             if answer is not None:
                 if isinstance(answer, str):
                     if self._response_content_on_debug:
@@ -266,14 +272,27 @@ class Application(ApplicationPartDelete, ApplicationPartHead,
                     environ.get("HTTP_ACCEPT_ENCODING", "").split(",")
                     if encoding.strip()]
 
-                if "gzip" in accept_encoding:
-                    zcomp = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
-                    answer = zcomp.compress(answer) + zcomp.flush()
-                    headers["Content-Encoding"] = "gzip"
-                    content_encoding = "gzip"
+                if not isinstance(answer, bytes):
+                    # Content is generated while it is sent, its length is
+                    # unknown
+                    stream = (answer if isinstance(
+                        answer, httputils.ResponseStream) else
+                        httputils.ResponseStream(answer))
+                    if "gzip" in accept_encoding:
+                        stream = httputils.ResponseStream(
+                            httputils.gzip_stream(stream), stream.close)
+                        headers["Content-Encoding"] = "gzip"
+                        content_encoding = "gzip"
+                    answers = stream
+                else:
+                    if "gzip" in accept_encoding:
+                        zcomp = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+                        answer = zcomp.compress(answer) + zcomp.flush()
+                        headers["Content-Encoding"] = "gzip"
+                        content_encoding = "gzip"
 
-                headers["Content-Length"] = str(len(answer))
-                answers.append(answer)
+                    headers["Content-Length"] = str(len(answer))
+                    answers = [answer]
 
             # Add extra headers set in configuration
             headers.update(self._extra_headers)
@@ -304,12 +323,17 @@ class Application(ApplicationPartDelete, ApplicationPartHead,
                 flags_text = " (" + " ".join(flags) + ")"
             else:
                 flags_text = ""
-            if answer is not None:
+            if isinstance(answer, bytes):
                 logger.info("%s response status for %r%s in %.3f seconds %s %s bytes%s: %s",
                             request_method, unsafe_path, depthinfo,
                             (time_end - time_begin).total_seconds(), content_encoding, str(len(answer)),
                             flags_text,
                             status_text)
+            elif answer is not None:
+                logger.info("%s response status for %r%s in %.3f seconds %s streamed%s: %s",
+                            request_method, unsafe_path, depthinfo,
+                            time_delta_seconds, content_encoding, flags_text,
+                            status_text)
             else:
                 logger.info("%s response status for %r%s in %.3f seconds: %s",
                             request_method, unsafe_path, depthinfo,
@@ -484,12 +508,12 @@ class Application(ApplicationPartDelete, ApplicationPartHead,
         # Create principal collection
         if user:
             principal_path = "/%s/" % user
-            with self._storage.acquire_lock("r", user):
+            with self._storage.acquire_lock("r", user, path=principal_path):
                 principal = next(iter(self._storage.discover(
                     principal_path, depth="1")), None)
             if not principal:
                 if "W" in self._rights.authorization(user, principal_path):
-                    with self._storage.acquire_lock("w", user):
+                    with self._storage.acquire_lock("w", user, path=principal_path):
                         try:
                             new_coll, _, _ = self._storage.create_collection(principal_path)
                             if new_coll:
@@ -20,7 +20,7 @@ import logging
 import posixpath
 import sys
 import xml.etree.ElementTree as ET
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 from radicale import (auth, config, hook, httputils, pathutils, rights,
                       storage, types, utils, web, xmlutils)
@@ -43,6 +43,7 @@ class ApplicationBase:
     _permit_delete_collection: bool
     _permit_overwrite_collection: bool
     _strict_preconditions: bool
+    _stream_multistatus: bool
     _hook: hook.BaseHook
 
     def __init__(self, configuration: config.Configuration) -> None:
@@ -55,6 +56,7 @@ class ApplicationBase:
         self._log_bad_put_request_content = configuration.get("logging", "bad_put_request_content")
         self._response_content_on_debug = configuration.get("logging", "response_content_on_debug")
         self._request_content_on_debug = configuration.get("logging", "request_content_on_debug")
+        self._stream_multistatus = configuration.get("server", "stream_multistatus")
         self._hook = hook.load(configuration)
 
     def _read_xml_request_body(self, environ: types.WSGIEnviron
@@ -89,6 +91,25 @@ class ApplicationBase:
                                           xml_declaration=True)
         return f.getvalue()
 
+    def _xml_multistatus_stream(self, elements: Iterable[ET.Element]
+                                ) -> Iterator[bytes]:
+        """Serialize a multistatus response with the children ``elements``
+        while they are generated."""
+        if logger.isEnabledFor(logging.DEBUG):
+            if self._response_content_on_debug:
+                elements = self._log_xml_elements(elements)
+            else:
+                logger.debug("Response content (XML): suppressed by config/option [logging] response_content_on_debug")
+        return xmlutils.iter_multistatus(elements, self._encoding)
+
+    @staticmethod
+    def _log_xml_elements(elements: Iterable[ET.Element]
+                          ) -> Iterator[ET.Element]:
+        for element in elements:
+            logger.debug("Response content (XML, streamed):\n%s",
+                         utils.textwrap_str(xmlutils.pretty_xml(element)))
+            yield element
+
     def _webdav_error_response(self, status: int, human_tag: str
                                ) -> types.WSGIResponse:
         """Generate XML error response."""
@@ -79,7 +79,7 @@ class ApplicationPartGet(ApplicationBase):
         access = Access(self._rights, user, path)
         if not access.check("r") and "i" not in access.permissions:
             return httputils.NOT_ALLOWED
-        with self._storage.acquire_lock("r", user):
+        with self._storage.acquire_lock("r", user, path=path, request="GET"):
             item = next(iter(self._storage.discover(path)), None)
             if not item:
                 return httputils.NOT_FOUND
@@ -24,13 +24,41 @@ import posixpath
 import socket
 import xml.etree.ElementTree as ET
 from http import client
-from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from typing import (AbstractSet, Dict, FrozenSet, Iterable, Iterator, List,
+                    Mapping, Optional, Sequence, Tuple)
 
 from radicale import (httputils, pathutils, rights, storage, types, utils,
                       xmlutils)
 from radicale.app.base import Access, ApplicationBase
 from radicale.log import logger
 
+# Fields of items (see ``storage.ITEM_FIELDS``) used by properties
+PROPERTY_ITEM_FIELDS: Mapping[str, FrozenSet[str]] = {
+    xmlutils.make_clark("D:getetag"): frozenset(("etag",)),
+    xmlutils.make_clark("D:getlastmodified"): frozenset(("last_modified",)),
+    xmlutils.make_clark("D:getcontenttype"): frozenset(
+        ("name", "component_name")),
+    xmlutils.make_clark("D:getcontentlength"): frozenset(("text",))}
+
+
+def xml_propfind_projection(xml_request: Optional[ET.Element]
+                            ) -> Optional[AbstractSet[str]]:
+    """Get the fields of items used to answer the PROPFIND request.
+
+    Returns ``None`` if all fields are used.
+
+    """
+    if xml_request is None or len(xml_request) == 0:
+        # allprop
+        return None
+    top_element = xml_request[0]
+    if top_element.tag == xmlutils.make_clark("D:propname"):
+        return frozenset()
+    if top_element.tag != xmlutils.make_clark("D:prop"):
+        return None
+    return frozenset().union(*(PROPERTY_ITEM_FIELDS.get(prop.tag, ())
+                               for prop in top_element))
+
 
 def xml_propfind(base_prefix: str, path: str,
                  xml_request: Optional[ET.Element],
@@ -43,6 +71,28 @@ def xml_propfind(base_prefix: str, path: str,
     The collections parameter is a list of collections that are to be included
     in the output.
 
+    """
+    responses = xml_propfind_responses(
+        base_prefix, path, xml_request, allowed_items, user, encoding,
+        max_resource_size)
+    if responses is None:
+        return None
+    multistatus = ET.Element(xmlutils.make_clark("D:multistatus"))
+    for response in responses:
+        multistatus.append(response)
+    return multistatus
+
+
+def xml_propfind_responses(
+        base_prefix: str, path: str, xml_request: Optional[ET.Element],
+        allowed_items: Iterable[Tuple[types.CollectionOrItem, str]],
+        user: str, encoding: str, max_resource_size: int
+        ) -> Optional[Iterator[ET.Element]]:
+    """Read PROPFIND requests and generate the responses of
+    ``allowed_items`` while they are consumed.
+
+    Returns ``None`` if authentication is required.
+
     """
     # A client may choose not to submit a request body.  An empty PROPFIND
     # request body MUST be treated as if it were an 'allprop' request.
@@ -66,15 +116,11 @@ def xml_propfind(base_prefix: str, path: str,
         return None
 
     # Writing answer
-    multistatus = ET.Element(xmlutils.make_clark("D:multistatus"))
-
-    for item, permission in allowed_items:
-        write = permission == "w"
-        multistatus.append(xml_propfind_response(
-            base_prefix, path, item, props, user, encoding, write=write,
-            allprop=allprop, propname=propname, max_resource_size=max_resource_size))
-
-    return multistatus
+    return (xml_propfind_response(
+        base_prefix, path, item, props, user, encoding,
+        write=permission == "w", allprop=allprop, propname=propname,
+        max_resource_size=max_resource_size)
+        for item, permission in allowed_items)
 
 
 def xml_propfind_response(
@@ -302,7 +348,11 @@ def xml_propfind_response(
             elif tag == xmlutils.make_clark("RADICALE:getcontentcount"):
                 # Only for internal use by the web interface
                 if isinstance(item, storage.BaseCollection) and not collection.is_principal:
-                    element.text = str(sum(1 for x in item.get_all()))
+                    if item.supports_projection:
+                        items = item.get_all(projection=frozenset())
+                    else:
+                        items = item.get_all()
+                    element.text = str(sum(1 for x in items))
                 else:
                     is404 = True
             elif tag == xmlutils.make_clark("D:displayname"):
@@ -417,10 +467,18 @@ class ApplicationPartPropfind(ApplicationBase):
         except socket.timeout:
             logger.debug("Client timed out", exc_info=True)
             return httputils.REQUEST_TIMEOUT
-        with self._storage.acquire_lock("r", user):
-            items_iter = iter(self._storage.discover(
-                path, environ.get("HTTP_DEPTH", "0"),
-                None, self._rights._user_groups))
+        with self._storage.acquire_lock(
+                "r", user, path=path, request="PROPFIND",
+                user_groups=self._rights._user_groups):
+            if self._storage.supports_projection:
+                items_iter = iter(self._storage.discover(
+                    path, environ.get("HTTP_DEPTH", "0"),
+                    None, self._rights._user_groups,
+                    projection=xml_propfind_projection(xml_content)))
+            else:
+                items_iter = iter(self._storage.discover(
+                    path, environ.get("HTTP_DEPTH", "0"),
+                    None, self._rights._user_groups))
             # take root item for rights checking
             item = next(items_iter, None)
             if not item:
@@ -432,6 +490,18 @@ class ApplicationPartPropfind(ApplicationBase):
             allowed_items = self._collect_allowed_items(items_iter, user)
             headers = {"DAV": httputils.DAV_HEADERS,
                        "Content-Type": "text/xml; charset=%s" % self._encoding}
+            if self._stream_multistatus:
+                responses = xml_propfind_responses(
+                    base_prefix, path, xml_content, allowed_items, user,
+                    self._encoding, max_resource_size=self._max_resource_size)
+                if responses is None:
+                    return httputils.NOT_ALLOWED
+                # Generate the responses before the storage is unlocked,
+                # only the serialization is streamed
+                stream = httputils.ResponseStream(
+                    self._xml_multistatus_stream(list(responses)))
+                return (client.MULTI_STATUS, headers, stream,
+                        xmlutils.pretty_xml(xml_content))
             xml_answer = xml_propfind(base_prefix, path, xml_content,
                                       allowed_items, user, self._encoding, max_resource_size=self._max_resource_size)
             if xml_answer is None:
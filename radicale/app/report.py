@@ -22,15 +22,19 @@
 # You should have received a copy of the GNU General Public License
 # along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
 import contextlib
 import copy
 import datetime
+import itertools
+import json
 import posixpath
 import socket
+import tempfile
 import xml.etree.ElementTree as ET
 from http import client
-from typing import (Callable, Iterable, Iterator, List, Optional, Sequence,
-                    Tuple, Union)
+from typing import (IO, AbstractSet, Callable, Deque, Iterable, Iterator, List,
+                    NamedTuple, Optional, Sequence, Set, Tuple, Union)
 from urllib.parse import unquote, urlparse
 
 import vobject
@@ -46,11 +50,15 @@ from radicale.log import logger
 DT_FORMAT_TIMESTAMP: str = '%Y%m%dT%H%M%SZ'
 DT_FORMAT_DATE: str = '%Y%m%d'
 
+# Fields of items that are filtered after the storage is unlocked
+FILTER_ITEM_FIELDS: AbstractSet[str] = frozenset(
+    ("name", "component_name", "text"))
+
 
 def free_busy_report(base_prefix: str, path: str, xml_request: Optional[ET.Element],
                      collection: storage.BaseCollection, encoding: str,
                      unlock_storage_fn: Callable[[], None],
-                     max_occurrence: int
+                     max_occurrence: int, max_result_memory: int = 0
                      ) -> Tuple[int, Union[ET.Element, str]]:
     # NOTE: this function returns both an Element and a string because
     # free-busy reports are an edge-case on the return type according
@@ -83,28 +91,36 @@ def free_busy_report(base_prefix: str, path: str, xml_request: Optional[ET.Eleme
     filters = (filter_element,)
 
     # First pull from storage
-    retrieved_items = list(collection.get_filtered(filters))
+    spool = ItemSpool(max_result_memory)
+    if collection.supports_projection:
+        items = collection.get_filtered(filters, FILTER_ITEM_FIELDS)
+    else:
+        items = collection.get_filtered(filters)
+    for item, filter_matched in items:
+        spool.append(item_handle(item, filter_matched, FILTER_ITEM_FIELDS))
+    collection_path = collection.path
     # !!! Don't access storage after this !!!
     unlock_storage_fn()
 
     cal = vobject.iCalendar()
     collection_tag = collection.tag
-    while retrieved_items:
+    predicate = compile_filter(collection_tag, filter_element)
+    for handle in spool:
         # Second filtering before evaluating occurrences.
         # ``item.vobject_item`` might be accessed during filtering.
         # Don't keep reference to ``item``, because VObject requires a lot of
         # memory.
-        item, filter_matched = retrieved_items.pop(0)
-        if not filter_matched:
+        item = item_from_handle(collection_path, handle)
+        if not handle.filters_matched:
             try:
-                if not test_filter(collection_tag, item, filter_element):
+                if not predicate(item):
                     continue
             except ValueError as e:
                 raise ValueError("Failed to free-busy filter item %r from %r: %s" %
-                                 (item.href, collection.path, e)) from e
+                                 (item.href, collection_path, e)) from e
             except Exception as e:
                 raise RuntimeError("Failed to free-busy filter item %r from %r: %s" %
-                                   (item.href, collection.path, e)) from e
+                                   (item.href, collection_path, e)) from e
 
         fbtype = None
         if item.component_name == 'VEVENT':
@@ -149,17 +165,42 @@ def free_busy_report(base_prefix: str, path: str, xml_request: Optional[ET.Eleme
 def xml_report(base_prefix: str, path: str, xml_request: Optional[ET.Element],
                collection: storage.BaseCollection, encoding: str,
                unlock_storage_fn: Callable[[], None],
-               max_occurrence: int = 0, user: str = "", remote_addr: str = "", remote_useragent: str = ""
-               ) -> Tuple[int, ET.Element]:
+               max_occurrence: int = 0, user: str = "", remote_addr: str = "", remote_useragent: str = "",
+               max_result_memory: int = 0) -> Tuple[int, ET.Element]:
     """Read and answer REPORT requests that return XML.
 
     Read rfc3253-3.6 for info.
 
+    """
+    status, multistatus, responses = xml_report_stream(
+        base_prefix, path, xml_request, collection, encoding,
+        unlock_storage_fn, max_occurrence, user, remote_addr,
+        remote_useragent, max_result_memory)
+    for response in responses:
+        multistatus.append(response)
+    return status, multistatus
+
+
+def xml_report_stream(
+        base_prefix: str, path: str, xml_request: Optional[ET.Element],
+        collection: storage.BaseCollection, encoding: str,
+        unlock_storage_fn: Callable[[], None],
+        max_occurrence: int = 0, user: str = "", remote_addr: str = "",
+        remote_useragent: str = "", max_result_memory: int = 0
+        ) -> Tuple[int, ET.Element, Iterator[ET.Element]]:
+    """Read and answer REPORT requests that return XML.
+
+    The responses of the items are generated by the returned iterator
+    after the storage is unlocked, they follow the children of the returned
+    element.
+
+    ``max_result_memory`` see ``ItemSpool``.
+
     """
     logger.debug("TRACE/REPORT/xml_report: base_prefix=%r path=%r", base_prefix, path)
     multistatus = ET.Element(xmlutils.make_clark("D:multistatus"))
     if xml_request is None:
-        return client.MULTI_STATUS, multistatus
+        return client.MULTI_STATUS, multistatus, iter(())
     root = xml_request
     if root.tag in (xmlutils.make_clark("D:principal-search-property-set"),
                     xmlutils.make_clark("D:principal-property-search"),
@@ -170,7 +211,7 @@ def xml_report(base_prefix: str, path: str, xml_request: Optional[ET.Element],
         # support for them) and stops working if an error code is returned.
         logger.warning("Unsupported REPORT method %r on %r requested",
                        xmlutils.make_human_tag(root.tag), path)
-        return client.MULTI_STATUS, multistatus
+        return client.MULTI_STATUS, multistatus, iter(())
     if (root.tag == xmlutils.make_clark("C:calendar-multiget") and
             collection.tag != "VCALENDAR" or
             root.tag == xmlutils.make_clark("CR:addressbook-multiget") and
@@ -179,7 +220,8 @@ def xml_report(base_prefix: str, path: str, xml_request: Optional[ET.Element],
             collection.tag not in ("VADDRESSBOOK", "VCALENDAR")):
         logger.warning("Invalid REPORT method %r on %r requested",
                        xmlutils.make_human_tag(root.tag), path)
-        return client.FORBIDDEN, xmlutils.webdav_error("D:supported-report")
+        return (client.FORBIDDEN,
+                xmlutils.webdav_error("D:supported-report"), iter(()))
 
     props: Union[ET.Element, List]
     if root.find(xmlutils.make_clark("D:prop")) is not None:
@@ -217,7 +259,7 @@ def xml_report(base_prefix: str, path: str, xml_request: Optional[ET.Element],
                            path, user, remote_addr, remote_useragent, e, exc_info=True)
             # client.CONFLICT doesn't work with some clients (e.g. InfCloud)
             return (client.FORBIDDEN,
-                    xmlutils.webdav_error("D:valid-sync-token"))
+                    xmlutils.webdav_error("D:valid-sync-token"), iter(()))
         hreferences = (pathutils.unstrip_path(
             posixpath.join(collection.path, n)) for n in names)
         # Append current sync token to response
@@ -230,133 +272,157 @@ def xml_report(base_prefix: str, path: str, xml_request: Optional[ET.Element],
         root.findall(xmlutils.make_clark("C:filter")) +
         root.findall(xmlutils.make_clark("CR:filter")))
     expand = root.find(".//" + xmlutils.make_clark("C:expand"))
+    if expand is not None:
+        starts = expand.get("start")
+        ends = expand.get("end")
+        if starts is None or ends is None:
+            return (client.FORBIDDEN, xmlutils.webdav_error("C:expand"),
+                    iter(()))
+        start = datetime.datetime.strptime(
+            starts, DT_FORMAT_TIMESTAMP
+        ).replace(tzinfo=datetime.timezone.utc)
+        end = datetime.datetime.strptime(
+            ends, DT_FORMAT_TIMESTAMP
+        ).replace(tzinfo=datetime.timezone.utc)
 
     # if we have expand prop we use "filter (except time range) -> expand -> filter (only time range)" approach
     time_range_element = None
     main_filters = []
     for filter_ in filters:
+        if expand is None:
+            main_filters.append(filter_)
+            continue
         # extract time-range filter for processing after main filters
         # for expand request
         filter_copy = copy.deepcopy(filter_)
-
-        if expand is not None:
-            logger.debug("TRACE/REPORT/xml_report: expand")
-            for comp_filter in filter_copy.findall(".//" + xmlutils.make_clark("C:comp-filter")):
-                if comp_filter.get("name", "").upper() == "VCALENDAR":
-                    continue
-                time_range_element = comp_filter.find(xmlutils.make_clark("C:time-range"))
-                if time_range_element is not None:
-                    comp_filter.remove(time_range_element)
-
+        logger.debug("TRACE/REPORT/xml_report: expand")
+        for comp_filter in filter_copy.findall(".//" + xmlutils.make_clark("C:comp-filter")):
+            if comp_filter.get("name", "").upper() == "VCALENDAR":
+                continue
+            time_range_element = comp_filter.find(xmlutils.make_clark("C:time-range"))
+            if time_range_element is not None:
+                comp_filter.remove(time_range_element)
         main_filters.append(filter_copy)
 
+    # Fields of the items used below
+    projection: Set[str] = set()
+    for prop in props:
+        if prop.tag == xmlutils.make_clark("D:getcontenttype"):
+            projection.update(("name", "component_name"))
+        elif prop.tag == xmlutils.make_clark("D:getetag"):
+            projection.add("etag")
+        elif prop.tag in (xmlutils.make_clark("C:calendar-data"),
+                          xmlutils.make_clark("CR:address-data")):
+            projection.add("text")
+    if expand is not None:
+        projection.update(("component_name", "text"))
+
     # Retrieve everything required for finishing the request.
-    retrieved_items = list(retrieve_items(
-        base_prefix, path, collection, hreferences, main_filters, multistatus))
+    spool = ItemSpool(max_result_memory)
+    filter_projection = projection | FILTER_ITEM_FIELDS
+    for item, filters_matched in retrieve_items(
+            base_prefix, path, collection, hreferences, main_filters,
+            multistatus, projection):
+        # Items that are not fully matched are filtered below
+        spool.append(item_handle(
+            item, filters_matched, filter_projection
+            if filters and not filters_matched else projection))
     collection_tag = collection.tag
+    collection_path = collection.path
     # !!! Don't access storage after this !!!
     unlock_storage_fn()
 
-    n_vevents = 0
-    while retrieved_items:
-        # ``item.vobject_item`` might be accessed during filtering.
-        # Don't keep reference to ``item``, because VObject requires a lot of
-        # memory.
-        item, filters_matched = retrieved_items.pop(0)
-        if filters and not filters_matched:
-            try:
-                if not all(test_filter(collection_tag, item, filter_)
-                           for filter_ in main_filters):
-                    continue
-            except ValueError as e:
-                raise ValueError("Failed to filter item %r from %r: %s" %
-                                 (item.href, collection.path, e)) from e
-            except Exception as e:
-                raise RuntimeError("Failed to filter item %r from %r: %s" %
-                                   (item.href, collection.path, e)) from e
-
-        found_props = []
-        not_found_props = []
-
-        for prop in props:
-            element = ET.Element(prop.tag)
-            if prop.tag == xmlutils.make_clark("D:getcontenttype"):
-                element.text = xmlutils.get_content_type(item, encoding)
-                found_props.append(element)
-            elif prop.tag in (
-                    xmlutils.make_clark("C:calendar-data"),
-                    xmlutils.make_clark("D:getetag"),
-                    xmlutils.make_clark("CR:address-data")):
-                element.text = item.serialize()
-
-                if (expand is not None) and item.component_name == 'VEVENT':
-                    starts = expand.get('start')
-                    ends = expand.get('end')
-
-                    if (starts is None) or (ends is None):
-                        return client.FORBIDDEN, \
-                            xmlutils.webdav_error("C:expand")
-
-                    start = datetime.datetime.strptime(
-                        starts, DT_FORMAT_TIMESTAMP
-                    ).replace(tzinfo=datetime.timezone.utc)
-                    end = datetime.datetime.strptime(
-                        ends, DT_FORMAT_TIMESTAMP
-                    ).replace(tzinfo=datetime.timezone.utc)
-
-                    time_range_start = None
-                    time_range_end = None
-
-                    if time_range_element is not None:
-                        time_range_start, time_range_end = radicale_filter.parse_time_range(time_range_element)
-
-                    (expanded_element, n_vev) = _expand(
-                        element=element, item=copy.copy(item),
-                        start=start, end=end,
-                        time_range_start=time_range_start, time_range_end=time_range_end,
-                        max_occurrence=max_occurrence,
-                    )
-
-                    if n_vev == 0:
-                        logger.debug("No VEVENTs found after expansion for %r, skipping", item.href)
+    time_range_start = time_range_end = None
+    if time_range_element is not None:
+        time_range_start, time_range_end = radicale_filter.parse_time_range(
+            time_range_element)
+
+    def responses() -> Iterator[ET.Element]:
+        n_vevents = 0
+        # Compiled when the first item is filtered
+        predicates: Optional[List[radicale_filter.ItemPredicate]] = None
+        for handle in spool:
+            # ``item.vobject_item`` might be accessed during filtering.
+            # Don't keep reference to ``item``, because VObject requires a lot of
+            # memory.
+            item = item_from_handle(collection_path, handle)
+            if filters and not handle.filters_matched:
+                try:
+                    if predicates is None:
+                        predicates = [compile_filter(collection_tag, filter_)
+                                      for filter_ in main_filters]
+                    if not all(predicate(item) for predicate in predicates):
                         continue
-
-                    n_vevents += n_vev
-                    if prop.tag == xmlutils.make_clark("D:getetag"):
-                        if n_vev > 0:
-                            logger.debug("TRACE/REPORT/xml_report: getetag/expanded element")
+                except ValueError as e:
+                    raise ValueError("Failed to filter item %r from %r: %s" %
+                                     (item.href, collection_path, e)) from e
+                except Exception as e:
+                    raise RuntimeError("Failed to filter item %r from %r: %s" %
+                                       (item.href, collection_path, e)) from e
+
+            found_props = []
+            not_found_props = []
+
+            for prop in props:
+                element = ET.Element(prop.tag)
+                if prop.tag == xmlutils.make_clark("D:getcontenttype"):
+                    element.text = xmlutils.get_content_type(item, encoding)
+                    found_props.append(element)
+                elif prop.tag in (
+                        xmlutils.make_clark("C:calendar-data"),
+                        xmlutils.make_clark("D:getetag"),
+                        xmlutils.make_clark("CR:address-data")):
+                    if prop.tag != xmlutils.make_clark("D:getetag"):
+                        element.text = item.serialize()
+
+                    if (expand is not None) and item.component_name == 'VEVENT':
+                        (expanded_element, n_vev) = _expand(
+                            element=element, item=copy.copy(item),
+                            start=start, end=end,
+                            time_range_start=time_range_start, time_range_end=time_range_end,
+                            max_occurrence=max_occurrence,
+                        )
+
+                        if n_vev == 0:
+                            logger.debug("No VEVENTs found after expansion for %r, skipping", item.href)
+                            continue
+
+                        n_vevents += n_vev
+                        if prop.tag == xmlutils.make_clark("D:getetag"):
+                            if n_vev > 0:
+                                logger.debug("TRACE/REPORT/xml_report: getetag/expanded element")
+                                element.text = item.etag
+                                found_props.append(element)
+                            else:
+                                logger.debug("TRACE/REPORT/xml_report: getetag/no expanded element")
+                        else:
+                            logger.debug("TRACE/REPORT/xml_report: default")
+                            found_props.append(expanded_element)
+                    else:
+                        if prop.tag == xmlutils.make_clark("D:getetag"):
                             element.text = item.etag
                             found_props.append(element)
                         else:
-                            logger.debug("TRACE/REPORT/xml_report: getetag/no expanded element")
-                    else:
-                        logger.debug("TRACE/REPORT/xml_report: default")
-                        found_props.append(expanded_element)
+                            found_props.append(element)
+                            if hasattr(item.vobject_item, "vevent_list"):
+                                n_vevents += len(item.vobject_item.vevent_list)
+                    # Avoid DoS with too many events
+                    if max_occurrence and n_vevents > max_occurrence:
+                        raise ValueError("REPORT occurrences limit of {} hit"
+                                         .format(max_occurrence))
                 else:
-                    if prop.tag == xmlutils.make_clark("D:getetag"):
-                        element.text = item.etag
-                        found_props.append(element)
-                    else:
-                        found_props.append(element)
-                        if hasattr(item.vobject_item, "vevent_list"):
-                            n_vevents += len(item.vobject_item.vevent_list)
-                # Avoid DoS with too many events
-                if max_occurrence and n_vevents > max_occurrence:
-                    raise ValueError("REPORT occurrences limit of {} hit"
-                                     .format(max_occurrence))
-            else:
-                not_found_props.append(element)
+                    not_found_props.append(element)
 
-        assert item.href
-        uri = pathutils.unstrip_path(
-            posixpath.join(collection.path, item.href))
+            assert item.href
+            uri = pathutils.unstrip_path(
+                posixpath.join(collection_path, item.href))
 
-        if found_props or not_found_props:
-            multistatus.append(xml_item_response(
-                base_prefix, uri, found_props=found_props,
-                not_found_props=not_found_props, found_item=True))
+            if found_props or not_found_props:
+                yield xml_item_response(
+                    base_prefix, uri, found_props=found_props,
+                    not_found_props=not_found_props, found_item=True)
 
-    return client.MULTI_STATUS, multistatus
+    return client.MULTI_STATUS, multistatus, responses()
 
 
 def _expand(
@@ -720,10 +786,13 @@ def xml_item_response(base_prefix: str, href: str,
 def retrieve_items(
         base_prefix: str, path: str, collection: storage.BaseCollection,
         hreferences: Iterable[str], filters: Sequence[ET.Element],
-        multistatus: ET.Element) -> Iterator[Tuple[radicale_item.Item, bool]]:
+        multistatus: ET.Element,
+        projection: Optional[AbstractSet[str]] = None
+        ) -> Iterator[Tuple[radicale_item.Item, bool]]:
     """Retrieves all items that are referenced in ``hreferences`` from
        ``collection`` and adds 404 responses for missing and invalid items
-       to ``multistatus``."""
+       to ``multistatus``.
+       ``projection`` are the fields of the items used by the caller."""
     collection_requested = False
 
     def get_names() -> Iterator[str]:
@@ -749,7 +818,11 @@ def retrieve_items(
                 # Reference is a collection
                 collection_requested = True
 
-    for name, item in collection.get_multi(get_names()):
+    if collection.supports_projection:
+        items = collection.get_multi(get_names(), projection)
+    else:
+        items = collection.get_multi(get_names())
+    for name, item in items:
         if not item:
             uri = pathutils.unstrip_path(posixpath.join(collection.path, name))
             response = xml_item_response(base_prefix, uri, found_item=False)
@@ -758,38 +831,144 @@ def retrieve_items(
             yield item, False
     if collection_requested:
         logger.debug("TRACE/REPORT/retrieve_items: get_filtered")
-        yield from collection.get_filtered(filters)
+        if collection.supports_projection:
+            yield from collection.get_filtered(filters, projection)
+        else:
+            yield from collection.get_filtered(filters)
+
+
+# Fields of a retrieved item that are used after the storage is unlocked
+# (see ``storage.ITEM_FIELDS``), other fields are ``None``
+ItemHandle = NamedTuple("ItemHandle", [
+    ("href", str), ("filters_matched", bool), ("etag", Optional[str]),
+    ("name", Optional[str]), ("component_name", Optional[str]),
+    ("text", Optional[str])])
+
+
+def item_handle(item: radicale_item.Item, filters_matched: bool,
+                fields: AbstractSet[str]) -> ItemHandle:
+    """Get the ``fields`` of ``item`` while the storage is locked."""
+    assert item.href
+    return ItemHandle(
+        item.href, filters_matched,
+        item.etag if "etag" in fields else None,
+        item.name if "name" in fields else None,
+        item.component_name if "component_name" in fields else None,
+        item.serialize() if "text" in fields else None)
+
+
+def item_from_handle(collection_path: str, handle: ItemHandle
+                     ) -> radicale_item.Item:
+    """Create an item without access to the storage from ``handle``."""
+    def load_text() -> str:
+        raise RuntimeError("Text of item %r from %r wasn't retrieved" %
+                           (handle.href, collection_path))
+    return radicale_item.Item(
+        collection_path=collection_path, href=handle.href, etag=handle.etag,
+        name=handle.name, component_name=handle.component_name,
+        text=handle.text, load_text=load_text)
+
+
+class ItemSpool:
+    """Queue of ``ItemHandle`` that are removed in the order they were
+    appended while it is iterated.
+
+    The handles are kept in memory until the size of their fields
+    (including the text of items) exceeds ``max_memory`` bytes (``0``:
+    unlimited), then all handles are moved to a temporary file in the
+    system temporary directory. The size of the file is not limited, it
+    contains the texts of the items if they are part of the handles.
 
+    """
 
-def test_filter(collection_tag: str, item: radicale_item.Item,
-                filter_: ET.Element) -> bool:
-    """Match an item against a filter."""
+    _max_memory: int
+    _handles: Deque[ItemHandle]
+    _size: int
+    _file: Optional[IO[str]]
+
+    def __init__(self, max_memory: int = 0) -> None:
+        self._max_memory = max_memory
+        self._handles = collections.deque()
+        self._size = 0
+        self._file = None
+
+    def append(self, handle: ItemHandle) -> None:
+        if self._file is not None:
+            self._write(handle)
+            return
+        self._handles.append(handle)
+        if not self._max_memory:
+            return
+        self._size += sum(len(field.encode()) for field in handle
+                          if isinstance(field, str))
+        if self._size > self._max_memory:
+            logger.debug("Spilling %d retrieved items to temporary file",
+                         len(self._handles))
+            self._file = tempfile.TemporaryFile("w+", encoding="utf-8")
+            while self._handles:
+                self._write(self._handles.popleft())
+
+    def _write(self, handle: ItemHandle) -> None:
+        assert self._file is not None
+        # Line breaks are escaped by JSON
+        self._file.write(json.dumps(handle) + "\n")
+
+    def __iter__(self) -> Iterator[ItemHandle]:
+        try:
+            while self._handles:
+                yield self._handles.popleft()
+            if self._file is not None:
+                self._file.seek(0)
+                for line in self._file:
+                    yield ItemHandle(*json.loads(line))
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def compile_filter(collection_tag: str, filter_: ET.Element
+                   ) -> radicale_filter.ItemPredicate:
+    """Compile a filter into a predicate for items.
+
+    ``ValueError`` is raised for unsupported filters.
+
+    """
     if (collection_tag == "VCALENDAR" and
             filter_.tag != xmlutils.make_clark("C:%s" % filter_)):
         if len(filter_) == 0:
-            return True
+            return lambda item: True
         if len(filter_) > 1:
             raise ValueError("Filter with %d children" % len(filter_))
         if filter_[0].tag != xmlutils.make_clark("C:comp-filter"):
             raise ValueError("Unexpected %r in filter" % filter_[0].tag)
-        return radicale_filter.comp_match(item, filter_[0])
+        return radicale_filter.compile_comp_filter(filter_[0])
     if (collection_tag == "VADDRESSBOOK" and
             filter_.tag != xmlutils.make_clark("CR:%s" % filter_)):
         for child in filter_:
             if child.tag != xmlutils.make_clark("CR:prop-filter"):
                 raise ValueError("Unexpected %r in filter" % child.tag)
         test = filter_.get("test", "anyof")
-        if test == "anyof":
-            return any(radicale_filter.prop_match(item.vobject_item, f, "CR")
-                       for f in filter_)
-        if test == "allof":
-            return all(radicale_filter.prop_match(item.vobject_item, f, "CR")
-                       for f in filter_)
-        raise ValueError("Unsupported filter test: %r" % test)
+        if test not in ("anyof", "allof"):
+            raise ValueError("Unsupported filter test: %r" % test)
+        prop_filters = [radicale_filter.compile_prop_filter(f, "CR")
+                        for f in filter_]
+        combine = any if test == "anyof" else all
+        return lambda item: combine(prop_filter(item.vobject_item)
+                                    for prop_filter in prop_filters)
     raise ValueError("Unsupported filter %r for %r" %
                      (filter_.tag, collection_tag))
 
 
+def test_filter(collection_tag: str, item: radicale_item.Item,
+                filter_: ET.Element) -> bool:
+    """Match an item against a filter."""
+    return compile_filter(collection_tag, filter_)(item)
+
+
 class ApplicationPartReport(ApplicationBase):
 
     def do_REPORT(self, environ: types.WSGIEnviron, base_prefix: str,
@@ -808,7 +987,8 @@ class ApplicationPartReport(ApplicationBase):
             logger.debug("Client timed out", exc_info=True)
             return httputils.REQUEST_TIMEOUT
         with contextlib.ExitStack() as lock_stack:
-            lock_stack.enter_context(self._storage.acquire_lock("r", user))
+            lock_stack.enter_context(self._storage.acquire_lock(
+                "r", user, path=path, request="REPORT"))
             item = next(iter(self._storage.discover(path)), None)
             if not item:
                 return httputils.NOT_FOUND
@@ -821,23 +1001,42 @@ class ApplicationPartReport(ApplicationBase):
                 collection = item.collection
 
             max_occurrence = self.configuration.get("reporting", "max_freebusy_occurrence")
+            max_result_memory = self.configuration.get("reporting", "max_result_memory")
             if xml_content is not None and \
                xml_content.tag == xmlutils.make_clark("C:free-busy-query"):
                 try:
                     status, body = free_busy_report(
                         base_prefix, path, xml_content, collection, self._encoding,
-                        lock_stack.close, max_occurrence)
+                        lock_stack.close, max_occurrence, max_result_memory)
                 except ValueError as e:
                     logger.warning(
                         "Bad REPORT request on %r: %s", path, e, exc_info=True)
                     return httputils.BAD_REQUEST
                 headers = {"Content-Type": "text/calendar; charset=%s" % self._encoding}
                 return status, headers, str(body), xmlutils.pretty_xml(xml_content)
+            elif self._stream_multistatus:
+                try:
+                    status, xml_answer, responses = xml_report_stream(
+                        base_prefix, path, xml_content, collection, self._encoding,
+                        lock_stack.close, max_occurrence, user, remote_host, remote_useragent,
+                        max_result_memory)
+                except ValueError as e:
+                    logger.warning(
+                        "Bad REPORT request on %r: %s", path, e, exc_info=True)
+                    return httputils.BAD_REQUEST
+                headers = {"Content-Type": "text/xml; charset=%s" % self._encoding}
+                if status != client.MULTI_STATUS:
+                    return status, headers, self._xml_response(xml_answer), xmlutils.pretty_xml(xml_content)
+                # Errors of the responses abort the connection
+                return status, headers, httputils.ResponseStream(
+                    self._xml_multistatus_stream(itertools.chain(
+                        xml_answer, responses))), xmlutils.pretty_xml(xml_content)
             else:
                 try:
                     status, xml_answer = xml_report(
                         base_prefix, path, xml_content, collection, self._encoding,
-                        lock_stack.close, max_occurrence, user, remote_host, remote_useragent)
+                        lock_stack.close, max_occurrence, user, remote_host, remote_useragent,
+                        max_result_memory)
                 except ValueError as e:
                     logger.warning(
                         "Bad REPORT request on %r: %s", path, e, exc_info=True)
@@ -72,6 +72,12 @@ def logging_level(value: Any) -> str:
     return value
 
 
+def lock_granularity(value: Any) -> str:
+    if value not in ("storage", "principal"):
+        raise ValueError("unsupported lock granularity: %r" % value)
+    return value
+
+
 def profiling(value: Any) -> str:
     if value not in PROFILING:
         raise ValueError("unsupported profiling: %r" % value)
@@ -205,6 +211,10 @@ DEFAULT_CONFIG_SCHEMA: types.CONFIG_SCHEMA = OrderedDict([
             "value": "",
             "help": "script name to strip from URI if called by reverse proxy (default taken from HTTP_X_SCRIPT_NAME or SCRIPT_NAME)",
             "type": str}),
+        ("stream_multistatus", {
+            "value": "False",
+            "help": "send multistatus responses of PROPFIND and REPORT requests while they are generated",
+            "type": bool}),
         ("_internal_server", {
             "value": "False",
             "help": "the internal server is used",
@@ -426,10 +436,66 @@ DEFAULT_CONFIG_SCHEMA: types.CONFIG_SCHEMA = OrderedDict([
             "value": "False",
             "help": "use mtime and file size instead of SHA256 for 'item' cache (improves speed)",
             "type": bool}),
+        ("use_packed_item_cache", {
+            "value": "False",
+            "help": "use one packed file with index per collection for 'item' cache instead of one file per item",
+            "type": bool}),
+        ("use_time_range_index", {
+            "value": "False",
+            "help": "use a time range index per collection to select items for calendar queries",
+            "type": bool}),
+        ("use_uid_index", {
+            "value": "False",
+            "help": "use a UID index per collection for checking the uniqueness of UIDs",
+            "type": bool}),
+        ("use_ctag_cache", {
+            "value": "False",
+            "help": "keep the etag (ctag) and last modification time of collections in the cache and update them incrementally",
+            "type": bool}),
+        ("use_sync_journal", {
+            "value": "False",
+            "help": "use an append-only change journal per collection for sync-collection reports",
+            "type": bool}),
+        ("use_item_meta_index", {
+            "value": "False",
+            "help": "keep the metadata of the items of a collection in an index and load their text from the 'item' cache only when needed",
+            "type": bool}),
+        ("load_pickled_cache", {
+            "value": "True",
+            "help": "load 'item' cache, history and sync token files in pickle format of Radicale < 3.6.1",
+            "type": bool}),
+        ("item_cache_memory_entries", {
+            "value": "0",
+            "help": "number of 'item' cache entries kept in memory and shared across requests (0: disabled)",
+            "type": positive_int}),
+        ("item_cache_memory_size", {
+            "value": "0",
+            "help": "maximum size in bytes of 'item' cache entries kept in memory (0: unlimited)",
+            "type": positive_int}),
+        ("listing_cache_entries", {
+            "value": "0",
+            "help": "number of collection and cache folder listings kept in memory (0: disabled)",
+            "type": positive_int}),
+        ("use_inotify", {
+            "value": "False",
+            "help": "validate in-memory caches by inotify events instead of file status (Linux only)",
+            "type": bool}),
+        ("warm_cache_on_startup", {
+            "value": "False",
+            "help": "fill the 'item' cache of all collections in a background thread after server startup",
+            "type": bool}),
+        ("multiget_workers", {
+            "value": "0",
+            "help": "number of threads loading the items of multiget reports in parallel (0: disabled)",
+            "type": positive_int}),
         ("folder_umask", {
             "value": "",
             "help": "umask for folder creation (empty: system default)",
             "type": str}),
+        ("sqlite_file", {
+            "value": "",
+            "help": "path of the database of the sqlite backend (empty: radicale.sqlite in filesystem_folder)",
+            "type": filepath}),
         ("max_sync_token_age", {
             "value": "2592000",  # 30 days
             "help": "delete sync token that are older",
@@ -446,6 +512,18 @@ DEFAULT_CONFIG_SCHEMA: types.CONFIG_SCHEMA = OrderedDict([
             "value": "False",
             "help": "strict preconditions check on PUT",
             "type": bool}),
+        ("lock_granularity", {
+            "value": "storage",
+            "help": "lock the whole storage or the collections of each principal separately",
+            "type": lock_granularity}),
+        ("group_commit", {
+            "value": "False",
+            "help": "coalesce directory syncs of concurrent write requests",
+            "type": bool}),
+        ("group_commit_window", {
+            "value": "0.002",
+            "help": "time in seconds to wait for other write requests before syncing",
+            "type": positive_float}),
         ("_filesystem_fsync", {
             "value": "True",
             "help": "sync all changes to filesystem during requests",
@@ -597,6 +675,14 @@ This is an automated message. Please do not reply.""",
             "value": "False",
             "help": "log storage cache action on level=debug",
             "type": bool}),
+        ("storage_lock_statistics_interval", {
+            "value": "0",
+            "help": "log wait and hold times of storage locks every X seconds (0: disabled)",
+            "type": positive_int}),
+        ("storage_lock_wait_warning", {
+            "value": "0",
+            "help": "log holders of a storage lock if a request waited longer than X seconds (0: disabled)",
+            "type": positive_float}),
         ("profiling", {
             "value": "none",
             "help": "log profiling data level=info",
@@ -631,6 +717,10 @@ This is an automated message. Please do not reply.""",
         ("max_freebusy_occurrence", {
             "value": "10000",
             "help": "number of occurrences per event when reporting",
+            "type": positive_int}),
+        ("max_result_memory", {
+            "value": "0",
+            "help": "maximum size in bytes of the retrieved items of a report kept in memory, larger results are spilled to a temporary file (0: unlimited)",
             "type": positive_int})]))
     ])
 
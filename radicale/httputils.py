@@ -29,8 +29,10 @@ import os
 import pathlib
 import sys
 import time
+import zlib
 from http import client
-from typing import List, Mapping, Union, cast
+from typing import (Callable, Iterable, Iterator, List, Mapping, Optional,
+                    Union, cast)
 
 from radicale import config, pathutils, types, utils
 from radicale.log import logger
@@ -166,6 +168,49 @@ def redirect(location: str, status: int = client.FOUND) -> types.WSGIResponse:
             "Redirected to %s" % location, None)
 
 
+class ResponseStream:
+    """Content of a response that is generated while it is sent.
+
+    ``cleanup`` is called once when the response is closed by the WSGI
+    server (see PEP 3333), even if it wasn't sent completely.
+
+    """
+
+    _chunks: Iterator[bytes]
+    _cleanup: Optional[Callable[[], None]]
+
+    def __init__(self, chunks: Iterable[bytes],
+                 cleanup: Optional[Callable[[], None]] = None) -> None:
+        self._chunks = iter(chunks)
+        self._cleanup = cleanup
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        return next(self._chunks)
+
+    def close(self) -> None:
+        cleanup, self._cleanup = self._cleanup, None
+        try:
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
+        finally:
+            if cleanup is not None:
+                cleanup()
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress ``chunks`` with gzip while they are generated."""
+    zcomp = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = zcomp.compress(chunk)
+        if data:
+            yield data
+    yield zcomp.flush()
+
+
 def _serve_traversable(
         traversable: _TRAVERSABLE_LIKE_TYPE, base_prefix: str, path: str,
         path_prefix: str, index_file: str, mimetypes: Mapping[str, str],
@@ -366,6 +366,7 @@ class Item:
 
     _collection_path: str
     _text: Optional[str]
+    _load_text: Optional[Callable[[], str]]
     _vobject_item: Optional[vobject.base.Component]
     _etag: Optional[str]
     _uid: Optional[str]
@@ -384,7 +385,8 @@ class Item:
                  uid: Optional[str] = None,
                  name: Optional[str] = None,
                  component_name: Optional[str] = None,
-                 time_range: Optional[Tuple[int, int]] = None):
+                 time_range: Optional[Tuple[int, int]] = None,
+                 load_text: Optional[Callable[[], str]] = None):
         """Initialize an item.
 
         ``collection_path`` the path of the parent collection (optional if
@@ -412,10 +414,13 @@ class Item:
 
         ``time_range`` the enclosing time range. See ``find_time_range``.
 
+        ``load_text`` function that returns the text representation of the
+        item, called when it's needed for the first time (optional).
+
         """
-        if text is None and vobject_item is None:
-            raise ValueError(
-                "At least one of 'text' or 'vobject_item' must be set")
+        if text is None and vobject_item is None and load_text is None:
+            raise ValueError("At least one of 'text', 'vobject_item' or "
+                             "'load_text' must be set")
         if collection_path is None:
             if collection is None:
                 raise ValueError("At least one of 'collection_path' or "
@@ -428,6 +433,7 @@ class Item:
         self.href = href
         self.last_modified = last_modified
         self._text = text
+        self._load_text = load_text
         self._vobject_item = vobject_item
         self._etag = etag
         self._uid = uid
@@ -436,6 +442,9 @@ class Item:
         self._time_range = time_range
 
     def serialize(self) -> str:
+        if self._text is None and self._load_text is not None:
+            self._text = self._load_text()
+            self._load_text = None
         if self._text is None:
             try:
                 self._text = self.vobject_item.serialize()
@@ -449,7 +458,7 @@ class Item:
     def vobject_item(self):
         if self._vobject_item is None:
             try:
-                self._vobject_item = vobject.readOne(self._text)
+                self._vobject_item = vobject.readOne(self.serialize())
             except Exception as e:
                 raise RuntimeError("Failed to parse item %r from %r: %s" %
                                    (self.href, self._collection_path,
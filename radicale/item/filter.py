@@ -25,8 +25,8 @@ import sys
 import xml.etree.ElementTree as ET
 from datetime import date, datetime, timedelta, timezone
 from itertools import chain
-from typing import (Callable, Iterable, Iterator, List, Optional, Sequence,
-                    Tuple, Union)
+from typing import (Callable, Iterable, Iterator, List, Mapping, Optional,
+                    Sequence, Tuple, Union)
 
 import vobject
 
@@ -46,6 +46,18 @@ if sys.version_info < (3, 10):
 else:
     TRIGGER = datetime | None
 
+ItemPredicate = Callable[["item.Item"], bool]
+ComponentPredicate = Callable[[vobject.base.Component], bool]
+# Arguments: component, name of the component/property and trigger
+TimeRangePredicate = Callable[[vobject.base.Component, str, TRIGGER], bool]
+
+# Comparison functions of text-match with the value and the text
+TEXT_MATCH_TYPES: Mapping[str, Callable[[str, str], bool]] = {
+    "equals": str.__eq__,
+    "contains": lambda value, text: text in value,
+    "starts-with": str.startswith,
+    "ends-with": str.endswith}
+
 
 def date_to_datetime(d: date, tzinfo=vobject.icalendar.utc) -> datetime:
     """Transform any date to a UTC datetime.
@@ -85,13 +97,11 @@ def time_range_timestamps(time_filter: ET.Element) -> Tuple[int, int]:
     return (math.floor(start.timestamp()), math.ceil(end.timestamp()))
 
 
-def comp_match(item: "item.Item", filter_: ET.Element, level: int = 0) -> bool:
-    """Check whether the ``item`` matches the comp ``filter_``.
-
-    If ``level`` is ``0``, the filter is applied on the
-    item's collection. Otherwise, it's applied on the item.
+def compile_comp_filter(filter_: ET.Element, level: int = 0
+                        ) -> ItemPredicate:
+    """Compile the comp ``filter_`` into a predicate for items.
 
-    See rfc4791-9.7.1.
+    See ``comp_match``.
 
     """
 
@@ -99,156 +109,239 @@ def comp_match(item: "item.Item", filter_: ET.Element, level: int = 0) -> bool:
     # HACK: the filters are tested separately against all components
 
     name = filter_.get("name", "").upper()
-    logger.debug("TRACE/ITEM/FILTER/comp_match: name=%s level=%d", name, level)
-
-    if level == 0:
-        tag = item.name
-    elif level == 1:
-        tag = item.component_name
-    elif level == 2:
-        tag = item.component_name
-    else:
+    logger.debug("TRACE/ITEM/FILTER/compile_comp_filter: name=%s level=%d",
+                 name, level)
+
+    if level > 2:
         logger.warning(
             "Filters with %d levels of comp-filter are not supported", level)
-        return True
-    if not tag:
-        return False
+        return lambda item_: True
+
+    def get_tag(item_: "item.Item") -> str:
+        return item_.name if level == 0 else item_.component_name
+
     if len(filter_) == 0:
         # Point #1 of rfc4791-9.7.1
-        return name == tag
-    if len(filter_) == 1:
-        if filter_[0].tag == xmlutils.make_clark("C:is-not-defined"):
-            # Point #2 of rfc4791-9.7.1
-            return name != tag
-    if (level < 2) and (name != tag):
-        return False
+        def match_defined(item_: "item.Item") -> bool:
+            tag = get_tag(item_)
+            return bool(tag) and name == tag
+        return match_defined
+    if (len(filter_) == 1 and
+            filter_[0].tag == xmlutils.make_clark("C:is-not-defined")):
+        # Point #2 of rfc4791-9.7.1
+        def match_not_defined(item_: "item.Item") -> bool:
+            tag = get_tag(item_)
+            return bool(tag) and name != tag
+        return match_not_defined
     if ((level == 0 and name != "VCALENDAR") or
             (level == 1 and name not in ("VTODO", "VEVENT", "VJOURNAL")) or
-            (level == 2 and name not in ("VALARM"))):
+            (level == 2 and name != "VALARM")):
         logger.warning("Filtering %s is not supported", name)
-        return True
-    # Point #3 and #4 of rfc4791-9.7.1
-    trigger = None
-    if level == 0:
-        components = [item.vobject_item]
-    elif level == 1:
-        components = list(getattr(item.vobject_item, "%s_list" % tag.lower()))
-    elif level == 2:
-        components = list(getattr(item.vobject_item, "%s_list" % tag.lower()))
-        for comp in components:
-            subcomp = getattr(comp, name.lower(), None)
-            if not subcomp:
-                return False
-            if hasattr(subcomp, "trigger"):
-                # rfc4791-7.8.5:
-                trigger = subcomp.trigger.value
+
+        def match_unsupported(item_: "item.Item") -> bool:
+            tag = get_tag(item_)
+            return bool(tag) and (level == 2 or name == tag)
+        return match_unsupported
+
+    # Checks of the children in order, a matching check marked as final
+    # matches the whole filter
+    Check = Callable[["item.Item", str, List[vobject.base.Component],
+                      TRIGGER], bool]
+    checks: List[Tuple[Check, bool]] = []
     for child in filter_:
         if child.tag == xmlutils.make_clark("C:prop-filter"):
-            logger.debug("TRACE/ITEM/FILTER/comp_match: prop-filter level=%d", level)
-            if not any(prop_match(comp, child, "C")
-                       for comp in components):
-                return False
+            def check_prop(item_: "item.Item", tag: str,
+                           components: List[vobject.base.Component],
+                           trigger: TRIGGER,
+                           prop_filter: ComponentPredicate =
+                           compile_prop_filter(child, "C")) -> bool:
+                return any(prop_filter(comp) for comp in components)
+            checks.append((check_prop, False))
         elif child.tag == xmlutils.make_clark("C:time-range"):
-            logger.debug("TRACE/ITEM/FILTER/comp_match: time-range level=%d tag=%s", level, tag)
-            if (level == 0) and (name == "VCALENDAR"):
-                for name_try in ("VTODO", "VEVENT", "VJOURNAL"):
-                    try:
-                        if time_range_match(item.vobject_item, filter_[0], name_try, trigger):
-                            return True
-                    except Exception:
-                        continue
-                return False
-            if not time_range_match(item.vobject_item, filter_[0], tag, trigger):
-                return False
+            time_range = compile_time_range(child)
+            if level == 0:
+                def check_any_time_range(
+                        item_: "item.Item", tag: str,
+                        components: List[vobject.base.Component],
+                        trigger: TRIGGER,
+                        time_range: TimeRangePredicate = time_range) -> bool:
+                    for name_try in ("VTODO", "VEVENT", "VJOURNAL"):
+                        try:
+                            if time_range(item_.vobject_item, name_try,
+                                          trigger):
+                                return True
+                        except Exception:
+                            continue
+                    return False
+                checks.append((check_any_time_range, True))
+            else:
+                def check_time_range(
+                        item_: "item.Item", tag: str,
+                        components: List[vobject.base.Component],
+                        trigger: TRIGGER,
+                        time_range: TimeRangePredicate = time_range) -> bool:
+                    return time_range(item_.vobject_item, tag, trigger)
+                checks.append((check_time_range, False))
         elif child.tag == xmlutils.make_clark("C:comp-filter"):
-            logger.debug("TRACE/ITEM/FILTER/comp_match: comp-filter level=%d", level)
-            if not comp_match(item, child, level=level + 1):
-                return False
+            def check_comp(item_: "item.Item", tag: str,
+                           components: List[vobject.base.Component],
+                           trigger: TRIGGER,
+                           comp_filter: ItemPredicate =
+                           compile_comp_filter(child, level + 1)) -> bool:
+                return comp_filter(item_)
+            checks.append((check_comp, False))
         else:
             raise ValueError("Unexpected %r in comp-filter" % child.tag)
-    return True
 
+    def match(item_: "item.Item") -> bool:
+        tag = get_tag(item_)
+        if not tag or (level < 2 and name != tag):
+            return False
+        # Point #3 and #4 of rfc4791-9.7.1
+        trigger = None
+        if level == 0:
+            components = [item_.vobject_item]
+        else:
+            components = list(getattr(item_.vobject_item,
+                                      "%s_list" % tag.lower()))
+        if level == 2:
+            for comp in components:
+                subcomp = getattr(comp, name.lower(), None)
+                if not subcomp:
+                    return False
+                if hasattr(subcomp, "trigger"):
+                    # rfc4791-7.8.5:
+                    trigger = subcomp.trigger.value
+        for check, final in checks:
+            if not check(item_, tag, components, trigger):
+                return False
+            if final:
+                return True
+        return True
+    return match
 
-def prop_match(vobject_item: vobject.base.Component,
-               filter_: ET.Element, ns: str) -> bool:
-    """Check whether the ``item`` matches the prop ``filter_``.
 
-    See rfc4791-9.7.2 and rfc6352-10.5.1.
+def comp_match(item: "item.Item", filter_: ET.Element, level: int = 0) -> bool:
+    """Check whether the ``item`` matches the comp ``filter_``.
+
+    If ``level`` is ``0``, the filter is applied on the
+    item's collection. Otherwise, it's applied on the item.
+
+    See rfc4791-9.7.1.
+
+    """
+    return compile_comp_filter(filter_, level)(item)
+
+
+def compile_prop_filter(filter_: ET.Element, ns: str) -> ComponentPredicate:
+    """Compile the prop ``filter_`` into a predicate for components.
+
+    See ``prop_match``.
 
     """
     name = filter_.get("name", "").lower()
     if len(filter_) == 0:
         # Point #1 of rfc4791-9.7.2
-        return name in vobject_item.contents
-    if len(filter_) == 1:
-        if filter_[0].tag == xmlutils.make_clark("%s:is-not-defined" % ns):
-            # Point #2 of rfc4791-9.7.2
-            return name not in vobject_item.contents
-    if name not in vobject_item.contents:
-        return False
+        return lambda vobject_item: name in vobject_item.contents
+    if (len(filter_) == 1 and filter_[0].tag ==
+            xmlutils.make_clark("%s:is-not-defined" % ns)):
+        # Point #2 of rfc4791-9.7.2
+        return lambda vobject_item: name not in vobject_item.contents
     # Point #3 and #4 of rfc4791-9.7.2
+    predicates: List[ComponentPredicate] = []
     for child in filter_:
         if ns == "C" and child.tag == xmlutils.make_clark("C:time-range"):
-            if not time_range_match(vobject_item, child, name, None):
-                return False
+            def match_time_range(vobject_item: vobject.base.Component,
+                                 time_range: TimeRangePredicate =
+                                 compile_time_range(child)) -> bool:
+                return time_range(vobject_item, name, None)
+            predicates.append(match_time_range)
         elif child.tag == xmlutils.make_clark("%s:text-match" % ns):
-            if not text_match(vobject_item, child, name, ns):
-                return False
+            predicates.append(compile_text_match(child, name, ns))
         elif child.tag == xmlutils.make_clark("%s:param-filter" % ns):
-            if not param_filter_match(vobject_item, child, name, ns):
-                return False
+            predicates.append(compile_param_filter(child, name, ns))
         else:
             raise ValueError("Unexpected %r in prop-filter" % child.tag)
-    return True
 
+    def match(vobject_item: vobject.base.Component) -> bool:
+        return (name in vobject_item.contents and
+                all(predicate(vobject_item) for predicate in predicates))
+    return match
 
-def time_range_match(vobject_item: vobject.base.Component,
-                     filter_: ET.Element, child_name: str, trigger: TRIGGER) -> bool:
-    """Check whether the component/property ``child_name`` of
-       ``vobject_item`` matches the time-range ``filter_``."""
+
+def prop_match(vobject_item: vobject.base.Component,
+               filter_: ET.Element, ns: str) -> bool:
+    """Check whether the ``item`` matches the prop ``filter_``.
+
+    See rfc4791-9.7.2 and rfc6352-10.5.1.
+
+    """
+    return compile_prop_filter(filter_, ns)(vobject_item)
+
+
+def compile_time_range(filter_: ET.Element) -> TimeRangePredicate:
+    """Compile the time-range ``filter_`` into a predicate for the
+    component/property ``child_name`` of components with an optional
+    ``trigger``.
+
+    See ``time_range_match``.
+
+    """
     # supporting since 3.5.4 now optional trigger (either absolute or relative offset)
 
     if not filter_.get("start") and not filter_.get("end"):
-        return False
+        return lambda vobject_item, child_name, trigger: False
 
     start, end = parse_time_range(filter_)
-    matched = False
-
-    def range_fn(range_start: datetime, range_end: datetime,
-                 is_recurrence: bool) -> bool:
-        nonlocal matched
-        if trigger:
-            # if trigger is given, only check range_start
-            if isinstance(trigger, timedelta):
-                # trigger is a offset, apply to range_start
-                if start < range_start + trigger and range_start + trigger < end:
-                    matched = True
-                    return True
+    logger.debug("TRACE/ITEM/FILTER/compile_time_range: start=(%s) end=(%s)",
+                 start, end)
+
+    def match(vobject_item: vobject.base.Component, child_name: str,
+              trigger: TRIGGER) -> bool:
+        matched = False
+
+        def range_fn(range_start: datetime, range_end: datetime,
+                     is_recurrence: bool) -> bool:
+            nonlocal matched
+            if trigger:
+                # if trigger is given, only check range_start
+                if isinstance(trigger, timedelta):
+                    # trigger is a offset, apply to range_start
+                    if start < range_start + trigger and range_start + trigger < end:
+                        matched = True
+                        return True
+                    else:
+                        return False
+                elif isinstance(trigger, datetime):
+                    # trigger is absolute, use instead of range_start
+                    if start < trigger and trigger < end:
+                        matched = True
+                        return True
+                    else:
+                        return False
                 else:
-                    return False
-            elif isinstance(trigger, datetime):
-                # trigger is absolute, use instead of range_start
-                if start < trigger and trigger < end:
-                    matched = True
+                    logger.warning("item/filter/time_range_match/range_fn: unsupported data format of provided trigger=%r", trigger)
                     return True
-                else:
-                    return False
-            else:
-                logger.warning("item/filter/time_range_match/range_fn: unsupported data format of provided trigger=%r", trigger)
+            if start < range_end and range_start < end:
+                matched = True
                 return True
-        if start < range_end and range_start < end:
-            matched = True
-            return True
-        if end < range_start and not is_recurrence:
-            return True
-        return False
+            if end < range_start and not is_recurrence:
+                return True
+            return False
 
-    def infinity_fn(start: datetime) -> bool:
-        return False
+        def infinity_fn(start: datetime) -> bool:
+            return False
 
-    logger.debug("TRACE/ITEM/FILTER/time_range_match: start=(%s) end=(%s) child_name=%s", start, end, child_name)
-    visit_time_ranges(vobject_item, child_name, range_fn, infinity_fn)
-    return matched
+        visit_time_ranges(vobject_item, child_name, range_fn, infinity_fn)
+        return matched
+    return match
+
+
+def time_range_match(vobject_item: vobject.base.Component,
+                     filter_: ET.Element, child_name: str, trigger: TRIGGER) -> bool:
+    """Check whether the component/property ``child_name`` of
+       ``vobject_item`` matches the time-range ``filter_``."""
+    return compile_time_range(filter_)(vobject_item, child_name, trigger)
 
 
 def time_range_fill(vobject_item: vobject.base.Component,
@@ -561,12 +654,12 @@ def visit_time_ranges(vobject_item: vobject.base.Component, child_name: str,
                 range_fn(child, child + DAY, False)
 
 
-def text_match(vobject_item: vobject.base.Component,
-               filter_: ET.Element, child_name: str, ns: str,
-               attrib_name: Optional[str] = None) -> bool:
-    """Check whether the ``item`` matches the text-match ``filter_``.
+def compile_text_match(filter_: ET.Element, child_name: str, ns: str,
+                       attrib_name: Optional[str] = None
+                       ) -> ComponentPredicate:
+    """Compile the text-match ``filter_`` into a predicate for components.
 
-    See rfc4791-9.7.5.
+    See ``text_match``.
 
     """
     # TODO: collations are not supported, but the default ones needed
@@ -576,56 +669,72 @@ def text_match(vobject_item: vobject.base.Component,
     match_type = "contains"
     if ns == "CR":
         match_type = filter_.get("match-type", match_type)
-
-    def match(value: str) -> bool:
-        value = value.lower()
-        if match_type == "equals":
-            return value == text
-        if match_type == "contains":
-            return text in value
-        if match_type == "starts-with":
-            return value.startswith(text)
-        if match_type == "ends-with":
-            return value.endswith(text)
+    compare = TEXT_MATCH_TYPES.get(match_type)
+    if compare is None:
         raise ValueError("Unexpected text-match match-type: %r" % match_type)
-
-    children = getattr(vobject_item, "%s_list" % child_name, [])
-    if attrib_name is not None:
-        condition = any(
-            match(attrib) for child in children
-            for attrib in child.params.get(attrib_name, []))
-    else:
-        res = []
-        for child in children:
+    negate = filter_.get("negate-condition") == "yes"
+    list_name = "%s_list" % child_name
+
+    def match(vobject_item: vobject.base.Component) -> bool:
+        assert compare is not None
+        children = getattr(vobject_item, list_name, [])
+        if attrib_name is not None:
+            condition = any(
+                compare(attrib.lower(), text) for child in children
+                for attrib in child.params.get(attrib_name, []))
+        else:
             # Some filters such as CATEGORIES provide a list in child.value
-            if type(child.value) is list:
-                for value in child.value:
-                    res.append(match(value))
-            else:
-                res.append(match(child.value))
-        condition = any(res)
-    if filter_.get("negate-condition") == "yes":
-        return not condition
-    return condition
+            condition = any(
+                compare(value.lower(), text) for child in children
+                for value in (child.value if type(child.value) is list else
+                              (child.value,)))
+        return condition != negate
+    return match
 
 
-def param_filter_match(vobject_item: vobject.base.Component,
-                       filter_: ET.Element, parent_name: str, ns: str) -> bool:
-    """Check whether the ``item`` matches the param-filter ``filter_``.
+def text_match(vobject_item: vobject.base.Component,
+               filter_: ET.Element, child_name: str, ns: str,
+               attrib_name: Optional[str] = None) -> bool:
+    """Check whether the ``item`` matches the text-match ``filter_``.
+
+    See rfc4791-9.7.5.
+
+    """
+    return compile_text_match(filter_, child_name, ns, attrib_name)(
+        vobject_item)
 
-    See rfc4791-9.7.3.
+
+def compile_param_filter(filter_: ET.Element, parent_name: str, ns: str
+                         ) -> ComponentPredicate:
+    """Compile the param-filter ``filter_`` into a predicate for components.
+
+    See ``param_filter_match``.
 
     """
     name = filter_.get("name", "").upper()
-    children = getattr(vobject_item, "%s_list" % parent_name, [])
-    condition = any(name in child.params for child in children)
+    list_name = "%s_list" % parent_name
+
+    def match_defined(vobject_item: vobject.base.Component) -> bool:
+        children = getattr(vobject_item, list_name, [])
+        return any(name in child.params for child in children)
     if len(filter_) > 0:
         if filter_[0].tag == xmlutils.make_clark("%s:text-match" % ns):
-            return condition and text_match(
-                vobject_item, filter_[0], parent_name, ns, name)
+            text = compile_text_match(filter_[0], parent_name, ns, name)
+            return lambda vobject_item: (match_defined(vobject_item) and
+                                         text(vobject_item))
         if filter_[0].tag == xmlutils.make_clark("%s:is-not-defined" % ns):
-            return not condition
-    return condition
+            return lambda vobject_item: not match_defined(vobject_item)
+    return match_defined
+
+
+def param_filter_match(vobject_item: vobject.base.Component,
+                       filter_: ET.Element, parent_name: str, ns: str) -> bool:
+    """Check whether the ``item`` matches the param-filter ``filter_``.
+
+    See rfc4791-9.7.3.
+
+    """
+    return compile_param_filter(filter_, parent_name, ns)(vobject_item)
 
 
 def simplify_prefilters(filters: Iterable[ET.Element], collection_tag: str
@@ -29,7 +29,7 @@ import posixpath
 import sys
 import threading
 from tempfile import TemporaryDirectory
-from typing import Iterator, Type, Union
+from typing import Iterator, Optional, Type, Union
 
 from radicale import storage, types, utils
 
@@ -90,6 +90,11 @@ if sys.platform == "linux":
             ctypes.c_uint]
         renameat2.restype = ctypes.c_int
 
+    # Unnamed temporary files are linked into the file system via procfs
+    O_TMPFILE: int = 0
+    if os.path.isdir("/proc/self/fd"):
+        O_TMPFILE = getattr(os, "O_TMPFILE", 0)
+
 if sys.platform == "darwin":
     # Definition missing in PyPy
     F_FULLFSYNC: int = getattr(fcntl, "F_FULLFSYNC", 51)
@@ -198,6 +203,47 @@ def rename_exchange(src: str, dst: str) -> None:
         os.rename(os.path.join(tmp_dir, "interim"), src)
 
 
+def open_tmpfile(directory: str) -> Optional[int]:
+    """Open an unnamed file for reading and writing in `directory`.
+
+    The file is discarded when it's closed without calling `link_tmpfile`.
+    Returns ``None`` if not supported by the platform or file system.
+
+    """
+    if sys.platform != "linux" or not O_TMPFILE:
+        return None
+    try:
+        return os.open(directory, O_TMPFILE | os.O_RDWR, 0o666)
+    except OSError as e:
+        # EISDIR: not supported by kernel
+        # EOPNOTSUPP: not supported by file system
+        if e.errno not in (errno.EISDIR, errno.EOPNOTSUPP):
+            raise
+        return None
+
+
+def link_tmpfile(fd: int, dst: str) -> None:
+    """Give the unnamed file `fd` the name `dst`.
+
+    An existing file at `dst` is replaced atomically.
+
+    """
+    src = "/proc/self/fd/%d" % fd
+    try:
+        os.link(src, dst)
+        return
+    except FileExistsError:
+        pass
+    tmp = os.path.join(os.path.dirname(dst),
+                       ".Radicale.tmp-" + os.urandom(8).hex())
+    os.link(src, tmp)
+    try:
+        os.replace(tmp, dst)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
 def fsync(fd: int) -> None:
     if sys.platform == "darwin":
         try:
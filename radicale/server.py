@@ -31,6 +31,7 @@ import socket
 import socketserver
 import ssl
 import sys
+import wsgiref.headers
 import wsgiref.simple_server
 from typing import (Any, Callable, Dict, List, MutableMapping, Optional, Set,
                     Tuple, Union)
@@ -231,10 +232,45 @@ class ServerHandler(wsgiref.simple_server.ServerHandler):
     # Don't pollute WSGI environ with OS environment
     os_environ: MutableMapping[str, str] = {}
 
+    # HACK: Assigned in `wsgiref.handlers.BaseHandler`
+    environ: Dict[str, Any]
+    headers: wsgiref.headers.Headers
+    headers_sent: bool
+
+    # Content of unknown length is sent with chunked transfer encoding
+    _chunked: bool = False
+
     def log_exception(self, exc_info) -> None:
         logger.error("An exception occurred during request: %s",
                      exc_info[1], exc_info=exc_info)  # type:ignore[arg-type]
 
+    def cleanup_headers(self) -> None:
+        super().cleanup_headers()
+        if ("Content-Length" not in self.headers and
+                self.environ.get("SERVER_PROTOCOL") == "HTTP/1.1" and
+                self.environ.get("REQUEST_METHOD") != "HEAD"):
+            # Clients can distinguish complete responses from aborted ones
+            self._chunked = True
+            self.http_version = "1.1"
+            self.headers["Transfer-Encoding"] = "chunked"
+            self.headers["Connection"] = "close"
+
+    def write(self, data: bytes) -> None:
+        if not self.headers_sent:
+            # The transfer encoding is selected when the headers are sent
+            super().write(b"")
+        if self._chunked:
+            if not data:
+                return
+            data = b"%x\r\n%s\r\n" % (len(data), data)
+        super().write(data)
+
+    def finish_content(self) -> None:
+        super().finish_content()
+        if self._chunked:
+            self._write(b"0\r\n\r\n")
+            self._flush()
+
 
 class RequestHandler(wsgiref.simple_server.WSGIRequestHandler):
     """HTTP requests handler."""
@@ -307,6 +343,8 @@ def serve(configuration: config.Configuration,
     use_ssl: bool = configuration.get("server", "ssl")
     server_class = ParallelHTTPSServer if use_ssl else ParallelHTTPServer
     application = Application(configuration)
+    if configuration.get("storage", "warm_cache_on_startup"):
+        application.start_cache_warmer()
     servers = {}
     try:
         hosts: List[Tuple[str, int]] = configuration.get("server", "hosts")
@@ -24,11 +24,16 @@ Take a look at the class ``BaseCollection`` if you want to implement your own.
 
 """
 
+import contextlib
 import json
+import os
+import sys
+import threading
 import xml.etree.ElementTree as ET
 from hashlib import sha256
-from typing import (Callable, ContextManager, Dict, Iterable, Iterator, List,
-                    Mapping, Optional, Sequence, Set, Tuple, Union, overload)
+from typing import (AbstractSet, Callable, ClassVar, ContextManager, Dict,
+                    FrozenSet, Iterable, Iterator, List, Mapping, Optional,
+                    Sequence, Set, Tuple, Union, overload)
 
 import vobject
 
@@ -39,7 +44,8 @@ from radicale.item import filter as radicale_filter
 from radicale.log import logger
 from radicale.utils import format_ut
 
-INTERNAL_TYPES: Sequence[str] = ("multifilesystem", "multifilesystem_nolock",)
+INTERNAL_TYPES: Sequence[str] = (
+    "multifilesystem", "multifilesystem_nolock", "sqlite")
 
 # NOTE: change only if cache structure is modified to avoid cache invalidation on update
 CACHE_VERSION_RADICALE = "3.3.1"
@@ -47,6 +53,13 @@ CACHE_VERSION_RADICALE = "3.3.1"
 CACHE_VERSION: bytes = (
             "%s=%s;%s=%s;" % ("radicale", CACHE_VERSION_RADICALE, "vobject", utils.package_version("vobject"))).encode()
 
+# Fields of items that can be requested with ``projection``, ``href`` and
+# ``collection`` are always available. "text" stands for ``serialize()``
+# and ``vobject_item``.
+ITEM_FIELDS: FrozenSet[str] = frozenset((
+    "etag", "last_modified", "uid", "name", "component_name", "time_range",
+    "text"))
+
 
 def load(configuration: "config.Configuration") -> "BaseStorage":
     """Load the storage module chosen in configuration."""
@@ -71,6 +84,10 @@ class ComponentNotFoundError(ValueError):
 
 class BaseCollection:
 
+    # The methods ``get_multi``, ``get_all`` and ``get_filtered`` accept the
+    # optional argument ``projection``
+    supports_projection: ClassVar[bool] = False
+
     @property
     def path(self) -> str:
         """The sanitized path of the collection without leading or
@@ -91,7 +108,7 @@ class BaseCollection:
     def etag(self) -> str:
         """Encoded as quoted-string (see RFC 2616)."""
         etag = sha256()
-        for item in self.get_all():
+        for item in self._get_all_projected({"etag"}):
             assert item.href
             etag.update((item.href + "/" + item.etag).encode())
         etag.update(json.dumps(self.get_meta(), sort_keys=True).encode())
@@ -115,7 +132,7 @@ class BaseCollection:
         """
 
         def hrefs_iter() -> Iterator[str]:
-            for item in self.get_all():
+            for item in self._get_all_projected(frozenset()):
                 assert item.href
                 yield item.href
 
@@ -124,7 +141,9 @@ class BaseCollection:
             raise ValueError("Sync token are not supported")
         return token, hrefs_iter()
 
-    def get_multi(self, hrefs: Iterable[str]) -> Iterable[Tuple[str, Optional["radicale_item.Item"]]]:
+    def get_multi(self, hrefs: Iterable[str],
+                  projection: Optional[AbstractSet[str]] = None
+                  ) -> Iterable[Tuple[str, Optional["radicale_item.Item"]]]:
         """Fetch multiple items.
 
         It's not required to return the requested items in the correct order.
@@ -133,14 +152,25 @@ class BaseCollection:
         Returns tuples with the href and the item or None if the item doesn't
         exist.
 
+        ``projection`` is the set of fields (see ``ITEM_FIELDS``) the caller
+        uses or ``None`` if all fields are used. It's a hint, the other
+        fields must still be accessible, e.g. by loading them on access.
+        It's only passed if ``supports_projection`` is set.
+
         """
         raise NotImplementedError
 
-    def get_all(self) -> Iterable["radicale_item.Item"]:
-        """Fetch all items."""
+    def get_all(self, projection: Optional[AbstractSet[str]] = None
+                ) -> Iterable["radicale_item.Item"]:
+        """Fetch all items.
+
+        ``projection`` see ``get_multi``.
+
+        """
         raise NotImplementedError
 
-    def get_filtered(self, filters: Iterable[ET.Element]
+    def get_filtered(self, filters: Iterable[ET.Element],
+                     projection: Optional[AbstractSet[str]] = None
                      ) -> Iterable[Tuple["radicale_item.Item", bool]]:
         """Fetch all items with optional filtering.
 
@@ -151,13 +181,17 @@ class BaseCollection:
         ``filters_matched`` is a bool that indicates if ``filters`` are fully
         matched.
 
+        ``projection`` see ``get_multi``.
+
         """
         if not self.tag:
             return
         tag, start, end, simple = radicale_filter.simplify_prefilters(
             filters, self.tag)
         logger.debug("TRACE/STORAGE/get_filtered: prefilter tag=%s start=%s end=%s simple=%s", tag, format_ut(start), format_ut(end), simple)
-        for item in self.get_all():
+        if projection is not None:
+            projection = {"component_name", "time_range", *projection}
+        for item in self._get_all_projected(projection):
             logger.debug("TRACE/STORAGE/get_filtered: component_name=%s tag=%s", item.component_name, tag)
             if tag is not None and tag != item.component_name:
                 continue
@@ -171,11 +205,18 @@ class BaseCollection:
 
     def has_uid(self, uid: str) -> bool:
         """Check if a UID exists in the collection."""
-        for item in self.get_all():
+        for item in self._get_all_projected({"uid"}):
             if item.uid == uid:
                 return True
         return False
 
+    def _get_all_projected(self, projection: Optional[AbstractSet[str]]
+                           ) -> Iterable["radicale_item.Item"]:
+        """Fetch all items with ``projection`` if it's supported."""
+        if self.supports_projection:
+            return self.get_all(projection=projection)
+        return self.get_all()
+
     def upload(self, href: str, item: "radicale_item.Item") -> (
             Tuple)["radicale_item.Item", Optional["radicale_item.Item"]]:
         """Upload a new or replace an existing item.
@@ -288,6 +329,12 @@ class BaseCollection:
 
 class BaseStorage:
 
+    # The method ``discover`` accepts the optional argument ``projection``
+    supports_projection: ClassVar[bool] = False
+    # The method ``verify`` accepts the optional arguments ``processes`` and
+    # ``incremental``
+    supports_verify_options: ClassVar[bool] = False
+
     def __init__(self, configuration: "config.Configuration") -> None:
         """Initialize BaseStorage.
 
@@ -301,7 +348,9 @@ class BaseStorage:
     def discover(
             self, path: str, depth: str = "0",
             child_context_manager: Optional[Callable[[str, Optional[str]], ContextManager[None]]] = None,
-            user_groups: Set[str] = set([])) -> Iterable["types.CollectionOrItem"]:
+            user_groups: Set[str] = set([]),
+            projection: Optional[AbstractSet[str]] = None
+            ) -> Iterable["types.CollectionOrItem"]:
         """Discover a list of collections under the given ``path``.
 
         ``path`` is sanitized.
@@ -314,6 +363,10 @@ class BaseStorage:
 
         The root collection "/" must always exist.
 
+        ``projection`` applies to returned items, see
+        ``BaseCollection.get_multi``. It's only passed if
+        ``supports_projection`` is set.
+
         """
         raise NotImplementedError
 
@@ -363,9 +416,54 @@ class BaseStorage:
 
         ``user`` is the name of the logged in user or empty.
 
+        The keyword arguments ``path`` and ``to_path`` name the collections
+        or items that are accessed, storages can lock only parts of the
+        storage if they are given. ``user_groups`` names the groups whose
+        collections are accessed in addition.
+
         """
         raise NotImplementedError
 
-    def verify(self) -> bool:
-        """Check the storage for errors."""
+    def verify(self, processes: int = 0, incremental: bool = False) -> bool:
+        """Check the storage for errors.
+
+        ``processes`` is the number of worker processes (0 or 1: work in the
+        current thread).
+
+        ``incremental`` skips collections that are unchanged since their
+        last successful verification, if supported by the storage.
+
+        The arguments are only passed if ``supports_verify_options`` is set.
+
+        """
         raise NotImplementedError
+
+    def warm_cache(self, processes: int = 0) -> bool:
+        """Fill the caches of the storage.
+
+        ``processes`` is the number of worker processes (0 or 1: work in the
+        current thread).
+
+        Returns ``False`` if broken items were found.
+
+        """
+        return True
+
+    def start_cache_warmer(self) -> threading.Thread:
+        """Fill the caches of the storage in a background thread with low
+        priority."""
+        def run() -> None:
+            if sys.platform == "linux":
+                # The nice value of a single thread can be changed on Linux
+                with contextlib.suppress(OSError):
+                    os.setpriority(os.PRIO_PROCESS, threading.get_native_id(),
+                                   19)
+            try:
+                self.warm_cache()
+            except Exception as e:
+                logger.error("An exception occurred during cache warming: "
+                             "%s", e, exc_info=True)
+        thread = threading.Thread(target=run, name="radicale-warm-cache",
+                                  daemon=True)
+        thread.start()
+        return thread
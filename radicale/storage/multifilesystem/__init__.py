@@ -35,6 +35,7 @@ from radicale.storage.multifilesystem.base import CollectionBase, StorageBase
 from radicale.storage.multifilesystem.cache import CollectionPartCache
 from radicale.storage.multifilesystem.create_collection import \
     StoragePartCreateCollection
+from radicale.storage.multifilesystem.ctag import CollectionPartCtag
 from radicale.storage.multifilesystem.delete import CollectionPartDelete
 from radicale.storage.multifilesystem.discover import StoragePartDiscover
 from radicale.storage.multifilesystem.get import CollectionPartGet
@@ -44,8 +45,10 @@ from radicale.storage.multifilesystem.lock import (CollectionPartLock,
 from radicale.storage.multifilesystem.meta import CollectionPartMeta
 from radicale.storage.multifilesystem.move import StoragePartMove
 from radicale.storage.multifilesystem.sync import CollectionPartSync
+from radicale.storage.multifilesystem.uid import CollectionPartUid
 from radicale.storage.multifilesystem.upload import CollectionPartUpload
 from radicale.storage.multifilesystem.verify import StoragePartVerify
+from radicale.storage.multifilesystem.warm import StoragePartWarm
 
 # 999 second, 999 ms, 999 us, 999 ns
 MTIME_NS_TEST: int = 999999999999
@@ -53,8 +56,9 @@ MTIME_NS_TEST: int = 999999999999
 
 class Collection(
         CollectionPartDelete, CollectionPartMeta, CollectionPartSync,
-        CollectionPartUpload, CollectionPartGet, CollectionPartCache,
-        CollectionPartLock, CollectionPartHistory, CollectionBase):
+        CollectionPartUpload, CollectionPartCtag, CollectionPartUid,
+        CollectionPartGet, CollectionPartCache, CollectionPartLock,
+        CollectionPartHistory, CollectionBase):
 
     _etag_cache: Optional[str]
 
@@ -69,6 +73,11 @@ class Collection(
 
     @property
     def last_modified(self) -> str:
+        if self._storage._use_ctag_cache:
+            last = self._get_last_modified_ns() / 1e9
+            return time.strftime("%a, %d %b %Y %H:%M:%S GMT",
+                                 time.gmtime(last))
+
         def relevant_files_iter() -> Iterator[str]:
             yield self._filesystem_path
             if os.path.exists(self._props_path):
@@ -81,14 +90,14 @@ class Collection(
     @property
     def etag(self) -> str:
         # reuse cached value if the storage is read-only
-        if self._storage._lock.locked == "w" or self._etag_cache is None:
+        if self._storage._lock_mode(self.path) == "w" or self._etag_cache is None:
             self._etag_cache = super().etag
         return self._etag_cache
 
 
 class Storage(
-        StoragePartCreateCollection, StoragePartLock, StoragePartMove,
-        StoragePartVerify, StoragePartDiscover, StorageBase):
+        StoragePartCreateCollection, StoragePartWarm, StoragePartLock,
+        StoragePartMove, StoragePartVerify, StoragePartDiscover, StorageBase):
 
     _collection_class: ClassVar[Type[Collection]] = Collection
 
@@ -175,6 +184,33 @@ class Storage(
         logger.info("Storage cache subfolder usage for 'history': %s", self._use_cache_subfolder_for_history)
         logger.info("Storage cache subfolder usage for 'sync-token': %s", self._use_cache_subfolder_for_synctoken)
         logger.info("Storage cache use mtime and size for 'item': %s", self._use_mtime_and_size_for_item_cache)
+        logger.info("Storage cache use packed file for 'item': %s", self._use_packed_item_cache)
+        logger.info("Storage cache use time range index: %s", self._use_time_range_index)
+        logger.info("Storage cache use UID index: %s", self._use_uid_index)
+        logger.info("Storage cache use ctag cache: %s", self._use_ctag_cache)
+        logger.info("Storage cache use sync journal: %s", self._use_sync_journal)
+        logger.info("Storage cache use item meta index: %s", self._use_item_meta_index)
+        if self._group_commit is not None:
+            logger.info("Storage group commit: enabled with window %.3f seconds", self._group_commit.window)
+        else:
+            logger.info("Storage group commit: disabled")
+        if self._item_cache_memory is not None:
+            logger.info("Storage memory cache for 'item': %d entries, %s", self._item_cache_memory.max_entries,
+                        "%d bytes" % self._item_cache_memory.max_size if self._item_cache_memory.max_size else "unlimited size")
+        else:
+            logger.info("Storage memory cache for 'item': disabled")
+        if self._listing_cache is not None:
+            logger.info("Storage memory cache for listings: %d entries",
+                        self._listing_cache.max_entries)
+        else:
+            logger.info("Storage memory cache for listings: disabled")
+        logger.info("Storage cache validation by inotify: %s",
+                    "enabled" if self._inotify is not None else "disabled")
+        if self._multiget_executor is not None:
+            logger.info("Storage multiget: %d parallel workers",
+                        self._multiget_workers)
+        else:
+            logger.info("Storage multiget: sequential")
         try:
             (precision, precision_unit, unit) = self._analyse_mtime()
             if precision >= 100000000:
@@ -17,17 +17,35 @@
 # You should have received a copy of the GNU General Public License
 # along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
 
+import errno
+import functools
+import json
 import os
+import shutil
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
 from tempfile import TemporaryDirectory
-from typing import IO, AnyStr, ClassVar, Iterator, Optional, Type
+from typing import (IO, AnyStr, ClassVar, FrozenSet, Iterator, Mapping,
+                    Optional, Tuple, Type)
 
 from radicale import config, logger, pathutils, storage, types, utils
 from radicale.storage import multifilesystem  # noqa:F401
+from radicale.storage.multifilesystem.groupcommit import GroupCommit
+from radicale.storage.multifilesystem.inotify import Inotify
+from radicale.storage.multifilesystem.lockstats import LockStats
+from radicale.storage.multifilesystem.memory import LRUCache
+
+# Listings of folders modified less than this number of nanoseconds before
+# they were scanned are not cached, modifications within the granularity of
+# the mtime of the file system might go unnoticed otherwise
+LISTING_RACY_NS: int = 2 * 10**9
 
 
 class CollectionBase(storage.BaseCollection):
 
+    supports_projection: ClassVar[bool] = True
     _storage: "multifilesystem.Storage"
     _path: str
     _encoding: str
@@ -46,12 +64,83 @@ class CollectionBase(storage.BaseCollection):
             filesystem_path = pathutils.path_to_filesystem(folder, self.path)
         self._filesystem_path = filesystem_path
 
+    def _folder_signature(self) -> tuple:
+        """Identify the state of the collection folder.
+
+        Adding, replacing or removing files in the folder changes its mtime.
+
+        """
+        st = os.stat(self._filesystem_path)
+        return (st.st_ino, st.st_mtime_ns)
+
+    def _items_signature(self) -> Optional[tuple]:
+        """Identify the state of the collection folder and of its files.
+
+        Files edited in place don't change the mtime of the folder, inode,
+        size and mtime of all files are included. Returns ``None`` if the
+        folder or a file was modified so recently that further modifications
+        might go unnoticed within the granularity of the mtime of the file
+        system.
+
+        """
+        scan_ns = time.time_ns()
+        folder_signature = self._folder_signature()
+
+        def racy(mtime_ns: int) -> bool:
+            return abs(scan_ns - mtime_ns) < LISTING_RACY_NS
+        if racy(folder_signature[1]):
+            return None
+        files = []
+        with os.scandir(self._filesystem_path) as it:
+            for entry in it:
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except FileNotFoundError:
+                    # Race: Another process might have deleted the file.
+                    return None
+                if racy(st.st_mtime_ns):
+                    return None
+                files.append((entry.name, st.st_ino, st.st_size,
+                              st.st_mtime_ns))
+        digest = sha256(json.dumps(sorted(files)).encode()).hexdigest()
+        return (*folder_signature, digest)
+
     # TODO: better fix for "mypy"
     @types.contextmanager  # type: ignore
     def _atomic_write(self, path: str, mode: str = "w",
                       newline: Optional[str] = None) -> Iterator[IO[AnyStr]]:
         # TODO: Overload with Literal when dropping support for Python < 3.8
         parent_dir, name = os.path.split(path)
+        fd = None
+        if self._storage._use_tmpfile:
+            # Avoids creating and removing a temporary directory
+            fd = pathutils.open_tmpfile(parent_dir)
+        if fd is not None:
+            with open(fd, mode, newline=newline,
+                      encoding=None if "b" in mode else self._encoding) as tmp:
+                yield tmp
+                tmp.flush()
+                self._storage._fsync(tmp)
+                try:
+                    pathutils.link_tmpfile(fd, path)
+                except OSError as e:
+                    # EXDEV, EPERM, ENOENT: procfs not usable for linking
+                    if e.errno not in (errno.EXDEV, errno.EPERM,
+                                       errno.ENOENT):
+                        raise
+                    logger.info("Linking of unnamed temporary files "
+                                "failed, using temporary directories: %s", e)
+                    self._storage._use_tmpfile = False
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    # TODO: better fix for "mypy"
+                    with open(fd, "rb", closefd=False) as src, \
+                            self._atomic_write(path, "wb") as dst:  # type: ignore
+                        shutil.copyfileobj(src, dst)
+                    return
+            self._storage._sync_directory(parent_dir)
+            return
         # Do not use mkstemp because it creates with permissions 0o600
         with TemporaryDirectory(
                 prefix=".Radicale.tmp-", dir=parent_dir) as tmp_dir:
@@ -66,16 +155,34 @@ class CollectionBase(storage.BaseCollection):
 
 class StorageBase(storage.BaseStorage):
 
+    supports_projection: ClassVar[bool] = True
+    supports_verify_options: ClassVar[bool] = True
     _collection_class: ClassVar[Type["multifilesystem.Collection"]]
 
     _filesystem_folder: str
     _filesystem_cache_folder: str
     _filesystem_fsync: bool
+    _group_commit: Optional[GroupCommit]
+    _use_tmpfile: bool
     _use_cache_subfolder_for_item: bool
     _use_cache_subfolder_for_history: bool
     _use_cache_subfolder_for_synctoken: bool
     _use_mtime_and_size_for_item_cache: bool
+    _use_packed_item_cache: bool
+    _use_time_range_index: bool
+    _use_uid_index: bool
+    _use_ctag_cache: bool
+    _use_sync_journal: bool
+    _load_pickled_cache: bool
+    _use_item_meta_index: bool
+    _item_cache_memory: Optional[LRUCache]
+    _listing_cache: Optional[LRUCache[Tuple[tuple, FrozenSet[str]]]]
+    _props_cache: Optional[LRUCache[Tuple[int, Mapping[str, str]]]]
+    _inotify: Optional[Inotify]
+    _multiget_workers: int
+    _multiget_executor: Optional[ThreadPoolExecutor]
     _debug_cache_actions: bool
+    _lock_stats: Optional[LockStats]
     _folder_umask: str
     _config_umask: int
 
@@ -85,6 +192,13 @@ class StorageBase(storage.BaseStorage):
             "storage", "filesystem_folder")
         self._filesystem_fsync = configuration.get(
             "storage", "_filesystem_fsync")
+        self._group_commit = None
+        if self._filesystem_fsync and configuration.get(
+                "storage", "group_commit"):
+            self._group_commit = GroupCommit(
+                functools.partial(self._fsync_directory, missing_ok=True),
+                configuration.get("storage", "group_commit_window"))
+        self._use_tmpfile = True
         self._filesystem_cache_folder = configuration.get(
             "storage", "filesystem_cache_folder")
         self._use_cache_subfolder_for_item = configuration.get(
@@ -95,10 +209,106 @@ class StorageBase(storage.BaseStorage):
             "storage", "use_cache_subfolder_for_synctoken")
         self._use_mtime_and_size_for_item_cache = configuration.get(
             "storage", "use_mtime_and_size_for_item_cache")
+        self._use_packed_item_cache = configuration.get(
+            "storage", "use_packed_item_cache")
+        self._use_time_range_index = configuration.get(
+            "storage", "use_time_range_index")
+        self._use_uid_index = configuration.get(
+            "storage", "use_uid_index")
+        self._use_ctag_cache = configuration.get(
+            "storage", "use_ctag_cache")
+        self._use_sync_journal = configuration.get(
+            "storage", "use_sync_journal")
+        self._load_pickled_cache = configuration.get(
+            "storage", "load_pickled_cache")
+        self._use_item_meta_index = configuration.get(
+            "storage", "use_item_meta_index")
+        item_cache_memory_entries = configuration.get(
+            "storage", "item_cache_memory_entries")
+        self._item_cache_memory = None
+        if item_cache_memory_entries > 0:
+            self._item_cache_memory = LRUCache(
+                "item", item_cache_memory_entries,
+                configuration.get("storage", "item_cache_memory_size"),
+                lambda entry: sum(map(len, entry[0][:5])) + 256)
+        listing_cache_entries = configuration.get(
+            "storage", "listing_cache_entries")
+        self._listing_cache = None
+        if listing_cache_entries > 0:
+            self._listing_cache = LRUCache("listing", listing_cache_entries)
+        self._inotify = None
+        if configuration.get("storage", "use_inotify"):
+            try:
+                self._inotify = Inotify(self._filesystem_folder)
+            except OSError as e:
+                logger.warning("inotify is not available, caches are "
+                               "validated by file status: %s", e)
+        self._props_cache = None
+        if self._inotify is not None and listing_cache_entries > 0:
+            # Only modifications in place are detected by inotify
+            self._props_cache = LRUCache("props", listing_cache_entries)
+        self._multiget_workers = configuration.get(
+            "storage", "multiget_workers")
+        self._multiget_executor = None
+        if self._multiget_workers > 0:
+            # Shared by all requests, bounds the number of threads
+            self._multiget_executor = ThreadPoolExecutor(
+                self._multiget_workers, thread_name_prefix="radicale-get")
         self._folder_umask = configuration.get(
             "storage", "folder_umask")
         self._debug_cache_actions = configuration.get(
             "logging", "storage_cache_actions_on_debug")
+        self._lock_stats = None
+        lock_statistics_interval = configuration.get(
+            "logging", "storage_lock_statistics_interval")
+        lock_wait_warning = configuration.get(
+            "logging", "storage_lock_wait_warning")
+        if lock_statistics_interval or lock_wait_warning:
+            self._lock_stats = LockStats(lock_statistics_interval,
+                                         lock_wait_warning)
+
+    def _list_files(self, folder: str) -> FrozenSet[str]:
+        """Get the names of the regular files in ``folder``.
+
+        Listings are kept in the listing cache as long as the generation of
+        the folder (with inotify) or inode and mtime of the folder are
+        unchanged. Raises ``FileNotFoundError`` if the folder doesn't exist.
+
+        """
+        if self._listing_cache is None:
+            with os.scandir(folder) as it:
+                return frozenset(entry.name for entry in it if entry.is_file())
+        signature: tuple
+        generation = self._get_generation(folder)
+        if generation is not None:
+            signature = ("inotify", generation)
+        else:
+            st = os.stat(folder)
+            signature = (st.st_ino, st.st_mtime_ns)
+        cached = self._listing_cache.get(folder)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        scan_ns = time.time_ns()
+        with os.scandir(folder) as it:
+            files = frozenset(entry.name for entry in it if entry.is_file())
+        if (generation is not None or
+                scan_ns - st.st_mtime_ns >= LISTING_RACY_NS):
+            self._listing_cache.put(folder, (signature, files))
+        else:
+            self._listing_cache.discard(folder)
+        return files
+
+    def _get_generation(self, folder: str, name: str = "") -> Optional[int]:
+        """Get the generation of the entries of ``folder`` or of the file
+        ``name`` in it.
+
+        Returns ``None`` if the folder isn't watched by inotify, caches are
+        validated by file status then.
+
+        """
+        if self._inotify is None:
+            return None
+        return self._inotify.generation(folder, name)
 
     def _get_collection_root_folder(self) -> str:
         return os.path.join(self._filesystem_folder, "collection-root")
@@ -131,12 +341,32 @@ class StorageBase(storage.BaseStorage):
 
         This only works on POSIX and does nothing on other systems.
 
+        Within a write transaction with group commit the sync is deferred
+        until the end of the transaction. Temporary directories are synced
+        immediately, they get renamed before the transaction ends.
+
         """
         if not self._filesystem_fsync:
             return
+        if self._group_commit is not None:
+            pending = self._group_commit.pending
+            if pending is not None and not any(
+                    component.startswith(".Radicale.tmp-")
+                    for component in path.split(os.sep)):
+                pending.add(path)
+                return
+        self._fsync_directory(path)
+
+    def _fsync_directory(self, path: str, missing_ok: bool = False) -> None:
         if sys.platform != "win32":
             try:
-                fd = os.open(path, 0)
+                try:
+                    fd = os.open(path, 0)
+                except FileNotFoundError:
+                    if missing_ok:
+                        # Removed meanwhile, the parent directory is synced
+                        return
+                    raise
                 try:
                     pathutils.fsync(fd)
                 finally:
@@ -27,14 +27,39 @@ from typing import BinaryIO, Iterable, NamedTuple, Optional, cast
 import radicale.item as radicale_item
 from radicale import pathutils, storage
 from radicale.log import logger
-from radicale.storage.multifilesystem.base import CollectionBase
+from radicale.storage import multifilesystem
+from radicale.storage.multifilesystem import records
+from radicale.storage.multifilesystem.lock import CollectionPartLock
+from radicale.storage.multifilesystem.metaindex import ItemMetaIndex
+from radicale.storage.multifilesystem.packed import PackedItemCache
 
 CacheContent = NamedTuple("CacheContent", [
     ("uid", str), ("etag", str), ("text", str), ("name", str), ("tag", str),
     ("start", int), ("end", int)])
 
 
-class CollectionPartCache(CollectionBase):
+class CollectionPartCache(CollectionPartLock):
+
+    _packed_item_cache: Optional[PackedItemCache]
+    _item_meta_index: Optional[ItemMetaIndex]
+
+    def __init__(self, storage_: "multifilesystem.Storage", path: str,
+                 filesystem_path: Optional[str] = None) -> None:
+        super().__init__(storage_, path, filesystem_path)
+        self._packed_item_cache = None
+        self._item_meta_index = None
+
+    def _get_packed_item_cache(self) -> PackedItemCache:
+        if self._packed_item_cache is None:
+            cache_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "item")
+            self._packed_item_cache = PackedItemCache(self, cache_folder)
+        return self._packed_item_cache
+
+    def _get_item_meta_index(self) -> ItemMetaIndex:
+        if self._item_meta_index is None:
+            cache_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "item")
+            self._item_meta_index = ItemMetaIndex(cache_folder)
+        return self._item_meta_index
 
     def _clean_cache(self, folder: str, names: Iterable[str],
                      max_age: int = 0) -> None:
@@ -89,42 +114,95 @@ class CollectionPartCache(CollectionBase):
             else:
                 cache_hash = self._item_cache_hash(
                     item.serialize().encode(self._encoding))
-        cache_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "item")
         content = self._item_cache_content(item)
+        if self._storage._use_packed_item_cache is True:
+            # All entries are appended to the same files, the lock of a
+            # single entry is not sufficient
+            with self._acquire_cache_lock("item"):
+                self._get_packed_item_cache().store(
+                    href, (cache_hash, *content))
+            return content
+        cache_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "item")
         self._storage._makedirs_synced(cache_folder)
+        self._write_item_cache(os.path.join(cache_folder, href), cache_hash,
+                               content)
+        return content
+
+    def _write_item_cache(self, path: str, cache_hash: str,
+                          content: CacheContent) -> None:
         # Race: Other processes might have created and locked the file.
         # TODO: better fix for "mypy"
         with contextlib.suppress(PermissionError), self._atomic_write(  # type: ignore
-                os.path.join(cache_folder, href), "wb") as fo:
+                path, "wb") as fo:
             fb = cast(BinaryIO, fo)
-            pickle.dump((cache_hash, *content), fb)
-        return content
+            fb.write(records.dumps(records.ITEM, (cache_hash, *content)))
 
     def _load_item_cache(self, href: str, cache_hash: str
                          ) -> Optional[CacheContent]:
+        if self._storage._use_packed_item_cache is True:
+            packed_item_cache = self._get_packed_item_cache()
+            entry = packed_item_cache.load(href, cache_hash)
+            if self._storage._debug_cache_actions is True:
+                logger.debug("Item cache %s: %r in %r with hash %r",
+                             "match     " if entry else "no match  ",
+                             href, packed_item_cache.path, cache_hash)
+            if entry is None:
+                return None
+            return CacheContent(*entry[1:])
         cache_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "item")
         path = os.path.join(cache_folder, href)
+        pickled = False
         try:
             with open(path, "rb") as f:
-                hash_, *remainder = pickle.load(f)
-                if hash_ and hash_ == cache_hash:
-                    if self._storage._debug_cache_actions is True:
-                        logger.debug("Item cache match     : %r with hash %r", path, cache_hash)
-                    return CacheContent(*remainder)
-                else:
-                    if self._storage._debug_cache_actions is True:
-                        logger.debug("Item cache no match  : %r with hash %r", path, cache_hash)
+                data = f.read()
+            if records.is_record(data):
+                hash_, *remainder = records.loads(data, records.ITEM,
+                                                  b"ssssssii")
+            elif self._storage._load_pickled_cache:
+                # Written by Radicale < 3.6.1
+                hash_, *remainder = pickle.loads(data)
+                pickled = True
+            else:
+                if self._storage._debug_cache_actions is True:
+                    logger.debug("Item cache pickled   : %r", path)
+                return None
+            if hash_ and hash_ == cache_hash:
+                if self._storage._debug_cache_actions is True:
+                    logger.debug("Item cache match     : %r with hash %r", path, cache_hash)
+                content = CacheContent(*remainder)  # type: ignore[arg-type]
+                if pickled:
+                    # Convert to the record format
+                    self._write_item_cache(path, cache_hash, content)
+                return content
+            else:
+                if self._storage._debug_cache_actions is True:
+                    logger.debug("Item cache no match  : %r with hash %r", path, cache_hash)
         except FileNotFoundError:
             if self._storage._debug_cache_actions is True:
                 logger.debug("Item cache not found : %r with hash %r", path, cache_hash)
             pass
-        except (pickle.UnpicklingError, ValueError) as e:
+        except (pickle.UnpicklingError, ValueError, EOFError) as e:
             logger.warning("Failed to load item cache entry %r in %r: %s",
                            href, self.path, e, exc_info=True)
         return None
 
+    def _move_packed_item_cache(self, href: str,
+                                to_collection: "CollectionPartCache",
+                                to_href: str) -> None:
+        packed_item_cache = self._get_packed_item_cache()
+        entry = packed_item_cache.load(href)
+        packed_item_cache.remove(href)
+        if entry is not None:
+            to_collection._get_packed_item_cache().store(to_href, entry)
+
     def _clean_item_cache(self) -> None:
+        files = self._storage._list_files(self._filesystem_path)
+        if self._storage._use_item_meta_index:
+            self._get_item_meta_index().clean(self, files)
+        if self._storage._use_packed_item_cache is True:
+            with self._acquire_cache_lock("item"):
+                self._get_packed_item_cache().clean(files)
+            return
         cache_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "item")
         self._clean_cache(cache_folder, (
-            e.name for e in os.scandir(cache_folder) if not
-            os.path.isfile(os.path.join(self._filesystem_path, e.name))))
+            e.name for e in os.scandir(cache_folder) if e.name not in files))
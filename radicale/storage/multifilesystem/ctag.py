@@ -0,0 +1,149 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import json
+import os
+from hashlib import sha256
+from typing import BinaryIO, Iterator, Optional, cast
+
+from radicale import storage, types
+from radicale.log import logger
+from radicale.storage.multifilesystem import records
+from radicale.storage.multifilesystem.base import CollectionBase
+from radicale.storage.multifilesystem.get import CollectionPartGet
+
+CTAG_NAME: str = ".Radicale.ctag"
+
+
+class CtagState:
+    """Combination of the hrefs and etags of all items of a collection.
+
+    The hashes of the items are combined with XOR, items can be added and
+    removed in any order.
+
+    ``mtime_ns`` is the latest modification time of the items and the
+    properties when the state was built. Files written later are renamed
+    into the collection folder, their modification time is covered by
+    the one of the folder.
+
+    """
+
+    digest: int
+    mtime_ns: int
+
+    def __init__(self, digest: int = 0, mtime_ns: int = 0) -> None:
+        self.digest = digest
+        self.mtime_ns = mtime_ns
+
+    def toggle(self, href: str, etag: str) -> None:
+        """Add the item if it is missing, remove it otherwise."""
+        self.digest ^= int.from_bytes(
+            sha256((href + "/" + etag).encode()).digest(), "big")
+
+
+class CollectionPartCtag(CollectionPartGet, CollectionBase):
+
+    _props_path: str
+
+    @property
+    def _ctag_path(self) -> str:
+        cache_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "item")
+        return os.path.join(cache_folder, CTAG_NAME)
+
+    def _load_ctag_state(self) -> Optional[CtagState]:
+        """Load the ctag state if it matches the collection."""
+        try:
+            with open(self._ctag_path, "rb") as f:
+                version, raw_signature, digest, mtime_ns = records.loads(
+                    f.read(), records.CTAG_STATE, b"bsbi")
+            # The signature is stored as JSON array or ``null``
+            signature = json.loads(cast(str, raw_signature))
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning("Failed to load ctag of %r: %s",
+                           self.path, e, exc_info=True)
+            return None
+        if (version != storage.CACHE_VERSION or signature is None or
+                tuple(signature) != self._items_signature()):
+            return None
+        return CtagState(int.from_bytes(cast(bytes, digest), "big"),
+                         cast(int, mtime_ns))
+
+    def _save_ctag_state(self, state: CtagState,
+                         signature: Optional[tuple]) -> None:
+        """Save the ctag state, it's outdated if ``signature`` is
+        ``None``."""
+        path = self._ctag_path
+        self._storage._makedirs_synced(os.path.dirname(path))
+        # Race: Other processes might have locked the file.
+        # TODO: better fix for "mypy"
+        with contextlib.suppress(PermissionError), self._atomic_write(  # type: ignore
+                path, "wb") as fo:
+            cast(BinaryIO, fo).write(records.dumps(records.CTAG_STATE, (
+                storage.CACHE_VERSION, json.dumps(signature),
+                state.digest.to_bytes(32, "big"), state.mtime_ns)))
+
+    def _get_ctag_state(self) -> CtagState:
+        state = self._load_ctag_state()
+        if state is None:
+            logger.debug("Rebuild ctag of %r", self.path)
+            # Creating the cache folder modifies the collection
+            self._storage._makedirs_synced(os.path.dirname(self._ctag_path))
+            # Take the signature first, changes during the rebuild
+            # invalidate the state.
+            signature = self._items_signature()
+            state = CtagState()
+            with contextlib.suppress(FileNotFoundError):
+                state.mtime_ns = os.stat(self._props_path).st_mtime_ns
+            for item in self._get_all_projected({"etag"}):
+                assert item.href
+                state.toggle(item.href, item.etag)
+                with contextlib.suppress(FileNotFoundError):
+                    state.mtime_ns = max(state.mtime_ns, os.stat(os.path.join(
+                        self._filesystem_path, item.href)).st_mtime_ns)
+            self._save_ctag_state(state, signature)
+        return state
+
+    @types.contextmanager
+    def _update_ctag(self) -> Iterator[Optional[CtagState]]:
+        """Update the ctag state together with the collection.
+
+        Yields ``None`` if the ctag cache is disabled or outdated.
+
+        """
+        if not self._storage._use_ctag_cache:
+            yield None
+            return
+        state = self._load_ctag_state()
+        yield state
+        if state is not None:
+            self._save_ctag_state(state, self._items_signature())
+
+    def _get_last_modified_ns(self) -> int:
+        """Latest modification time of the collection folder, the items and
+        the properties."""
+        state = self._get_ctag_state()
+        return max(self._folder_signature()[1], state.mtime_ns)
+
+    @property
+    def etag(self) -> str:
+        if not self._storage._use_ctag_cache:
+            return super().etag
+        etag = sha256(self._get_ctag_state().digest.to_bytes(32, "big"))
+        etag.update(json.dumps(self.get_meta(), sort_keys=True).encode())
+        return '"%s"' % etag.hexdigest()
@@ -23,10 +23,16 @@ from typing import Optional
 
 from radicale import pathutils, storage
 from radicale.storage.multifilesystem.base import CollectionBase
+from radicale.storage.multifilesystem.cache import CollectionPartCache
+from radicale.storage.multifilesystem.ctag import CollectionPartCtag
 from radicale.storage.multifilesystem.history import CollectionPartHistory
+from radicale.storage.multifilesystem.journal import CollectionPartJournal
+from radicale.storage.multifilesystem.uid import CollectionPartUid
 
 
-class CollectionPartDelete(CollectionPartHistory, CollectionBase):
+class CollectionPartDelete(CollectionPartJournal, CollectionPartCtag,
+                           CollectionPartUid, CollectionPartCache,
+                           CollectionPartHistory, CollectionBase):
 
     def delete(self, href: Optional[str] = None) -> None:
         if href is None:
@@ -49,12 +55,27 @@ class CollectionPartDelete(CollectionPartHistory, CollectionBase):
             path = pathutils.path_to_filesystem(self._filesystem_path, href)
             if not os.path.isfile(path):
                 raise storage.ComponentNotFoundError(href)
-            os.remove(path)
-            self._storage._sync_directory(os.path.dirname(path))
+            with self._update_uid_index() as uid_index, \
+                    self._update_ctag() as ctag_state, \
+                    self._update_sync_journal() as journal_hrefs:
+                old_item = None
+                if ctag_state is not None:
+                    old_item = self._get(href, verify_href=False)
+                os.remove(path)
+                self._storage._sync_directory(os.path.dirname(path))
+                if uid_index is not None:
+                    uid_index.remove(href)
+                if ctag_state is not None and old_item is not None:
+                    ctag_state.toggle(href, old_item.etag)
+                if journal_hrefs is not None:
+                    journal_hrefs.append(href)
             # Track the change
             self._update_history_etag(href, None)
             self._clean_history()
             # Remove item from cache
+            if self._storage._use_packed_item_cache is True:
+                self._get_packed_item_cache().remove(href)
+                return
             cache_folder = self._storage._get_collection_cache_subfolder(os.path.dirname(path), ".Radicale.cache", "item")
             cache_file = os.path.join(cache_folder, os.path.basename(path))
             if os.path.isfile(cache_file):
@@ -19,7 +19,8 @@
 import base64
 import os
 import posixpath
-from typing import Callable, ContextManager, Iterator, Optional, Set, cast
+from typing import (AbstractSet, Callable, ContextManager, Iterator, Optional,
+                    Set, cast)
 
 from radicale import pathutils, types
 from radicale.log import logger
@@ -39,7 +40,8 @@ class StoragePartDiscover(StorageBase):
             self, path: str, depth: str = "0",
             child_context_manager: Optional[
             Callable[[str, Optional[str]], ContextManager[None]]] = None,
-            user_groups: Set[str] = set([])
+            user_groups: Set[str] = set([]),
+            projection: Optional[AbstractSet[str]] = None
             ) -> Iterator[types.CollectionOrItem]:
         # assert isinstance(self, multifilesystem.Storage)
         if child_context_manager is None:
@@ -75,7 +77,7 @@ class StoragePartDiscover(StorageBase):
             pathutils.unstrip_path(sane_path, True))
 
         if href:
-            item = collection._get(href)
+            item = collection._get(href, projection=projection)
             if item is not None:
                 yield item
             return
@@ -87,7 +89,7 @@ class StoragePartDiscover(StorageBase):
 
         for href in collection._list():
             with child_context_manager(sane_path, href):
-                item = collection._get(href)
+                item = collection._get(href, projection=projection)
                 if item is not None:
                     yield item
 
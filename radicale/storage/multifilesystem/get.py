@@ -17,18 +17,30 @@
 # You should have received a copy of the GNU General Public License
 # along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
+import concurrent.futures
+import functools
 import os
+import stat
 import sys
 import time
-from typing import Iterable, Iterator, Optional, Tuple
+import xml.etree.ElementTree as ET
+from typing import (AbstractSet, Container, Deque, Iterable, Iterator,
+                    Optional, Tuple)
 
 import radicale.item as radicale_item
 from radicale import pathutils
+from radicale.item import filter as radicale_filter
 from radicale.log import logger
 from radicale.storage import multifilesystem
 from radicale.storage.multifilesystem.base import CollectionBase
-from radicale.storage.multifilesystem.cache import CollectionPartCache
+from radicale.storage.multifilesystem.cache import (CacheContent,
+                                                    CollectionPartCache)
 from radicale.storage.multifilesystem.lock import CollectionPartLock
+from radicale.storage.multifilesystem.metaindex import ItemMeta
+from radicale.storage.multifilesystem.timerange import (TimeRangeEntry,
+                                                        TimeRangeIndex,
+                                                        file_signature)
 
 
 class CollectionPartGet(CollectionPartCache, CollectionPartLock,
@@ -42,17 +54,15 @@ class CollectionPartGet(CollectionPartCache, CollectionPartLock,
         self._item_cache_cleaned = False
 
     def _list(self) -> Iterator[str]:
-        for entry in os.scandir(self._filesystem_path):
-            if not entry.is_file():
-                continue
-            href = entry.name
+        for href in self._storage._list_files(self._filesystem_path):
             if not pathutils.is_safe_filesystem_path_component(href):
                 if not href.startswith(".Radicale"):
                     logger.debug("Skipping item %r in %r", href, self.path)
                 continue
             yield href
 
-    def _get(self, href: str, verify_href: bool = True
+    def _get(self, href: str, verify_href: bool = True,
+             projection: Optional[AbstractSet[str]] = None
              ) -> Optional[radicale_item.Item]:
         if verify_href:
             try:
@@ -67,6 +77,61 @@ class CollectionPartGet(CollectionPartCache, CollectionPartLock,
                 return None
         else:
             path = os.path.join(self._filesystem_path, href)
+        memory_cache = self._storage._item_cache_memory
+        memory_key: Optional[tuple] = None
+        if memory_cache is not None:
+            generation = self._storage._get_generation(
+                self._filesystem_path, href)
+            if generation is not None:
+                memory_key = (self._filesystem_path, href, "inotify",
+                              generation)
+            else:
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    return None
+                except OSError:
+                    # Handled below
+                    pass
+                else:
+                    if stat.S_ISREG(st.st_mode):
+                        memory_key = (self._filesystem_path, href, st.st_ino,
+                                      st.st_size, st.st_mtime_ns)
+            memory_entry = None
+            if memory_key is not None:
+                memory_entry = memory_cache.get(memory_key)
+            if memory_entry is not None:
+                if self._storage._debug_cache_actions is True:
+                    logger.debug("Item cache memory hit: %r", path)
+                return self._item_from_cache_content(href, *memory_entry)
+        meta_index = None
+        signature: Optional[tuple] = None
+        if (self._storage._use_item_meta_index and projection is not None and
+                "text" not in projection):
+            meta_index = self._get_item_meta_index()
+            # Validate the entry without reading the item file
+            try:
+                st = os.stat(path)
+            except OSError:
+                # Handled below
+                pass
+            else:
+                if stat.S_ISREG(st.st_mode):
+                    signature = file_signature(st)
+                    meta = meta_index.lookup(href, signature)
+                    if meta is not None:
+                        if self._storage._debug_cache_actions is True:
+                            logger.debug("Item cache meta hit  : %r", path)
+                        # The text is loaded from the 'item' cache when needed
+                        return radicale_item.Item(
+                            collection=self, href=href,
+                            last_modified=self._item_last_modified(
+                                st.st_mtime),
+                            etag=meta.etag, uid=meta.uid, name=meta.name,
+                            component_name=meta.tag,
+                            time_range=(meta.start, meta.end),
+                            load_text=functools.partial(
+                                self._load_item_text, href, meta.hash))
         try:
             if self._storage._use_mtime_and_size_for_item_cache is True:
                 # try to avoid "open"
@@ -105,12 +170,13 @@ class CollectionPartGet(CollectionPartCache, CollectionPartLock,
         if cache_content is None:
             if self._storage._debug_cache_actions is True:
                 logger.debug("Item cache miss   for: %r", path)
-            with self._acquire_cache_lock("item"):
-                # Lock the item cache to prevent multiple processes from
-                # generating the same data in parallel.
-                # This improves the performance for multiple requests.
-                if self._storage._lock.locked == "r":
-                    # Check if another process created the file in the meantime
+            with self._acquire_cache_lock("item", href):
+                # Lock the entry of the item cache to prevent multiple
+                # processes from generating the same data in parallel.
+                # Other items can be parsed in the meantime.
+                if self._storage._lock_mode(self.path) != "w":
+                    # Check if another process or thread created the file in
+                    # the meantime
                     cache_content = self._load_item_cache(href, cache_hash)
                 if cache_content is None:
                     if self._storage._use_mtime_and_size_for_item_cache is True:
@@ -146,41 +212,156 @@ class CollectionPartGet(CollectionPartCache, CollectionPartLock,
         else:
             if self._storage._debug_cache_actions is True:
                 logger.debug("Item cache hit    for: %r", path)
-        last_modified = time.strftime(
-            "%a, %d %b %Y %H:%M:%S GMT",
-            time.gmtime(os.path.getmtime(path)))
+        if meta_index is not None and signature is not None:
+            meta_index.update(self, href, ItemMeta(
+                cache_hash, cache_content.uid, cache_content.etag,
+                cache_content.name, cache_content.tag, cache_content.start,
+                cache_content.end, signature))
+        mtime = os.path.getmtime(path)
+        if memory_cache is not None and memory_key is not None:
+            memory_cache.put(memory_key, (cache_content, mtime))
+        return self._item_from_cache_content(href, cache_content, mtime)
+
+    def _load_item_text(self, href: str, cache_hash: str) -> str:
+        cache_content = self._load_item_cache(href, cache_hash)
+        if cache_content is not None:
+            return cache_content.text
+        # Race: The 'item' cache was cleaned or the item was modified
+        logger.debug("Item cache text missing for %r in %r", href, self.path)
+        item = self._get(href, verify_href=False)
+        if item is None:
+            raise RuntimeError("Failed to load item %r in %r: item was "
+                               "removed" % (href, self.path))
+        return item.serialize()
+
+    @staticmethod
+    def _item_last_modified(mtime: float) -> str:
+        return time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(mtime))
+
+    def _item_from_cache_content(self, href: str, cache_content: CacheContent,
+                                 mtime: float) -> radicale_item.Item:
         # Don't keep reference to ``vobject_item``, because it requires a lot
         # of memory.
         return radicale_item.Item(
-            collection=self, href=href, last_modified=last_modified,
+            collection=self, href=href,
+            last_modified=self._item_last_modified(mtime),
             etag=cache_content.etag, text=cache_content.text,
             uid=cache_content.uid, name=cache_content.name,
             component_name=cache_content.tag,
             time_range=(cache_content.start, cache_content.end))
 
-    def get_multi(self, hrefs: Iterable[str]
+    def _get_multi_item(self, href: str, files: Container[str],
+                        projection: Optional[AbstractSet[str]]
+                        ) -> Optional[radicale_item.Item]:
+        path = os.path.join(self._filesystem_path, href)
+        if (not pathutils.is_safe_filesystem_path_component(href) or
+                href not in files and os.path.lexists(path)):
+            logger.debug("Can't translate name safely to filesystem: %r",
+                         href)
+            return None
+        return self._get(href, verify_href=False, projection=projection)
+
+    def get_multi(self, hrefs: Iterable[str],
+                  projection: Optional[AbstractSet[str]] = None
                   ) -> Iterator[Tuple[str, Optional[radicale_item.Item]]]:
         # It's faster to check for file name collisions here, because
-        # we only need to call os.listdir once.
+        # we only need to list the folder once.
         files = None
-        for href in hrefs:
-            if files is None:
-                # List dir after hrefs returned one item, the iterator may be
-                # empty and the for-loop is never executed.
-                files = os.listdir(self._filesystem_path)
-            path = os.path.join(self._filesystem_path, href)
-            if (not pathutils.is_safe_filesystem_path_component(href) or
-                    href not in files and os.path.lexists(path)):
-                logger.debug("Can't translate name safely to filesystem: %r",
-                             href)
-                yield (href, None)
-            else:
-                yield (href, self._get(href, verify_href=False))
+        executor = self._storage._multiget_executor
+        # Items are loaded ahead by the workers and returned in order
+        pending: Deque[Tuple[str, concurrent.futures.Future]] = collections.deque()
+        try:
+            for href in hrefs:
+                if files is None:
+                    # List dir after hrefs returned one item, the iterator
+                    # may be empty and the for-loop is never executed.
+                    files = self._storage._list_files(self._filesystem_path)
+                if executor is None:
+                    yield href, self._get_multi_item(href, files, projection)
+                    continue
+                pending.append((href, executor.submit(
+                    self._get_multi_item, href, files, projection)))
+                if len(pending) >= 2 * self._storage._multiget_workers:
+                    href, future = pending.popleft()
+                    yield href, future.result()
+            while pending:
+                href, future = pending.popleft()
+                yield href, future.result()
+        finally:
+            # Don't access the storage after the caller released the lock
+            for _, future in pending:
+                future.cancel()
+            concurrent.futures.wait([future for _, future in pending])
+
+    def get_filtered(self, filters: Iterable[ET.Element],
+                     projection: Optional[AbstractSet[str]] = None
+                     ) -> Iterator[Tuple[radicale_item.Item, bool]]:
+        if not self._storage._use_time_range_index:
+            yield from super().get_filtered(filters, projection)
+            return
+        if not self.tag:
+            return
+        tag, start, end, simple = radicale_filter.simplify_prefilters(
+            filters, self.tag)
+        cache_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "item")
+        index = TimeRangeIndex(cache_folder)
+        index.load()
+        signatures = {}
+        loaded = {}
+        for href in self._list():
+            try:
+                signature = file_signature(os.stat(
+                    os.path.join(self._filesystem_path, href)))
+            except FileNotFoundError:
+                continue
+            signatures[href] = signature
+            if index.lookup(href, signature) is None:
+                # Entry is missing or outdated
+                item = self._get(href, verify_href=False,
+                                 projection=projection)
+                if item is None:
+                    index.remove(href)
+                    continue
+                index.update(href, TimeRangeEntry(
+                    signature, item.component_name, *item.time_range))
+                istart, iend = item.time_range
+                if ((tag is None or tag == item.component_name) and
+                        istart < end and iend > start):
+                    # Keep only the items that are returned below
+                    loaded[href] = item
+        for href in list(index.entries):
+            if href not in signatures:
+                index.remove(href)
+        if index.modified:
+            with self._acquire_cache_lock("timerange"):
+                index.save(self)
+        candidates = set(index.query(start, end))
+        logger.debug("TRACE/STORAGE/get_filtered: time range index "
+                     "candidates=%d total=%d", len(candidates),
+                     len(signatures))
+        for href in signatures:
+            if href not in candidates:
+                continue
+            index_entry = index.entries[href]
+            if tag is not None and tag != index_entry.tag:
+                continue
+            item = loaded.get(href)
+            if item is None:
+                item = self._get(href, verify_href=False,
+                                 projection=projection)
+                if item is None:
+                    continue
+            istart, iend = item.time_range
+            if istart >= end or iend <= start:
+                # Race: The file was replaced in the meantime
+                continue
+            yield item, simple and (start <= istart or iend <= end)
 
-    def get_all(self) -> Iterator[radicale_item.Item]:
+    def get_all(self, projection: Optional[AbstractSet[str]] = None
+                ) -> Iterator[radicale_item.Item]:
         for href in self._list():
             # We don't need to check for collisions, because the file names
-            # are from os.listdir.
-            item = self._get(href, verify_href=False)
+            # are from the listing of the folder.
+            item = self._get(href, verify_href=False, projection=projection)
             if item is not None:
                 yield item
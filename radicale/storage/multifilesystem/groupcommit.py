@@ -0,0 +1,136 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Group commit of directory syncs.
+
+Directory syncs of a write transaction are collected instead of executed
+immediately. After the storage lock is released, the transaction waits
+until all collected directories are synced. The first waiting transaction
+syncs the directories of all transactions that arrived within the commit
+window, the other transactions only wait for it.
+
+File contents are still synced before they are renamed, so a write is
+either completely visible after a crash or not at all. A transaction
+only completes after its changes are durable, but concurrent readers may
+see them before.
+
+"""
+
+import threading
+from typing import Callable, Dict, Iterator, Optional, Set
+
+from radicale import types
+from radicale.log import logger
+
+
+class GroupCommit:
+
+    window: float
+    commits: int
+    syncs: int
+
+    _sync_directory: Callable[[str], None]
+    _local: threading.local
+    _cond: threading.Condition
+    _queue: Set[str]
+    _requested: int
+    _flushed: int
+    _flushing: bool
+    _errors: Dict[int, Exception]
+
+    def __init__(self, sync_directory: Callable[[str], None],
+                 window: float) -> None:
+        self.window = window
+        self.commits = self.syncs = 0
+        self._sync_directory = sync_directory
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._queue = set()
+        self._requested = self._flushed = 0
+        self._flushing = False
+        self._errors = {}
+
+    @property
+    def pending(self) -> Optional[Set[str]]:
+        """Directories of the transaction of the current thread or ``None``
+        outside of transactions."""
+        return getattr(self._local, "pending", None)
+
+    @types.contextmanager
+    def transaction(self) -> Iterator[None]:
+        if self.pending is not None:
+            # Nested transaction
+            yield
+            return
+        self._local.pending = set()
+        try:
+            yield
+        except BaseException:
+            pending, self._local.pending = self._local.pending, None
+            # Changes might have been made nevertheless
+            try:
+                self.commit(pending)
+            except Exception as e:
+                logger.error("Group commit after failure failed: %s", e)
+            raise
+        pending, self._local.pending = self._local.pending, None
+        self.commit(pending)
+
+    def commit(self, directories: Set[str]) -> None:
+        """Wait until ``directories`` are synced."""
+        if not directories:
+            return
+        with self._cond:
+            self._queue |= directories
+            self._requested += 1
+            ticket = self._requested
+            while self._flushed < ticket:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                self._flush()
+            error = self._errors.pop(ticket, None)
+        if error is not None:
+            raise RuntimeError("Group commit failed: %s" % error) from error
+
+    def _flush(self) -> None:
+        """Sync the queued directories, ``_cond`` must be held."""
+        self._flushing = True
+        try:
+            if self.window > 0:
+                # Collect the directories of other transactions
+                self._cond.wait(self.window)
+            directories, self._queue = self._queue, set()
+            first, last = self._flushed + 1, self._requested
+            self._cond.release()
+            error: Optional[Exception] = None
+            try:
+                for directory in sorted(directories):
+                    self._sync_directory(directory)
+            except Exception as e:
+                error = e
+            finally:
+                self._cond.acquire()
+            if error is not None:
+                for ticket in range(first, last + 1):
+                    self._errors[ticket] = error
+            self.commits += last - first + 1
+            self.syncs += len(directories)
+            self._flushed = last
+        finally:
+            self._flushing = False
+            self._cond.notify_all()
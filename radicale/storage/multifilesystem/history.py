@@ -20,12 +20,13 @@ import binascii
 import contextlib
 import os
 import pickle
-from typing import BinaryIO, Optional, cast
+from typing import BinaryIO, Optional, Tuple, cast
 
 import radicale.item as radicale_item
 from radicale import pathutils
 from radicale.log import logger
 from radicale.storage import multifilesystem
+from radicale.storage.multifilesystem import records
 from radicale.storage.multifilesystem.base import CollectionBase
 
 
@@ -47,12 +48,29 @@ class CollectionPartHistory(CollectionBase):
         string for deleted items) and a history etag, which is a hash over
         the previous history etag and the etag separated by "/".
         """
+        history_etag, _ = self._update_history(href, item)
+        return history_etag
+
+    def _update_history(self, href: str,
+                        item: Optional[radicale_item.Item]
+                        ) -> Tuple[str, bool]:
+        """Like ``_update_history_etag``, additionally returns if the etag
+        of the item changed."""
         history_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "history")
+        pickled = False
         try:
             with open(os.path.join(history_folder, href), "rb") as f:
-                cache_etag, history_etag = pickle.load(f)
-        except (FileNotFoundError, pickle.UnpicklingError, ValueError) as e:
-            if isinstance(e, (pickle.UnpicklingError, ValueError)):
+                data = f.read()
+            if records.is_record(data) or not self._storage._load_pickled_cache:
+                cache_etag, history_etag = cast(Tuple[str, str], records.loads(
+                    data, records.HISTORY, b"ss"))
+            else:
+                # Written by Radicale < 3.6.1
+                cache_etag, history_etag = pickle.loads(data)
+                pickled = True
+        except (FileNotFoundError, pickle.UnpicklingError, ValueError,
+                EOFError) as e:
+            if not isinstance(e, FileNotFoundError):
                 logger.warning(
                     "Failed to load history cache entry %r in %r: %s",
                     href, self.path, e, exc_info=True)
@@ -61,27 +79,31 @@ class CollectionPartHistory(CollectionBase):
             # expired items.
             history_etag = binascii.hexlify(os.urandom(16)).decode("ascii")
         etag = item.etag if item else ""
-        if etag != cache_etag:
+        changed = etag != cache_etag
+        if changed or pickled:
             self._storage._makedirs_synced(history_folder)
-            history_etag = radicale_item.get_etag(
-                history_etag + "/" + etag).strip("\"")
+            if changed:
+                history_etag = radicale_item.get_etag(
+                    history_etag + "/" + etag).strip("\"")
             # Race: Other processes might have created and locked the file.
-            with contextlib.suppress(PermissionError), self._atomic_write(
+            # TODO: better fix for "mypy"
+            with contextlib.suppress(PermissionError), self._atomic_write(  # type: ignore
                     os.path.join(history_folder, href), "wb") as fo:
                 fb = cast(BinaryIO, fo)
-                pickle.dump([etag, history_etag], fb)
-        return history_etag
+                fb.write(records.dumps(records.HISTORY, (etag, history_etag)))
+        return history_etag, changed
 
     def _get_deleted_history_hrefs(self):
         """Returns the hrefs of all deleted items that are still in the
         history cache."""
         history_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "history")
         with contextlib.suppress(FileNotFoundError):
-            for entry in os.scandir(history_folder):
-                href = entry.name
+            hrefs = self._storage._list_files(history_folder)
+            files = self._storage._list_files(self._filesystem_path)
+            for href in hrefs:
                 if not pathutils.is_safe_filesystem_path_component(href):
                     continue
-                if os.path.isfile(os.path.join(self._filesystem_path, href)):
+                if href in files:
                     continue
                 yield href
 
@@ -0,0 +1,277 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Change detection of folders with inotify (Linux only).
+
+Folders are watched when their generation is requested for the first time.
+Every change of a folder or of a file in it increases the generation of
+the folder respectively of the file, in-memory caches store the
+generation together with the cached data and trust it as long as the
+generation is unchanged.
+
+The kernel queues events synchronously with the modification, pending
+events are read when a storage lock is acquired and on every lookup while
+the storage is locked for writing in this process. A background thread
+reads events in between to keep the queue from overflowing. An overflow
+of the queue invalidates all watched folders.
+
+"""
+
+import contextlib
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import weakref
+from typing import Dict, Iterator, Optional
+
+from radicale import types
+from radicale.log import logger
+
+if sys.platform == "linux":
+    import ctypes
+
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_init1.argtypes = [ctypes.c_int]
+    _inotify_init1.restype = ctypes.c_int
+    _inotify_add_watch = _libc.inotify_add_watch
+    _inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                                   ctypes.c_uint32]
+    _inotify_add_watch.restype = ctypes.c_int
+    _inotify_rm_watch = _libc.inotify_rm_watch
+    _inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    _inotify_rm_watch.restype = ctypes.c_int
+
+IN_MODIFY: int = 0x00000002
+IN_ATTRIB: int = 0x00000004
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_FROM: int = 0x00000040
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_DELETE: int = 0x00000200
+IN_DELETE_SELF: int = 0x00000400
+IN_MOVE_SELF: int = 0x00000800
+IN_Q_OVERFLOW: int = 0x00004000
+IN_IGNORED: int = 0x00008000
+IN_ONLYDIR: int = 0x01000000
+IN_NONBLOCK: int = os.O_NONBLOCK
+IN_CLOEXEC: int = getattr(os, "O_CLOEXEC", 0)
+
+# Events that change the entries of a folder
+_LISTING_EVENTS: int = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+_WATCH_MASK: int = (_LISTING_EVENTS | IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE |
+                    IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+# wd, mask, cookie, length of the name
+_EVENT = struct.Struct("iIII")
+
+
+class _Watch:
+
+    wd: int
+    folder: str
+    # Generation of the entries of the folder
+    generation: int
+    # Generation of files without own generation
+    base: int
+    files: Dict[str, int]
+
+    def __init__(self, wd: int, folder: str, generation: int) -> None:
+        self.wd = wd
+        self.folder = folder
+        self.generation = self.base = generation
+        self.files = {}
+
+
+def _read_events(ref: "weakref.ReferenceType[Inotify]") -> None:
+    while True:
+        inotify = ref()
+        if inotify is None:
+            return
+        fd = inotify._fd
+        del inotify
+        try:
+            select.select([fd], [], [], 1)
+        except (OSError, ValueError):
+            # Closed
+            return
+        inotify = ref()
+        if inotify is None:
+            return
+        with contextlib.suppress(OSError):
+            inotify.poll()
+        del inotify
+
+
+class Inotify:
+    """Watch folders below ``root``.
+
+    Raises ``OSError`` if inotify is not available.
+
+    """
+
+    overflows: int
+
+    _root: str
+    _fd: int
+    _lock: threading.Lock
+    _counter: int
+    _writers: int
+    _watches: Dict[int, _Watch]
+    _folders: Dict[str, _Watch]
+    _watch_limit_logged: bool
+
+    def __init__(self, root: str) -> None:
+        if sys.platform != "linux":
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        fd = _inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        self._root = os.path.abspath(root)
+        self._fd = fd
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._writers = 0
+        self._watches = {}
+        self._folders = {}
+        self._watch_limit_logged = False
+        self.overflows = 0
+        threading.Thread(target=_read_events, args=(weakref.ref(self),),
+                         name="radicale-inotify", daemon=True).start()
+
+    def __del__(self) -> None:
+        with contextlib.suppress(AttributeError, OSError):
+            os.close(self._fd)
+
+    def __len__(self) -> int:
+        return len(self._folders)
+
+    def generation(self, folder: str, name: str = "") -> Optional[int]:
+        """Get the generation of the entries of ``folder`` or of the file
+        ``name`` in it.
+
+        Returns ``None`` if the folder can't be watched.
+
+        """
+        folder = os.path.abspath(folder)
+        with self._lock:
+            if self._writers:
+                # Modifications of this process must be visible
+                self._poll()
+            watch = self._folders.get(folder)
+            if watch is None:
+                watch = self._watch(folder)
+                if watch is None:
+                    return None
+                # Moving a parent folder doesn't notify the watch of the
+                # folder
+                parent = os.path.dirname(folder)
+                while (parent not in self._folders and (
+                        parent == self._root or
+                        parent.startswith(os.path.join(self._root, "")))):
+                    if self._watch(parent) is None:
+                        self._forget(folder)
+                        return None
+                    parent = os.path.dirname(parent)
+            if not name:
+                return watch.generation
+            return watch.files.get(name, watch.base)
+
+    def poll(self) -> None:
+        """Read pending events."""
+        with self._lock:
+            self._poll()
+
+    @types.contextmanager
+    def writing(self) -> Iterator[None]:
+        """Read pending events on every lookup within the context."""
+        with self._lock:
+            self._writers += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._writers -= 1
+                self._poll()
+
+    def _watch(self, folder: str) -> Optional[_Watch]:
+        wd = _inotify_add_watch(self._fd, os.fsencode(folder), _WATCH_MASK)
+        if wd < 0:
+            e = ctypes.get_errno()
+            if e == errno.ENOSPC and not self._watch_limit_logged:
+                self._watch_limit_logged = True
+                logger.warning("Limit of inotify watches reached, caches of "
+                               "further folders are validated by file "
+                               "status (fs.inotify.max_user_watches)")
+            return None
+        old_watch = self._watches.get(wd)
+        if old_watch is not None:
+            # The folder was moved without notification
+            self._forget(old_watch.folder, remove=False)
+        self._counter += 1
+        watch = _Watch(wd, folder, self._counter)
+        self._watches[wd] = self._folders[folder] = watch
+        return watch
+
+    def _forget(self, folder: str, remove: bool = True) -> None:
+        """Stop watching ``folder`` and the folders in it."""
+        prefix = os.path.join(folder, "")
+        for path in [path for path in self._folders
+                     if path == folder or path.startswith(prefix)]:
+            watch = self._folders.pop(path)
+            del self._watches[watch.wd]
+            if remove:
+                _inotify_rm_watch(self._fd, watch.wd)
+
+    def _poll(self) -> None:
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, pos)
+                pos += _EVENT.size
+                name = data[pos:pos + length].rstrip(b"\0")
+                pos += length
+                self._handle(wd, mask, os.fsdecode(name))
+
+    def _handle(self, wd: int, mask: int, name: str) -> None:
+        self._counter += 1
+        if mask & IN_Q_OVERFLOW:
+            self.overflows += 1
+            logger.warning("Queue of inotify overflowed, invalidating "
+                           "caches of %d folders", len(self._folders))
+            for overflowed_watch in self._folders.values():
+                overflowed_watch.generation = self._counter
+                overflowed_watch.base = self._counter
+                overflowed_watch.files.clear()
+            return
+        watch = self._watches.get(wd)
+        if watch is None:
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+            self._forget(watch.folder, remove=not mask & IN_IGNORED)
+            return
+        if mask & _LISTING_EVENTS:
+            watch.generation = self._counter
+        if name:
+            watch.files[name] = self._counter
@@ -0,0 +1,239 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Append-only change journal of a collection.
+
+The journal starts with a header line that contains a random identifier.
+Every following line is either the href of a changed item (JSON string) or
+the signature of the collection folder and its files (JSON array, ``null``
+if unknown) after the preceding changes were recorded. Sync tokens consist of the identifier and the
+position in the journal.
+
+The journal is up to date if its last line is a signature that matches the
+collection folder and its files. Otherwise the changes are found with the history cache
+and appended.
+
+"""
+
+import binascii
+import itertools
+import json
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, cast
+
+from radicale import types
+from radicale.log import logger
+from radicale.storage.multifilesystem.base import CollectionBase
+from radicale.storage.multifilesystem.get import CollectionPartGet
+from radicale.storage.multifilesystem.history import CollectionPartHistory
+from radicale.storage.multifilesystem.lock import CollectionPartLock
+
+JOURNAL_NAME: str = ".Radicale.journal"
+
+_MAGIC: str = "radicale-sync-journal-1"
+# Start a new journal (invalidates all sync tokens) if it grows larger
+_MAX_SIZE: int = 4 * 1024 * 1024
+# Maximum length of the last line (signature)
+_MAX_TAIL: int = 256
+
+TOKEN_NAME_RE = re.compile(r"^([0-9a-f]{32})-([0-9]+)$")
+
+
+class SyncJournal:
+    """Change journal stored in ``folder``."""
+
+    path: str
+    journal_id: str
+    size: int
+    signature: Optional[tuple]
+
+    def __init__(self, folder: str) -> None:
+        self.path = os.path.join(folder, JOURNAL_NAME)
+        self.journal_id = ""
+        self.size = 0
+        self.signature = None
+
+    @property
+    def token_name(self) -> str:
+        return "%s-%d" % (self.journal_id, self.size)
+
+    def load(self) -> bool:
+        """Load header and last signature, returns ``False`` if the journal
+        is missing or damaged."""
+        try:
+            with open(self.path, "rb") as f:
+                header = f.readline()
+                size = os.fstat(f.fileno()).st_size
+                # Include the preceding byte to detect the start of a line
+                f.seek(max(len(header), size - _MAX_TAIL) - 1)
+                tail = f.read()
+        except FileNotFoundError:
+            return False
+        try:
+            magic, journal_id = json.loads(header)
+            if magic != _MAGIC or not header.endswith(b"\n"):
+                raise ValueError("invalid header")
+            if not tail.endswith(b"\n"):
+                raise ValueError("incomplete record")
+            lines = tail.split(b"\n")[:-1]
+            last = None
+            # The first line is incomplete unless it follows a line break
+            if len(lines) > 2 or len(lines) == 2 and lines[0] == b"":
+                last = json.loads(lines[-1])
+        except ValueError as e:
+            logger.warning("Damaged sync journal %r: %s", self.path, e)
+            return False
+        self.journal_id = journal_id
+        self.size = size
+        self.signature = tuple(last) if isinstance(last, list) else None
+        return True
+
+    def create(self, collection: CollectionBase,
+               signature: Optional[tuple]) -> None:
+        self.journal_id = binascii.hexlify(os.urandom(16)).decode("ascii")
+        data = (json.dumps([_MAGIC, self.journal_id]) + "\n" +
+                json.dumps(signature) + "\n").encode()
+        collection._storage._makedirs_synced(os.path.dirname(self.path))
+        # TODO: better fix for "mypy"
+        with collection._atomic_write(self.path, "wb") as fo:  # type: ignore
+            fo.write(data)
+        self.size = len(data)
+        self.signature = signature
+
+    def append(self, collection: CollectionBase, hrefs: Iterable[str],
+               signature: Optional[tuple] = None) -> None:
+        """Append ``hrefs`` and optionally the ``signature`` of the folder.
+
+        Without signature the journal stays outdated.
+
+        """
+        lines = [json.dumps(href) + "\n" for href in hrefs]
+        if signature is not None:
+            lines.append(json.dumps(signature) + "\n")
+        if not lines:
+            return
+        data = "".join(lines).encode()
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            collection._storage._fsync(f)
+        self.size += len(data)
+        self.signature = signature
+
+    def changes(self, position: int) -> Set[str]:
+        """Get the hrefs of all items that changed after ``position``.
+
+        Raises ``ValueError`` if ``position`` is invalid.
+
+        """
+        with open(self.path, "rb") as f:
+            header_size = len(f.readline())
+            if not header_size <= position <= self.size:
+                raise ValueError("Position out of range: %d" % position)
+            f.seek(position - 1)
+            if f.read(1) != b"\n":
+                raise ValueError("Position not at record boundary: %d" %
+                                 position)
+            data = f.read(self.size - position)
+        hrefs = set()
+        for line in data.splitlines():
+            record = json.loads(line)
+            if isinstance(record, str):
+                hrefs.add(record)
+        return hrefs
+
+
+class CollectionPartJournal(CollectionPartGet, CollectionPartLock,
+                            CollectionPartHistory, CollectionBase):
+
+    def _get_sync_journal_folder(self) -> str:
+        return self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "sync-token")
+
+    def _find_history_changes(self) -> List[str]:
+        """Update the history cache of all existing and deleted items and
+        return the hrefs of changed items."""
+        changes = []
+        for href, item in itertools.chain(
+                ((item.href, item)
+                 for item in self._get_all_projected({"etag"})),
+                ((href, None) for href in self._get_deleted_history_hrefs())):
+            _, changed = self._update_history(cast(str, href), item)
+            if changed:
+                changes.append(cast(str, href))
+        return changes
+
+    def _get_sync_journal(self) -> SyncJournal:
+        """Load the journal and bring it up to date."""
+        journal = SyncJournal(self._get_sync_journal_folder())
+        if (journal.load() and journal.size <= _MAX_SIZE and
+                journal.signature is not None and
+                journal.signature == self._items_signature()):
+            return journal
+        with self._acquire_cache_lock("sync-token"):
+            # Another process might have updated the journal meanwhile
+            loaded = journal.load()
+            # Take the signature first, changes during the scan are found
+            # next time.
+            signature = self._items_signature()
+            if (loaded and journal.size <= _MAX_SIZE and
+                    signature is not None and journal.signature == signature):
+                return journal
+            changes = self._find_history_changes()
+            if not loaded or journal.size > _MAX_SIZE:
+                logger.debug("Create sync journal of %r", self.path)
+                journal.create(self, signature)
+            else:
+                logger.debug("Update sync journal of %r: %d changes",
+                             self.path, len(changes))
+                journal.append(self, changes, signature)
+            self._clean_history()
+        return journal
+
+    def _sync_journal(self, old_token_name: str
+                      ) -> Tuple[str, Iterable[str]]:
+        journal = self._get_sync_journal()
+        if not old_token_name:
+            return journal.token_name, self._list()
+        match = TOKEN_NAME_RE.match(old_token_name)
+        if not match:
+            raise ValueError("Malformed token name: %r" % old_token_name)
+        journal_id, position = match.group(1), int(match.group(2))
+        if journal_id != journal.journal_id:
+            raise ValueError("Token from other journal: %r" % old_token_name)
+        return journal.token_name, journal.changes(position)
+
+    @types.contextmanager
+    def _update_sync_journal(self) -> Iterator[Optional[List[str]]]:
+        """Record the hrefs added to the yielded list in the journal.
+
+        Yields ``None`` if the journal is disabled or missing.
+
+        """
+        if not self._storage._use_sync_journal:
+            yield None
+            return
+        journal = SyncJournal(self._get_sync_journal_folder())
+        if not journal.load():
+            yield None
+            return
+        up_to_date = (journal.signature is not None and
+                      journal.signature == self._items_signature())
+        hrefs: List[str] = []
+        yield hrefs
+        journal.append(self, hrefs,
+                       self._items_signature() if up_to_date else None)
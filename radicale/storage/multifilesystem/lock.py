@@ -24,48 +24,203 @@ import shlex
 import signal
 import subprocess
 import sys
-from typing import Iterator
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from radicale import config, pathutils, types
 from radicale.log import logger
+from radicale.storage.multifilesystem import lockstats
 from radicale.storage.multifilesystem.base import CollectionBase, StorageBase
 
+# Number of lock files per cache for locks of single entries
+CACHE_LOCK_BUCKETS: int = 32
+
+
+def cache_lock_bucket(key: str) -> int:
+    return zlib.crc32(key.encode()) % CACHE_LOCK_BUCKETS
+
 
 class CollectionPartLock(CollectionBase):
 
     @types.contextmanager
-    def _acquire_cache_lock(self, ns: str = "") -> Iterator[None]:
-        if self._storage._lock.locked == "w":
+    def _acquire_cache_lock(self, ns: str = "", key: str = ""
+                            ) -> Iterator[None]:
+        """Lock the cache ``ns`` or only the entry ``key`` in it.
+
+        Entries are locked by one of ``CACHE_LOCK_BUCKETS`` lock files,
+        different entries can mostly be filled in parallel.
+
+        """
+        if self._storage._lock_mode(self.path) == "w":
             yield
             return
         cache_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", ns)
         self._storage._makedirs_synced(cache_folder)
         lock_path = os.path.join(cache_folder,
                                  ".Radicale.lock" + (".%s" % ns if ns else ""))
+        if key:
+            lock_path += ".%d" % cache_lock_bucket(key)
         logger.debug("Lock file (CollectionPartLock): %r" % lock_path)
         lock = pathutils.RwLock(lock_path)
-        with lock.acquire("w"):
+        with lockstats.acquire(self._storage._lock_stats, lock, "w", "cache",
+                               lock_path):
             yield
 
 
 class StoragePartLock(StorageBase):
 
     _lock: pathutils.RwLock
+    _lock_granularity: str
+    _principal_locks: Dict[str, pathutils.RwLock]
+    _principal_locks_lock: threading.Lock
+    _held_locks: threading.local
+    _hook_lock: Optional[pathutils.RwLock]
     _hook: str
 
     def __init__(self, configuration: config.Configuration) -> None:
         super().__init__(configuration)
         lock_path = os.path.join(self._filesystem_folder, ".Radicale.lock")
         logger.debug("Lock file (StoragePartLock): %r" % lock_path)
-        self._lock = pathutils.RwLock(lock_path)
+        self._lock = self._create_lock(lock_path)
+        self._lock_granularity = configuration.get(
+            "storage", "lock_granularity")
+        self._principal_locks = {}
+        self._principal_locks_lock = threading.Lock()
+        # Modes of the locks held by the current thread, the modes of the
+        # locks themselves are shared by all threads of the process
+        self._held_locks = threading.local()
+        self._hook_lock = None
         self._hook = configuration.get("storage", "hook")
+        if self._lock_granularity == "principal" and self._hook:
+            # Hooks of different principals must not run in parallel
+            self._hook_lock = self._create_lock(
+                os.path.join(self._filesystem_folder, ".Radicale.lock.hook"))
+
+    def _create_lock(self, path: str) -> pathutils.RwLock:
+        return pathutils.RwLock(path)
+
+    def _get_principal_lock_folder(self) -> str:
+        return os.path.join(self._filesystem_folder, ".Radicale.lock.d")
+
+    def _get_principal(self, path: str) -> str:
+        """Get the name of the principal collection containing ``path``.
+
+        Returns an empty string for the root collection and for names that
+        can't be used for lock files.
+
+        """
+        sane_path = pathutils.strip_path(pathutils.sanitize_path(path))
+        principal = sane_path.split("/", 1)[0]
+        if not pathutils.is_safe_filesystem_path_component(principal):
+            return ""
+        return principal
+
+    def _get_principal_lock(self, principal: str) -> pathutils.RwLock:
+        with self._principal_locks_lock:
+            lock = self._principal_locks.get(principal)
+            if lock is None:
+                folder = self._get_principal_lock_folder()
+                self._makedirs_synced(folder)
+                lock = self._create_lock(os.path.join(folder, principal))
+                self._principal_locks[principal] = lock
+            return lock
+
+    def _get_lock_principals(self, paths: List[Optional[str]]
+                             ) -> Optional[List[str]]:
+        """Get the principals whose locks cover ``paths`` in canonical
+        order or ``None`` if the whole storage must be locked."""
+        if self._lock_granularity != "principal":
+            return None
+        principals = set()
+        for path in paths:
+            principal = self._get_principal(path) if path else ""
+            if not principal:
+                return None
+            principals.add(principal)
+        return sorted(principals)
+
+    def _lock_mode(self, path: str) -> str:
+        """Get the mode in which the collection ``path`` is locked.
+
+        Returns "w" if the collection can't be accessed by other requests
+        and "r" if it can be read concurrently. Only the locks held by the
+        current thread are considered.
+
+        """
+        # "" < "r" < "w"
+        mode = ""
+        principal = self._get_principal(path)
+        for storage_mode, principal_modes in getattr(
+                self._held_locks, "stack", ()):
+            mode = max(mode, storage_mode,
+                       principal_modes.get(principal, ""))
+        return mode
 
     @types.contextmanager
     def acquire_lock(self, mode: str, user: str = "", *args, **kwargs) -> Iterator[None]:
-        with self._lock.acquire(mode):
+        if self._lock_stats is not None:
+            # Attribute the locks of the request including cache locks
+            with self._lock_stats.request(kwargs.get("request", ""),
+                                          kwargs.get("path", "")):
+                with self._acquire_lock_grouped(mode, user, *args, **kwargs):
+                    yield
+        else:
+            with self._acquire_lock_grouped(mode, user, *args, **kwargs):
+                yield
+
+    @types.contextmanager
+    def _acquire_lock_grouped(self, mode: str, user: str = "", *args, **kwargs) -> Iterator[None]:
+        if mode == "w" and self._group_commit is not None:
+            # Wait for the directory syncs after releasing the lock
+            with self._group_commit.transaction(), self._acquire_lock(
+                    mode, user, *args, **kwargs):
+                yield
+        else:
+            with self._acquire_lock(mode, user, *args, **kwargs):
+                yield
+
+    @types.contextmanager
+    def _acquire_lock(self, mode: str, user: str = "", *args, **kwargs) -> Iterator[None]:
+        paths = [kwargs.get("path")]
+        if kwargs.get("to_path"):
+            paths.append(kwargs["to_path"])
+        if kwargs.get("user_groups"):
+            # Collections of groups are stored in the principal "GROUPS"
+            paths.append("/GROUPS/")
+        principals = self._get_lock_principals(paths)
+        if not hasattr(self._held_locks, "stack"):
+            self._held_locks.stack = []
+        held_locks: List[Tuple[str, Dict[str, str]]] = self._held_locks.stack
+        with contextlib.ExitStack() as lock_stack:
+            if principals is None:
+                lock_stack.enter_context(lockstats.acquire(
+                    self._lock_stats, self._lock, mode, "storage", ""))
+                held_locks.append((mode, {}))
+            else:
+                # Other principals can be accessed in parallel,
+                # requests for the whole storage are excluded
+                lock_stack.enter_context(lockstats.acquire(
+                    self._lock_stats, self._lock, "r", "storage", ""))
+                for principal in principals:
+                    lock_stack.enter_context(lockstats.acquire(
+                        self._lock_stats, self._get_principal_lock(principal),
+                        mode, "principal", principal))
+                held_locks.append(
+                    ("r", {principal: mode for principal in principals}))
+            lock_stack.callback(held_locks.pop)
+            if self._inotify is not None:
+                # Modifications by other processes and external
+                # modifications made before become visible
+                self._inotify.poll()
+                if mode == "w":
+                    lock_stack.enter_context(self._inotify.writing())
             yield
             # execute hook
             if mode == "w" and self._hook:
+                if self._hook_lock is not None:
+                    lock_stack.enter_context(lockstats.acquire(
+                        self._lock_stats, self._hook_lock, "w", "hook", ""))
                 debug = logger.isEnabledFor(logging.DEBUG)
                 # Use new process group for child to prevent terminals
                 # from sending SIGINT etc.
@@ -0,0 +1,220 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Contention statistics of the storage locks.
+
+Wait and hold times are recorded in histograms per lock kind ("storage",
+"principal", "hook" or "cache"), lock mode and request method. Only the holders
+in the current process are known, locks held by other processes show up
+as wait times without holders.
+
+"""
+
+import bisect
+import contextlib
+import copy
+import threading
+import time
+from typing import (ContextManager, Dict, Iterator, List, Optional, Sequence,
+                    Tuple)
+
+from radicale import pathutils, types
+from radicale.log import logger
+
+# Upper bounds of the histogram buckets in seconds
+BUCKETS: Sequence[float] = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2,
+                            0.5, 1, 2, 5, 10, float("inf"))
+
+
+class Histogram:
+
+    counts: List[int]
+    count: int
+    total: float
+    max: float
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing the quantile ``q``."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def __str__(self) -> str:
+        if not self.count:
+            return "count=0"
+        return "count=%d avg=%.1fms p50<=%.1fms p99<=%.1fms max=%.1fms" % (
+            self.count, self.total / self.count * 1000,
+            self.quantile(0.5) * 1000, self.quantile(0.99) * 1000,
+            self.max * 1000)
+
+
+class Holder:
+
+    thread: str
+    method: str
+    path: str
+    mode: str
+    since: float
+
+    def __init__(self, method: str, path: str, mode: str) -> None:
+        self.thread = threading.current_thread().name
+        self.method = method
+        self.path = path
+        self.mode = mode
+        self.since = time.monotonic()
+
+    def __str__(self) -> str:
+        return "%s %r (mode: %s, thread: %s, held: %.3fs)" % (
+            self.method or "-", self.path, self.mode, self.thread,
+            time.monotonic() - self.since)
+
+
+class LockStats:
+    """Thread-safe statistics of the storage locks.
+
+    Statistics are logged every ``interval`` seconds (0: never). Waits
+    longer than ``wait_threshold`` seconds are logged together with the
+    holders of the lock (0: never).
+
+    """
+
+    interval: int
+    wait_threshold: float
+
+    _lock: threading.Lock
+    _local: threading.local
+    _wait: Dict[Tuple[str, str, str], Histogram]
+    _hold: Dict[Tuple[str, str, str], Histogram]
+    _waiters: Dict[str, int]
+    _holders: Dict[str, List[Holder]]
+    _start: float
+    _last_log: float
+
+    def __init__(self, interval: int, wait_threshold: float) -> None:
+        self.interval = interval
+        self.wait_threshold = wait_threshold
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._wait = {}
+        self._hold = {}
+        self._waiters = {}
+        self._holders = {}
+        self._start = self._last_log = time.monotonic()
+
+    @types.contextmanager
+    def request(self, method: str, path: str) -> Iterator[None]:
+        """Set the request of the current thread for locks acquired within
+        the context."""
+        previous = getattr(self._local, "request", None)
+        self._local.request = (method, path)
+        try:
+            yield
+        finally:
+            self._local.request = previous
+
+    @types.contextmanager
+    def acquire(self, lock: pathutils.RwLock, mode: str, kind: str,
+                name: str) -> Iterator[None]:
+        """Acquire ``lock`` and record the wait and hold times.
+
+        ``name`` identifies the lock (e.g. the path of the lock file).
+
+        """
+        method, path = getattr(self._local, "request", None) or ("", "")
+        key = (kind, mode, method or "-")
+        holder = Holder(method, path, mode)
+        with self._lock:
+            self._waiters[kind] = self._waiters.get(kind, 0) + 1
+            holders_before = list(self._holders.get(name, ()))
+        begin = time.monotonic()
+        with contextlib.ExitStack() as lock_stack:
+            try:
+                lock_stack.enter_context(lock.acquire(mode))
+            finally:
+                with self._lock:
+                    self._waiters[kind] -= 1
+            acquired = holder.since = time.monotonic()
+            wait = acquired - begin
+            with self._lock:
+                self._wait.setdefault(key, Histogram()).add(wait)
+                self._holders.setdefault(name, []).append(holder)
+            if self.wait_threshold and wait >= self.wait_threshold:
+                logger.warning(
+                    "Waited %.3fs for %s lock %r (mode: %s) for %s %r, held "
+                    "by: %s", wait, kind, name, mode, method or "-", path,
+                    "; ".join(map(str, holders_before)) or "other process")
+            try:
+                yield
+            finally:
+                released = time.monotonic()
+                with self._lock:
+                    self._hold.setdefault(key, Histogram()).add(
+                        released - acquired)
+                    self._holders[name].remove(holder)
+                    if not self._holders[name]:
+                        del self._holders[name]
+                    log = bool(self.interval and
+                               released - self._last_log >= self.interval)
+                    if log:
+                        self._last_log = released
+        if log:
+            self.log()
+
+    def snapshot(self) -> Tuple[Dict[Tuple[str, str, str], Histogram],
+                                Dict[Tuple[str, str, str], Histogram],
+                                Dict[str, int]]:
+        """Get copies of the histograms of wait and hold times by (kind,
+        mode, method) and the current number of waiters by kind."""
+        with self._lock:
+            return ({key: copy.deepcopy(h) for key, h in self._wait.items()},
+                    {key: copy.deepcopy(h) for key, h in self._hold.items()},
+                    dict(self._waiters))
+
+    def log(self) -> None:
+        wait, hold, waiters = self.snapshot()
+        lines = ["%s %s %s: wait %s, hold %s" % (
+                     *key, wait.get(key, Histogram()),
+                     hold.get(key, Histogram()))
+                 for key in sorted(set(wait) | set(hold))]
+        logger.info("Storage lock statistics after %d seconds (waiters: "
+                    "%s):\n%s", time.monotonic() - self._start,
+                    ", ".join("%s=%d" % item
+                              for item in sorted(waiters.items())) or "none",
+                    "\n".join(lines) or "(no locks acquired)")
+
+
+def acquire(stats: Optional[LockStats], lock: pathutils.RwLock, mode: str,
+            kind: str, name: str) -> ContextManager[None]:
+    """Acquire ``lock`` with statistics if ``stats`` is set."""
+    if stats is None:
+        return lock.acquire(mode)
+    return stats.acquire(lock, mode, kind, name)
@@ -0,0 +1,111 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+In-memory caches shared by all requests of a process.
+
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+from radicale.log import logger
+
+_V = TypeVar("_V")
+
+# Log statistics after this number of lookups
+STATISTICS_INTERVAL: int = 10000
+
+
+class LRUCache(Generic[_V]):
+    """Thread-safe cache that discards the least recently used entries.
+
+    The cache is bounded by the number of entries ``max_entries`` and by the
+    sum of the sizes of the entries ``max_size`` (0: unlimited). The size of
+    an entry is calculated with ``sizeof``.
+
+    """
+
+    name: str
+    max_entries: int
+    max_size: int
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+
+    _sizeof: Callable[[_V], int]
+    _lock: threading.Lock
+    _entries: "OrderedDict[Hashable, Tuple[_V, int]]"
+
+    def __init__(self, name: str, max_entries: int, max_size: int = 0,
+                 sizeof: Callable[[_V], int] = lambda value: 1) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = self.hits = self.misses = self.evictions = 0
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[_V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            if (self.hits + self.misses) % STATISTICS_INTERVAL == 0:
+                self._log_statistics()
+        return None if entry is None else entry[0]
+
+    def put(self, key: Hashable, value: _V) -> None:
+        size = self._sizeof(value)
+        if self.max_size and size > self.max_size:
+            return
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self.size -= old_entry[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while (len(self._entries) > self.max_entries or
+                   self.max_size and self.size > self.max_size):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _log_statistics(self) -> None:
+        logger.info("Storage %s memory cache statistics: entries=%d size=%d "
+                    "hits=%d misses=%d evictions=%d", self.name,
+                    len(self._entries), self.size, self.hits, self.misses,
+                    self.evictions)
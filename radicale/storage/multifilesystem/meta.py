@@ -24,9 +24,13 @@ from typing import Mapping, Optional, TextIO, Union, cast, overload
 import radicale.item as radicale_item
 from radicale.storage import multifilesystem
 from radicale.storage.multifilesystem.base import CollectionBase
+from radicale.storage.multifilesystem.ctag import CollectionPartCtag
+from radicale.storage.multifilesystem.journal import CollectionPartJournal
+from radicale.storage.multifilesystem.uid import CollectionPartUid
 
 
-class CollectionPartMeta(CollectionBase):
+class CollectionPartMeta(CollectionPartJournal, CollectionPartCtag,
+                         CollectionPartUid, CollectionBase):
 
     _meta_cache: Optional[Mapping[str, str]]
     _props_path: str
@@ -47,25 +51,44 @@ class CollectionPartMeta(CollectionBase):
     def get_meta(self, key: Optional[str] = None) -> Union[Mapping[str, str],
                                                            Optional[str]]:
         # reuse cached value if the storage is read-only
-        if self._storage._lock.locked == "w" or self._meta_cache is None:
-            try:
+        if self._storage._lock_mode(self.path) == "w" or self._meta_cache is None:
+            props_cache = self._storage._props_cache
+            generation = None
+            if props_cache is not None:
+                generation = self._storage._get_generation(
+                    self._filesystem_path, ".Radicale.props")
+            cached = None
+            if props_cache is not None and generation is not None:
+                cached = props_cache.get(self._filesystem_path)
+            if cached is not None and cached[0] == generation:
+                self._meta_cache = cached[1]
+            else:
                 try:
-                    with open(self._props_path, encoding=self._encoding) as f:
-                        temp_meta = json.load(f)
-                except FileNotFoundError:
-                    temp_meta = {}
-                self._meta_cache = radicale_item.check_and_sanitize_props(
-                    temp_meta)
-            except ValueError as e:
-                raise RuntimeError("Failed to load properties of collection "
-                                   "%r: %s" % (self.path, e)) from e
+                    try:
+                        with open(self._props_path,
+                                  encoding=self._encoding) as f:
+                            temp_meta = json.load(f)
+                    except FileNotFoundError:
+                        temp_meta = {}
+                    self._meta_cache = radicale_item.check_and_sanitize_props(
+                        temp_meta)
+                except ValueError as e:
+                    raise RuntimeError("Failed to load properties of "
+                                       "collection %r: %s" %
+                                       (self.path, e)) from e
+                if props_cache is not None and generation is not None:
+                    props_cache.put(self._filesystem_path,
+                                    (generation, self._meta_cache))
         return self._meta_cache if key is None else self._meta_cache.get(key)
 
     def set_meta(self, props: Mapping[str, str]) -> None:
         # TODO: better fix for "mypy"
-        try:
-            with self._atomic_write(self._props_path, "w") as fo:  # type: ignore
-                f = cast(TextIO, fo)
-                json.dump(props, f, sort_keys=True)
-        except OSError as e:
-            raise ValueError("Failed to write meta data %r %s" % (self._props_path, e)) from e
+        # The indexes only need to follow the modification of the folder
+        with self._update_uid_index(), self._update_ctag(), \
+                self._update_sync_journal():
+            try:
+                with self._atomic_write(self._props_path, "w") as fo:  # type: ignore
+                    f = cast(TextIO, fo)
+                    json.dump(props, f, sort_keys=True)
+            except OSError as e:
+                raise ValueError("Failed to write meta data %r %s" % (self._props_path, e)) from e
@@ -0,0 +1,148 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Metadata index of the 'item' cache of a collection.
+
+The index contains the metadata of the items (etag, UID, name, component
+name and time range) without their text, which is loaded from the 'item'
+cache only when it is needed. Like entries of the item memory cache,
+entries are validated with the inode, size and mtime of the item file,
+which is not read on a hit. The hash of the item file is the key of the
+entry of the 'item' cache with the text.
+
+Entries are appended to the file as binary records, the last entry of an
+href wins. The file is rewritten without outdated entries when they make
+up the majority or if its end is damaged.
+
+"""
+
+import contextlib
+import os
+import threading
+from typing import AbstractSet, BinaryIO, Dict, NamedTuple, Optional, cast
+
+from radicale.log import logger
+from radicale.storage.multifilesystem import records
+from radicale.storage.multifilesystem.base import CollectionBase
+
+INDEX_NAME: str = ".Radicale.meta"
+
+# Don't rewrite small files
+COMPACT_MIN_RECORDS: int = 64
+
+ItemMeta = NamedTuple("ItemMeta", [
+    ("hash", str), ("uid", str), ("etag", str), ("name", str), ("tag", str),
+    ("start", int), ("end", int), ("signature", tuple)])
+
+# href, ``ItemMeta`` and the signature (inode, size and mtime)
+_TYPES: bytes = b"ssssssiiiii"
+
+
+def _dumps(href: str, entry: ItemMeta) -> bytes:
+    return records.dumps(records.ITEM_META,
+                         (href, *entry[:-1], *entry.signature))
+
+
+class ItemMetaIndex:
+    """Metadata index stored in ``folder``, safe to use from multiple
+    threads."""
+
+    path: str
+
+    _lock: threading.Lock
+    _entries: Optional[Dict[str, ItemMeta]]
+    _records: int
+    _damaged: bool
+
+    def __init__(self, folder: str) -> None:
+        self.path = os.path.join(folder, INDEX_NAME)
+        self._lock = threading.Lock()
+        self._entries = None
+        self._records = 0
+        self._damaged = False
+
+    def _load(self) -> Dict[str, ItemMeta]:
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return self._entries
+        try:
+            for href, *fields in records.loads_many(
+                    data, records.ITEM_META, _TYPES):
+                self._entries[cast(str, href)] = ItemMeta(
+                    *fields[:7], tuple(fields[7:]))  # type: ignore[arg-type,call-arg]
+                self._records += 1
+        except ValueError as e:
+            # Race: Other processes might be appending to the file
+            logger.debug("Ignoring damaged end of metadata index %r: %s",
+                         self.path, e)
+            self._damaged = True
+        return self._entries
+
+    def lookup(self, href: str, signature: tuple) -> Optional[ItemMeta]:
+        with self._lock:
+            entry = self._load().get(href)
+        if entry is None or entry.signature != signature:
+            return None
+        return entry
+
+    def update(self, collection: CollectionBase, href: str,
+               entry: ItemMeta) -> None:
+        with self._lock:
+            entries = self._load()
+            if entries.get(href) == entry:
+                return
+            entries[href] = entry
+            self._records += 1
+            if (self._damaged or self._records > max(COMPACT_MIN_RECORDS,
+                                                     2 * len(entries))):
+                self._save(collection)
+                return
+            collection._storage._makedirs_synced(os.path.dirname(self.path))
+            # Appending a single record is atomic, entries appended by other
+            # processes are kept
+            with contextlib.suppress(PermissionError), \
+                    open(self.path, "ab") as f:
+                f.write(_dumps(href, entry))
+
+    def clean(self, collection: CollectionBase,
+              hrefs: AbstractSet[str]) -> None:
+        """Remove all entries of items that are not in ``hrefs``."""
+        with self._lock:
+            entries = self._load()
+            for href in [href for href in entries if href not in hrefs]:
+                del entries[href]
+            if (self._damaged or
+                    self._records > max(COMPACT_MIN_RECORDS, len(entries))):
+                self._save(collection)
+
+    def _save(self, collection: CollectionBase) -> None:
+        assert self._entries is not None
+        collection._storage._makedirs_synced(os.path.dirname(self.path))
+        # Race: Entries appended by other processes in the meantime are lost,
+        # they are recreated from the 'item' cache.
+        # TODO: better fix for "mypy"
+        with contextlib.suppress(PermissionError), collection._atomic_write(  # type: ignore
+                self.path, "wb") as fo:
+            cast(BinaryIO, fo).write(b"".join(
+                _dumps(href, entry) for href, entry in self._entries.items()))
+        self._records = len(self._entries)
+        self._damaged = False
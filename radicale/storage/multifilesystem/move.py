@@ -17,6 +17,7 @@
 # You should have received a copy of the GNU General Public License
 # along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
 
+import contextlib
 import os
 
 from radicale import item as radicale_item
@@ -37,14 +38,59 @@ class StoragePartMove(StorageBase):
         assert item.href
         move_from = pathutils.path_to_filesystem(item.collection._filesystem_path, item.href)
         move_to = pathutils.path_to_filesystem(to_collection._filesystem_path, to_href)
-        try:
-            os.replace(move_from, move_to)
-        except OSError as e:
-            raise ValueError("Failed to move file %r => %r %s" % (move_from, move_to, e)) from e
-        self._sync_directory(to_collection._filesystem_path)
-        if item.collection._filesystem_path != to_collection._filesystem_path:
-            self._sync_directory(item.collection._filesystem_path)
+        with contextlib.ExitStack() as stack:
+            uid_index = stack.enter_context(item.collection._update_uid_index())
+            ctag_state = stack.enter_context(item.collection._update_ctag())
+            journal_hrefs = stack.enter_context(item.collection._update_sync_journal())
+            to_uid_index = uid_index
+            to_ctag_state = ctag_state
+            to_journal_hrefs = journal_hrefs
+            if item.collection._filesystem_path != to_collection._filesystem_path:
+                to_uid_index = stack.enter_context(to_collection._update_uid_index())
+                to_ctag_state = stack.enter_context(to_collection._update_ctag())
+                to_journal_hrefs = stack.enter_context(to_collection._update_sync_journal())
+            replaced_item = None
+            if to_ctag_state is not None:
+                replaced_item = to_collection._get(to_href, verify_href=False)
+            try:
+                os.replace(move_from, move_to)
+            except OSError as e:
+                raise ValueError("Failed to move file %r => %r %s" % (move_from, move_to, e)) from e
+            self._sync_directory(to_collection._filesystem_path)
+            if item.collection._filesystem_path != to_collection._filesystem_path:
+                self._sync_directory(item.collection._filesystem_path)
+            if uid_index is not None:
+                uid_index.remove(item.href)
+            if to_uid_index is not None:
+                to_uid_index.set(to_href, item.uid)
+            if ctag_state is not None:
+                ctag_state.toggle(item.href, item.etag)
+            if to_ctag_state is not None:
+                if replaced_item is not None:
+                    to_ctag_state.toggle(to_href, replaced_item.etag)
+                to_ctag_state.toggle(to_href, item.etag)
+            if journal_hrefs is not None:
+                journal_hrefs.append(item.href)
+            if to_journal_hrefs is not None:
+                to_journal_hrefs.append(to_href)
         # Move the item cache entry
+        if self._use_packed_item_cache is True:
+            item.collection._move_packed_item_cache(
+                item.href, to_collection, to_href)
+        else:
+            self._move_item_cache(item, to_collection, to_href)
+        # Track the change
+        to_collection._update_history_etag(to_href, item)
+        item.collection._update_history_etag(item.href, None)
+        to_collection._clean_history()
+        if item.collection._filesystem_path != to_collection._filesystem_path:
+            item.collection._clean_history()
+
+    def _move_item_cache(self, item: radicale_item.Item,
+                         to_collection: "multifilesystem.Collection",
+                         to_href: str) -> None:
+        assert isinstance(item.collection, multifilesystem.Collection)
+        assert item.href
         cache_folder = self._get_collection_cache_subfolder(item.collection._filesystem_path, ".Radicale.cache", "item")
         to_cache_folder = self._get_collection_cache_subfolder(to_collection._filesystem_path, ".Radicale.cache", "item")
         self._makedirs_synced(to_cache_folder)
@@ -61,9 +107,3 @@ class StoragePartMove(StorageBase):
             self._makedirs_synced(to_cache_folder)
             if cache_folder != to_cache_folder:
                 self._makedirs_synced(cache_folder)
-        # Track the change
-        to_collection._update_history_etag(to_href, item)
-        item.collection._update_history_etag(item.href, None)
-        to_collection._clean_history()
-        if item.collection._filesystem_path != to_collection._filesystem_path:
-            item.collection._clean_history()
@@ -0,0 +1,366 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Packed item cache of a collection.
+
+All cache entries of a collection are appended to one data file
+(``.Radicale.pack``). The file ``.Radicale.index`` maps the hrefs to the
+entries in the data file. It consists of a header, a part sorted by key
+and an unsorted tail of recently appended entries. The index is memory
+mapped and searched without reading the entries of other items.
+
+The tail is merged into the sorted part once it grows too large. The data
+file is compacted, when most of its entries are superseded or deleted.
+
+"""
+
+import contextlib
+import mmap
+import os
+import struct
+import threading
+from hashlib import sha256
+from typing import (TYPE_CHECKING, AbstractSet, BinaryIO, Dict, Iterable,
+                    Optional, Tuple, cast)
+
+from radicale.log import logger
+from radicale.storage.multifilesystem import records
+
+if TYPE_CHECKING:
+    from radicale.storage.multifilesystem.base import CollectionBase
+
+PACK_NAME: str = ".Radicale.pack"
+INDEX_NAME: str = ".Radicale.index"
+
+_PACK_MAGIC: bytes = b"RADPACK2"
+_INDEX_MAGIC: bytes = b"RADINDX1"
+# magic, generation, number of sorted entries (index only)
+_HEADER = struct.Struct(">8s16sI")
+# key, offset of the record in the data file, length of the payload
+_ENTRY = struct.Struct(">16sQI")
+# length of the payload
+_RECORD = struct.Struct(">I")
+# Merge the unsorted tail into the sorted part of the index
+_MERGE_MIN_TAIL: int = 256
+# Compact the data file if it contains more dead data than this
+_COMPACT_MIN_DEAD: int = 65536
+
+
+def _key(href: str) -> bytes:
+    return sha256(href.encode()).digest()[:16]
+
+
+class PackedItemCache:
+    """Packed item cache in ``folder`` of ``collection``.
+
+    Entries are tuples of the form ``(cache_hash, *content)``, they are
+    stored as binary records.
+
+    Writing requires exclusive access to the cache (storage write lock or
+    lock of the whole item cache of the collection, the locks of single
+    entries are not sufficient). Reading is always possible.
+
+    """
+
+    _collection: "CollectionBase"
+    _folder: str
+    _pack_path: str
+    _index_path: str
+    _index_map: Optional[mmap.mmap]
+    _pack_map: Optional[mmap.mmap]
+    _index_stat: Optional[Tuple[int, int]]
+    _sorted_count: int
+    _count: int
+    _lock: threading.RLock
+
+    def __init__(self, collection: "CollectionBase", folder: str) -> None:
+        self._collection = collection
+        self._folder = folder
+        self._pack_path = os.path.join(folder, PACK_NAME)
+        self._index_path = os.path.join(folder, INDEX_NAME)
+        self._index_map = self._pack_map = None
+        self._index_stat = None
+        self._sorted_count = self._count = 0
+        # The maps are shared by the threads of parallel multiget reports
+        self._lock = threading.RLock()
+
+    @property
+    def path(self) -> str:
+        return self._pack_path
+
+    def close(self) -> None:
+        with self._lock:
+            for m in (self._index_map, self._pack_map):
+                if m is not None:
+                    m.close()
+            self._index_map = self._pack_map = None
+            self._index_stat = None
+
+    def _open(self) -> bool:
+        self.close()
+        try:
+            with open(self._index_path, "rb") as f:
+                st = os.fstat(f.fileno())
+                index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(self._pack_path, "rb") as f:
+                pack_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # ValueError: empty files can't be mapped
+            return False
+        try:
+            magic, generation, sorted_count = _HEADER.unpack_from(index_map)
+            pack_magic, pack_generation, _ = _HEADER.unpack_from(pack_map)
+        except struct.error:
+            index_map.close()
+            pack_map.close()
+            return False
+        count = (len(index_map) - _HEADER.size) // _ENTRY.size
+        if (magic != _INDEX_MAGIC or pack_magic != _PACK_MAGIC or
+                generation != pack_generation or sorted_count > count):
+            # Race: Another process might be compacting the data file.
+            index_map.close()
+            pack_map.close()
+            return False
+        self._index_map, self._pack_map = index_map, pack_map
+        self._index_stat = (st.st_ino, st.st_size)
+        self._sorted_count, self._count = sorted_count, count
+        return True
+
+    def _changed(self) -> bool:
+        try:
+            st = os.stat(self._index_path)
+        except FileNotFoundError:
+            return self._index_stat is not None
+        return self._index_stat != (st.st_ino, st.st_size)
+
+    def _find(self, key: bytes) -> Optional[Tuple[int, int]]:
+        index_map = self._index_map
+        assert index_map is not None
+        # Newer entries in the unsorted tail supersede the sorted part
+        tail_start = _HEADER.size + self._sorted_count * _ENTRY.size
+        tail_end = _HEADER.size + self._count * _ENTRY.size
+        while tail_end > tail_start:
+            pos = index_map.rfind(key, tail_start, tail_end)
+            if pos == -1:
+                break
+            if (pos - tail_start) % _ENTRY.size == 0:
+                _, offset, length = _ENTRY.unpack_from(index_map, pos)
+                return offset, length
+            tail_end = pos + len(key) - 1
+        lo, hi = 0, self._sorted_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = _HEADER.size + mid * _ENTRY.size
+            if index_map[pos:pos + len(key)] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._sorted_count:
+            pos = _HEADER.size + lo * _ENTRY.size
+            entry_key, offset, length = _ENTRY.unpack_from(index_map, pos)
+            if entry_key == key:
+                return offset, length
+        return None
+
+    def _read(self, href: str, offset: int, length: int) -> Optional[tuple]:
+        pack_map = self._pack_map
+        assert pack_map is not None
+        start = offset + _RECORD.size
+        if length == 0 or start + length > len(pack_map):
+            return None
+        try:
+            record_length, = _RECORD.unpack_from(pack_map, offset)
+            if record_length != length:
+                raise ValueError("record length mismatch")
+            record_href, *entry = records.loads(
+                pack_map[start:start + length], records.PACKED_ITEM)
+        except (ValueError, struct.error) as e:
+            logger.warning("Failed to load packed item cache entry %r in %r: "
+                           "%s", href, self._collection.path, e, exc_info=True)
+            return None
+        if record_href != href:
+            # Collision of the keys
+            return None
+        return tuple(entry)
+
+    def load(self, href: str, cache_hash: Optional[str] = None
+             ) -> Optional[tuple]:
+        """Load the entry of ``href``.
+
+        If ``cache_hash`` is set, only a matching entry is returned.
+
+        """
+        def valid(entry: Optional[tuple]) -> bool:
+            return entry is not None and (cache_hash is None or
+                                          entry[0] == cache_hash)
+
+        with self._lock:
+            if self._index_map is None and not self._open():
+                return None
+            key = _key(href)
+            position = self._find(key)
+            entry = None if position is None else self._read(href, *position)
+            if not valid(entry) and self._changed():
+                # Race: Another process might have updated the cache.
+                if not self._open():
+                    return None
+                position = self._find(key)
+                entry = None if position is None else self._read(href, *position)
+            return entry if valid(entry) else None
+
+    def _read_index(self) -> Tuple[bytes, int, Dict[bytes, Tuple[int, int]]]:
+        with open(self._index_path, "rb") as f:
+            data = f.read()
+        _, generation, sorted_count = _HEADER.unpack_from(data)
+        entries: Dict[bytes, Tuple[int, int]] = {}
+        for pos in range(_HEADER.size, len(data) - _ENTRY.size + 1,
+                         _ENTRY.size):
+            key, offset, length = _ENTRY.unpack_from(data, pos)
+            entries[key] = (offset, length)
+        tail = (len(data) - _HEADER.size) // _ENTRY.size - sorted_count
+        return generation, tail, entries
+
+    def _write_index(self, generation: bytes,
+                     entries: Dict[bytes, Tuple[int, int]]) -> None:
+        # Race: Other processes might have locked the file (Windows).
+        with contextlib.suppress(PermissionError), \
+                self._collection._atomic_write(  # type: ignore
+                    self._index_path, "wb") as fo:
+            fb = cast(BinaryIO, fo)
+            fb.write(_HEADER.pack(_INDEX_MAGIC, generation, len(entries)))
+            fb.write(b"".join(_ENTRY.pack(key, *entries[key])
+                              for key in sorted(entries)))
+
+    def _prepare(self) -> None:
+        """Create or repair the data file and the index."""
+        try:
+            with open(self._pack_path, "rb") as f:
+                pack_magic, pack_generation, _ = _HEADER.unpack(
+                    f.read(_HEADER.size))
+            with open(self._index_path, "rb") as f:
+                magic, generation, _ = _HEADER.unpack(f.read(_HEADER.size))
+                size = os.fstat(f.fileno()).st_size
+        except (FileNotFoundError, struct.error):
+            pass
+        else:
+            if (pack_magic == _PACK_MAGIC and magic == _INDEX_MAGIC and
+                    pack_generation == generation):
+                excess = (size - _HEADER.size) % _ENTRY.size
+                if excess:
+                    # Remove incomplete entry of an interrupted write
+                    os.truncate(self._index_path, size - excess)
+                return
+        logger.debug("Initializing packed item cache in %r",
+                     self._collection.path)
+        self.close()
+        generation = os.urandom(16)
+        with self._collection._atomic_write(  # type: ignore
+                self._pack_path, "wb") as fo:
+            fb = cast(BinaryIO, fo)
+            fb.write(_HEADER.pack(_PACK_MAGIC, generation, 0))
+        self._write_index(generation, {})
+
+    def store_many(self, entries: Iterable[Tuple[str, tuple]]) -> None:
+        """Append the entries of the form ``(href, entry)``."""
+        with self._lock:
+            storage_ = self._collection._storage
+            storage_._makedirs_synced(self._folder)
+            self._prepare()
+            self.close()
+            index_entries = []
+            with open(self._pack_path, "ab") as pack:
+                pack.seek(0, os.SEEK_END)
+                offset = pack.tell()
+                for href, entry in entries:
+                    payload = records.dumps(records.PACKED_ITEM,
+                                            (href, *entry))
+                    pack.write(_RECORD.pack(len(payload)))
+                    pack.write(payload)
+                    index_entries.append(
+                        _ENTRY.pack(_key(href), offset, len(payload)))
+                    offset += _RECORD.size + len(payload)
+                pack.flush()
+                storage_._fsync(pack)
+            self._append_index(index_entries)
+
+    def store(self, href: str, entry: tuple) -> None:
+        """Append the entry of ``href``."""
+        self.store_many(((href, entry),))
+
+    def remove(self, href: str) -> None:
+        """Mark the entry of ``href`` as deleted."""
+        with self._lock:
+            if not os.path.exists(self._index_path):
+                return
+            self._prepare()
+            self.close()
+            self._append_index([_ENTRY.pack(_key(href), 0, 0)])
+
+    def _append_index(self, index_entries: Iterable[bytes]) -> None:
+        with open(self._index_path, "ab") as index:
+            index.write(b"".join(index_entries))
+            index.flush()
+            self._collection._storage._fsync(index)
+        generation, tail, entries = self._read_index()
+        if tail > max(_MERGE_MIN_TAIL, (len(entries) - tail) // 8):
+            self._merge(generation, entries)
+
+    def clean(self, hrefs: AbstractSet[str]) -> None:
+        """Remove all entries of items that are not in ``hrefs``."""
+        with self._lock:
+            if not os.path.exists(self._index_path):
+                return
+            self._prepare()
+            self.close()
+            keys = {_key(href) for href in hrefs}
+            generation, _, entries = self._read_index()
+            self._merge(generation, {key: entry for key, entry in entries.items()
+                                     if key in keys})
+
+    def _merge(self, generation: bytes,
+               entries: Dict[bytes, Tuple[int, int]]) -> None:
+        live = {key: entry for key, entry in entries.items() if entry[1] > 0}
+        live_size = sum(_RECORD.size + length for _, length in live.values())
+        dead_size = (os.path.getsize(self._pack_path) - _HEADER.size -
+                     live_size)
+        if dead_size <= max(_COMPACT_MIN_DEAD, live_size):
+            logger.debug("Merging packed item cache index in %r",
+                         self._collection.path)
+            self._write_index(generation, live)
+            return
+        logger.debug("Compacting packed item cache in %r (dead: %d bytes)",
+                     self._collection.path, dead_size)
+        generation = os.urandom(16)
+        compacted = {}
+        try:
+            with open(self._pack_path, "rb") as old_pack, \
+                    self._collection._atomic_write(  # type: ignore
+                        self._pack_path, "wb") as fo:
+                fb = cast(BinaryIO, fo)
+                fb.write(_HEADER.pack(_PACK_MAGIC, generation, 0))
+                offset = _HEADER.size
+                # Copy the records in the order of the old data file
+                for key, (old_offset, length) in sorted(
+                        live.items(), key=lambda e: e[1][0]):
+                    old_pack.seek(old_offset)
+                    fb.write(old_pack.read(_RECORD.size + length))
+                    compacted[key] = (offset, length)
+                    offset += _RECORD.size + length
+        except PermissionError:
+            # Race: Other processes might have locked the file (Windows).
+            return
+        self._write_index(generation, compacted)
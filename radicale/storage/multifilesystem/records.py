@@ -0,0 +1,188 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Binary records of the cache files.
+
+A record consists of a header, the types and lengths of its fields, the
+data of the fields and the CRC-32 of everything before it. The header
+contains the magic ``RDCR``, the version of the format, the kind of the
+record and the number of fields. Numbers are in network byte order, only
+the CRC-32 is stored in little-endian byte order, the CRC-32 of a valid
+record including its checksum is the constant ``_CRC_RESIDUE``.
+
+Field types:
+ - ``s``: UTF-8 encoded string
+ - ``b``: bytes
+ - ``i``: signed 64-bit integer
+ - ``n``: ``None`` (no data)
+
+Records are parsed without executing code, in contrast to pickle.
+
+"""
+
+import functools
+import struct
+import zlib
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+MAGIC: bytes = b"RDCR"
+VERSION: int = 1
+
+# Kinds of records
+ITEM: int = 1
+HISTORY: int = 2
+TOKEN_STATE_FULL: int = 3
+TOKEN_STATE_DELTA: int = 4
+PACKED_ITEM: int = 5
+ITEM_META: int = 6
+TIME_RANGE_INDEX: int = 7
+UID_INDEX: int = 8
+CTAG_STATE: int = 9
+VERIFY_STATE: int = 10
+
+# magic, version, kind, number of fields
+_HEADER = struct.Struct(">4sBBH")
+_INT = struct.Struct(">q")
+_CRC = struct.Struct("<I")
+_CRC_RESIDUE: int = 0x2144df1c
+
+_STR, _BYTES, _INT_TYPE, _NONE = b"sbin"
+
+Field = Union[str, bytes, int, None]
+
+
+@functools.lru_cache(maxsize=64)
+def _lengths(count: int) -> struct.Struct:
+    return struct.Struct(">%dI" % count)
+
+
+def is_record(data: bytes) -> bool:
+    """Check if ``data`` starts like a record (and not like a pickle)."""
+    return data[:len(MAGIC)] == MAGIC
+
+
+def get_kind(data: bytes) -> int:
+    """Get the kind of the record ``data`` without validating it."""
+    if not is_record(data) or len(data) < _HEADER.size:
+        raise ValueError("not a record")
+    return data[len(MAGIC) + 1]
+
+
+def dumps(kind: int, fields: Sequence[Field]) -> bytes:
+    types = bytearray()
+    values = []
+    for field in fields:
+        if isinstance(field, str):
+            types.append(_STR)
+            values.append(field.encode())
+        elif isinstance(field, bytes):
+            types.append(_BYTES)
+            values.append(field)
+        elif isinstance(field, int):
+            types.append(_INT_TYPE)
+            values.append(_INT.pack(field))
+        elif field is None:
+            types.append(_NONE)
+            values.append(b"")
+        else:
+            raise TypeError("unsupported field type: %r" % type(field))
+    record = b"".join((_HEADER.pack(MAGIC, VERSION, kind, len(values)),
+                       types, _lengths(len(values)).pack(*map(len, values)),
+                       *values))
+    return record + _CRC.pack(zlib.crc32(record))
+
+
+def loads(data: bytes, kind: int, types: Optional[bytes] = None
+          ) -> List[Field]:
+    """Parse the record ``data`` of ``kind``.
+
+    ``types`` are the expected types of the fields (e.g. ``b"ssi"``),
+    ``ValueError`` is raised if they don't match.
+
+    """
+    fields, end = _loads_from(data, 0, kind, types)
+    if end != len(data):
+        raise ValueError("record length mismatch")
+    return fields
+
+
+def loads_header(data: bytes, kind: int, types: Optional[bytes] = None
+                 ) -> Tuple[List[Field], int]:
+    """Parse the first record of ``data`` of ``kind``.
+
+    Returns the fields and the position of the next record.
+
+    """
+    return _loads_from(data, 0, kind, types)
+
+
+def loads_many(data: bytes, kind: int, types: Optional[bytes] = None,
+               start: int = 0) -> Iterator[List[Field]]:
+    """Parse the consecutive records ``data`` of ``kind`` from ``start``.
+
+    ``ValueError`` is raised at the first damaged record.
+
+    """
+    pos = start
+    while pos < len(data):
+        fields, pos = _loads_from(data, pos, kind, types)
+        yield fields
+
+
+def _loads_from(data: bytes, start: int, kind: int, types: Optional[bytes]
+                ) -> Tuple[List[Field], int]:
+    try:
+        magic, version, record_kind, count = _HEADER.unpack_from(data, start)
+    except struct.error as e:
+        raise ValueError("truncated record") from e
+    if magic != MAGIC:
+        raise ValueError("not a record")
+    if version != VERSION:
+        raise ValueError("unsupported record version: %d" % version)
+    if record_kind != kind:
+        raise ValueError("unexpected record kind: %d" % record_kind)
+    pos = start + _HEADER.size + count
+    record_types = data[start + _HEADER.size:pos]
+    if types is not None and record_types != types:
+        raise ValueError("unexpected field types: %r" % record_types)
+    try:
+        lengths = _lengths(count).unpack_from(data, pos)
+    except struct.error as e:
+        raise ValueError("truncated record") from e
+    pos += 4 * count
+    end = pos + sum(lengths) + _CRC.size
+    if end > len(data):
+        raise ValueError("truncated record")
+    if zlib.crc32(memoryview(data)[start:end]) != _CRC_RESIDUE:
+        raise ValueError("checksum mismatch")
+    fields: List[Field] = []
+    append = fields.append
+    for field_type, length in zip(record_types, lengths):
+        field_end = pos + length
+        if field_type == _STR:
+            append(data[pos:field_end].decode())
+        elif field_type == _INT_TYPE and length == _INT.size:
+            append(_INT.unpack_from(data, pos)[0])
+        elif field_type == _BYTES:
+            append(data[pos:field_end])
+        elif field_type == _NONE and length == 0:
+            append(None)
+        else:
+            raise ValueError("malformed field of type %r" %
+                             chr(field_type))
+        pos = field_end
+    return fields, end
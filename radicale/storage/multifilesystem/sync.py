@@ -21,43 +21,188 @@ import itertools
 import os
 import pickle
 from hashlib import sha256
-from typing import BinaryIO, Iterable, Tuple, cast
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple, Union, cast
 
 from radicale.log import logger
+from radicale.storage.multifilesystem import records
 from radicale.storage.multifilesystem.base import CollectionBase
 from radicale.storage.multifilesystem.cache import CollectionPartCache
 from radicale.storage.multifilesystem.history import CollectionPartHistory
+from radicale.storage.multifilesystem.journal import CollectionPartJournal
 
+# Kinds of sync token state files of Radicale < 3.6.1, files without kind
+# contain the pickled state directly
+TOKEN_STATE_FULL: bytes = b"F"
+TOKEN_STATE_DELTA: bytes = b"D"
+# Store a full state after this number of consecutive deltas
+MAX_TOKEN_STATE_DELTAS: int = 16
 
-class CollectionPartSync(CollectionPartCache, CollectionPartHistory,
-                         CollectionBase):
+
+def check_token_name(token_name: str) -> bool:
+    if len(token_name) != 64:
+        return False
+    for c in token_name:
+        if c not in "0123456789abcdef":
+            return False
+    return True
+
+
+def _pack_history_etag(history_etag: str) -> Union[bytes, str]:
+    try:
+        return bytes.fromhex(history_etag)
+    except ValueError:
+        return history_etag
+
+
+def _unpack_history_etag(value: Union[bytes, str]) -> str:
+    return value.hex() if isinstance(value, bytes) else value
+
+
+def _read_token_state(data: bytes, load_pickled: bool
+                      ) -> Tuple[str, Dict[str, Optional[Union[bytes, str]]]]:
+    """Parse a sync token state file.
+
+    Returns the name of the parent token and the delta to its state or
+    an empty name and the full state.
+
+    """
+    fields: List[records.Field]
+    if records.is_record(data) or not load_pickled:
+        if records.get_kind(data) == records.TOKEN_STATE_DELTA:
+            parent_name, *fields = records.loads(
+                data, records.TOKEN_STATE_DELTA)
+            if not isinstance(parent_name, str):
+                raise ValueError("Malformed parent token")
+        else:
+            parent_name = ""
+            fields = records.loads(data, records.TOKEN_STATE_FULL)
+        if len(fields) % 2 != 0:
+            raise ValueError("Odd number of fields")
+        state = dict(zip(fields[::2], fields[1::2]))
+        for href, value in state.items():
+            # Only deltas contain removed items
+            if not isinstance(href, str) or not (
+                    isinstance(value, (bytes, str)) or
+                    value is None and parent_name):
+                raise ValueError("Malformed state")
+        return parent_name, cast(Dict[str, Optional[Union[bytes, str]]],
+                                 state)
+    # Written by Radicale < 3.6.1
+    kind = data[:1]
+    if kind == TOKEN_STATE_DELTA:
+        return data[1:65].decode("ascii"), pickle.loads(data[65:])
+    if kind == TOKEN_STATE_FULL:
+        return "", pickle.loads(data[1:])
+    return "", pickle.loads(data)
+
+
+class CollectionPartSync(CollectionPartJournal, CollectionPartCache,
+                         CollectionPartHistory, CollectionBase):
+
+    def _load_token_state(self, token_folder: str, token_name: str
+                          ) -> Tuple[Dict[str, str], int]:
+        """Load the state of a sync token.
+
+        Returns the state and the number of deltas it is composed of. The
+        modification time of all involved files is updated.
+
+        """
+        deltas = []
+        name = token_name
+        while True:
+            path = os.path.join(token_folder, name)
+            with open(path, "rb") as f:
+                name, values = _read_token_state(
+                    f.read(), self._storage._load_pickled_cache)
+            # Keep older states as long as they are required
+            with contextlib.suppress(FileNotFoundError):
+                os.utime(path)
+            if not name:
+                state = {href: _unpack_history_etag(value)
+                         for href, value in values.items()
+                         if value is not None}
+                break
+            if not check_token_name(name):
+                raise ValueError("Malformed parent token: %r" % name)
+            deltas.append(values)
+            if len(deltas) > MAX_TOKEN_STATE_DELTAS:
+                raise ValueError("Too many deltas")
+        for delta in reversed(deltas):
+            for href, value in delta.items():
+                if value is None:
+                    state.pop(href, None)
+                else:
+                    state[href] = _unpack_history_etag(value)
+        return state, len(deltas)
+
+    def _touch_token_state(self, token_folder: str, token_name: str
+                           ) -> None:
+        """Update the modification time of the state of a sync token and
+        of all states it depends on."""
+        name = token_name
+        for _ in range(MAX_TOKEN_STATE_DELTAS + 1):
+            path = os.path.join(token_folder, name)
+            try:
+                # Race: Another process might have deleted the file.
+                os.utime(path)
+                with open(path, "rb") as f:
+                    name, _ = _read_token_state(
+                        f.read(), self._storage._load_pickled_cache)
+            except (FileNotFoundError, pickle.UnpicklingError, ValueError,
+                    EOFError):
+                break
+            if not check_token_name(name):
+                break
+
+    def _store_token_state(self, token_path: str, state: Dict[str, str],
+                           parent_name: str = "",
+                           parent_state: Optional[Dict[str, str]] = None
+                           ) -> None:
+        """Store the state of a sync token as delta to the state of the
+        token ``parent_name`` or as full state."""
+        fields: List[records.Field] = []
+        if parent_name:
+            assert parent_state is not None
+            fields.append(parent_name)
+            for href, history_etag in state.items():
+                if parent_state.get(href) != history_etag:
+                    fields += (href, _pack_history_etag(history_etag))
+            for href in parent_state:
+                if href not in state:
+                    fields += (href, None)
+            data = records.dumps(records.TOKEN_STATE_DELTA, fields)
+        else:
+            for href, history_etag in state.items():
+                fields += (href, _pack_history_etag(history_etag))
+            data = records.dumps(records.TOKEN_STATE_FULL, fields)
+        # TODO: better fix for "mypy"
+        with self._atomic_write(token_path, "wb") as fo:  # type: ignore
+            fb = cast(BinaryIO, fo)
+            fb.write(data)
 
     def sync(self, old_token: str = "") -> Tuple[str, Iterable[str]]:
         # The sync token has the form http://radicale.org/ns/sync/TOKEN_NAME
         # where TOKEN_NAME is the sha256 hash of all history etags of present
         # and past items of the collection.
-        def check_token_name(token_name: str) -> bool:
-            if len(token_name) != 64:
-                return False
-            for c in token_name:
-                if c not in "0123456789abcdef":
-                    return False
-            return True
-
         old_token_name = ""
         if old_token:
             # Extract the token name from the sync token
             if not old_token.startswith("http://radicale.org/ns/sync/"):
                 raise ValueError("Malformed token: %r" % old_token)
             old_token_name = old_token[len("http://radicale.org/ns/sync/"):]
-            if not check_token_name(old_token_name):
+            if (not self._storage._use_sync_journal and
+                    not check_token_name(old_token_name)):
                 raise ValueError("Malformed token: %r" % old_token)
+        if self._storage._use_sync_journal:
+            token_name, changes = self._sync_journal(old_token_name)
+            return "http://radicale.org/ns/sync/%s" % token_name, changes
         # Get the current state and sync-token of the collection.
         state = {}
         token_name_hash = sha256()
         # Find the history of all existing and deleted items
         for href, item in itertools.chain(
-                ((item.href, item) for item in self.get_all()),
+                ((item.href, item)
+                 for item in self._get_all_projected({"etag"})),
                 ((href, None) for href in self._get_deleted_history_hrefs())):
             history_etag = self._update_history_etag(href, item)
             state[href] = history_etag
@@ -69,17 +214,19 @@ class CollectionPartSync(CollectionPartCache, CollectionPartHistory,
             return token, ()
         token_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "sync-token")
         token_path = os.path.join(token_folder, token_name)
-        old_state = {}
+        old_state: Dict[str, str] = {}
+        old_state_deltas = 0
         if old_token_name:
             # load the old token state
             old_token_path = os.path.join(token_folder, old_token_name)
             try:
                 # Race: Another process might have deleted the file.
-                with open(old_token_path, "rb") as f:
-                    old_state = pickle.load(f)
+                old_state, old_state_deltas = self._load_token_state(
+                    token_folder, old_token_name)
             except (FileNotFoundError, pickle.UnpicklingError,
-                    ValueError) as e:
-                if isinstance(e, (pickle.UnpicklingError, ValueError)):
+                    ValueError, EOFError) as e:
+                if isinstance(e, (pickle.UnpicklingError, ValueError,
+                                  EOFError)):
                     logger.warning(
                         "Failed to load stored sync token %r in %r: %s",
                         old_token_name, self.path, e, exc_info=True)
@@ -92,12 +239,17 @@ class CollectionPartSync(CollectionPartCache, CollectionPartHistory,
         # existing token state
         if not os.path.exists(token_path):
             self._storage._makedirs_synced(token_folder)
+            # Store small changes as delta to the old token
+            parent_name = ""
+            if (old_token_name and
+                    old_state_deltas < MAX_TOKEN_STATE_DELTAS and
+                    len(set(state.items()) ^ set(old_state.items())) <
+                    len(state) // 2):
+                parent_name = old_token_name
             try:
                 # Race: Other processes might have created and locked the file.
-                # TODO: better fix for "mypy"
-                with self._atomic_write(token_path, "wb") as fo:  # type: ignore
-                    fb = cast(BinaryIO, fo)
-                    pickle.dump(state, fb)
+                self._store_token_state(token_path, state, parent_name,
+                                        old_state)
             except PermissionError:
                 pass
             else:
@@ -107,9 +259,7 @@ class CollectionPartSync(CollectionPartCache, CollectionPartHistory,
                 self._clean_history()
         else:
             # Try to update the modification time
-            with contextlib.suppress(FileNotFoundError):
-                # Race: Another process might have deleted the file.
-                os.utime(token_path)
+            self._touch_token_state(token_folder, token_name)
         changes = []
         # Find all new, changed and deleted (that are still in the item cache)
         # items
@@ -0,0 +1,159 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Time range index of a collection.
+
+The index maps the hrefs of the items to their component name and the
+enclosing time range. Entries are validated with the inode, size and mtime
+of the item file.
+
+The file consists of binary records, the first contains the cache version,
+followed by one record for each entry.
+
+For queries the entries are sorted by start and augmented with the maximum
+end of all preceding entries. Items without end (e.g. infinite recurrences)
+are kept in a separate list, which is always checked.
+
+"""
+
+import contextlib
+import os
+from bisect import bisect_left
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, cast
+
+from radicale import storage
+from radicale.item import filter as radicale_filter
+from radicale.log import logger
+from radicale.storage.multifilesystem import records
+from radicale.storage.multifilesystem.base import CollectionBase
+
+INDEX_NAME: str = ".Radicale.timerange"
+
+TimeRangeEntry = NamedTuple("TimeRangeEntry", [
+    ("signature", tuple), ("tag", str), ("start", int), ("end", int)])
+
+# href, signature (inode, size and mtime), tag, start and end
+_TYPES: bytes = b"siiisii"
+
+
+def file_signature(st: os.stat_result) -> tuple:
+    """Identify the content of an item file without reading it."""
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class TimeRangeIndex:
+    """Time range index stored in ``folder``."""
+
+    path: str
+    entries: Dict[str, TimeRangeEntry]
+    modified: bool
+
+    _starts: Optional[List[int]]
+    _max_ends: List[int]
+    _sorted: List[str]
+    _unbounded: List[str]
+
+    def __init__(self, folder: str) -> None:
+        self.path = os.path.join(folder, INDEX_NAME)
+        self.entries = {}
+        self.modified = False
+        self._starts = None
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+            (version,), start = records.loads_header(
+                data, records.TIME_RANGE_INDEX, b"b")
+            if version != storage.CACHE_VERSION:
+                return
+            entries = {}
+            for href, ino, size, mtime_ns, *fields in records.loads_many(
+                    data, records.TIME_RANGE_INDEX, _TYPES, start):
+                entries[cast(str, href)] = TimeRangeEntry(
+                    (ino, size, mtime_ns), *fields)  # type: ignore[arg-type]
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            logger.warning("Failed to load time range index %r: %s",
+                           self.path, e, exc_info=True)
+            return
+        self.entries = entries
+
+    def save(self, collection: CollectionBase) -> None:
+        collection._storage._makedirs_synced(os.path.dirname(self.path))
+        # Race: Other processes might have locked the file.
+        # TODO: better fix for "mypy"
+        with contextlib.suppress(PermissionError), collection._atomic_write(  # type: ignore
+                self.path, "wb") as fo:
+            cast(BinaryIO, fo).write(b"".join((
+                records.dumps(records.TIME_RANGE_INDEX,
+                              (storage.CACHE_VERSION,)),
+                *(records.dumps(records.TIME_RANGE_INDEX,
+                                (href, *entry.signature, entry.tag,
+                                 entry.start, entry.end))
+                  for href, entry in self.entries.items()))))
+        self.modified = False
+
+    def lookup(self, href: str, signature: tuple
+               ) -> Optional[TimeRangeEntry]:
+        entry = self.entries.get(href)
+        if entry is None or entry.signature != signature:
+            return None
+        return entry
+
+    def update(self, href: str, entry: TimeRangeEntry) -> None:
+        if self.entries.get(href) != entry:
+            self.entries[href] = entry
+            self.modified = True
+            self._starts = None
+
+    def remove(self, href: str) -> None:
+        if self.entries.pop(href, None) is not None:
+            self.modified = True
+            self._starts = None
+
+    def _build(self) -> List[int]:
+        bounded = []
+        self._unbounded = []
+        for href, entry in self.entries.items():
+            if entry.end >= radicale_filter.TIMESTAMP_MAX:
+                self._unbounded.append(href)
+            else:
+                bounded.append((entry.start, entry.end, href))
+        bounded.sort()
+        self._starts = [start for start, _, _ in bounded]
+        self._sorted = [href for _, _, href in bounded]
+        self._max_ends = []
+        max_end = radicale_filter.TIMESTAMP_MIN
+        for _, end, _ in bounded:
+            max_end = max(max_end, end)
+            self._max_ends.append(max_end)
+        return self._starts
+
+    def query(self, start: int, end: int) -> Iterator[str]:
+        """Get the hrefs of all entries that overlap the time range."""
+        starts = self._starts if self._starts is not None else self._build()
+        for i in range(bisect_left(starts, end) - 1, -1, -1):
+            if self._max_ends[i] <= start:
+                break
+            href = self._sorted[i]
+            if self.entries[href].end > start:
+                yield href
+        for href in self._unbounded:
+            if self.entries[href].start < end:
+                yield href
@@ -0,0 +1,140 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import json
+import os
+from typing import BinaryIO, Dict, Iterator, Optional, cast
+
+from radicale import storage, types
+from radicale.log import logger
+from radicale.storage.multifilesystem import records
+from radicale.storage.multifilesystem.base import CollectionBase
+from radicale.storage.multifilesystem.get import CollectionPartGet
+
+INDEX_NAME: str = ".Radicale.uids"
+
+
+class UidIndex:
+    """Mapping of the hrefs of a collection to the UIDs of the items."""
+
+    hrefs: Dict[str, str]
+    # Number of items with the UID
+    uids: Dict[str, int]
+
+    def __init__(self, hrefs: Optional[Dict[str, str]] = None) -> None:
+        self.hrefs = {}
+        self.uids = {}
+        for href, uid in (hrefs or {}).items():
+            self.set(href, uid)
+
+    def set(self, href: str, uid: str) -> None:
+        self.remove(href)
+        self.hrefs[href] = uid
+        self.uids[uid] = self.uids.get(uid, 0) + 1
+
+    def remove(self, href: str) -> None:
+        uid = self.hrefs.pop(href, None)
+        if uid is None:
+            return
+        if self.uids[uid] > 1:
+            self.uids[uid] -= 1
+        else:
+            del self.uids[uid]
+
+
+class CollectionPartUid(CollectionPartGet, CollectionBase):
+
+    @property
+    def _uid_index_path(self) -> str:
+        cache_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "item")
+        return os.path.join(cache_folder, INDEX_NAME)
+
+    def _load_uid_index(self) -> Optional[UidIndex]:
+        """Load the UID index if it matches the collection."""
+        try:
+            with open(self._uid_index_path, "rb") as f:
+                data = f.read()
+            (version, raw_signature), start = records.loads_header(
+                data, records.UID_INDEX, b"bs")
+            # The signature is stored as JSON array or ``null``
+            signature = json.loads(cast(str, raw_signature))
+            if (version != storage.CACHE_VERSION or signature is None or
+                    tuple(signature) != self._items_signature()):
+                return None
+            hrefs = {cast(str, href): cast(str, uid)
+                     for href, uid in records.loads_many(
+                         data, records.UID_INDEX, b"ss", start)}
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning("Failed to load UID index of %r: %s",
+                           self.path, e, exc_info=True)
+            return None
+        return UidIndex(hrefs)
+
+    def _save_uid_index(self, index: UidIndex,
+                        signature: Optional[tuple]) -> None:
+        """Save the UID index, it's outdated if ``signature`` is
+        ``None``."""
+        path = self._uid_index_path
+        self._storage._makedirs_synced(os.path.dirname(path))
+        # Race: Other processes might have locked the file.
+        # TODO: better fix for "mypy"
+        with contextlib.suppress(PermissionError), self._atomic_write(  # type: ignore
+                path, "wb") as fo:
+            cast(BinaryIO, fo).write(b"".join((
+                records.dumps(records.UID_INDEX, (storage.CACHE_VERSION,
+                                                  json.dumps(signature))),
+                *(records.dumps(records.UID_INDEX, (href, uid))
+                  for href, uid in index.hrefs.items()))))
+
+    def _get_uid_index(self) -> UidIndex:
+        index = self._load_uid_index()
+        if index is None:
+            logger.debug("Rebuild UID index of %r", self.path)
+            # Creating the cache folder modifies the collection
+            self._storage._makedirs_synced(
+                os.path.dirname(self._uid_index_path))
+            # Take the signature first, changes during the rebuild
+            # invalidate the index.
+            signature = self._items_signature()
+            index = UidIndex()
+            for item in self._get_all_projected({"uid"}):
+                assert item.href
+                index.set(item.href, item.uid)
+            self._save_uid_index(index, signature)
+        return index
+
+    @types.contextmanager
+    def _update_uid_index(self) -> Iterator[Optional[UidIndex]]:
+        """Update the UID index together with the items of the collection.
+
+        Yields ``None`` if the index is disabled or outdated.
+
+        """
+        if not self._storage._use_uid_index:
+            yield None
+            return
+        index = self._load_uid_index()
+        yield index
+        if index is not None:
+            self._save_uid_index(index, self._items_signature())
+
+    def has_uid(self, uid: str) -> bool:
+        if not self._storage._use_uid_index:
+            return super().has_uid(uid)
+        return uid in self._get_uid_index().uids
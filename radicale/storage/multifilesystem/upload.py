@@ -19,21 +19,26 @@
 
 import errno
 import os
-import pickle
 import sys
 from typing import Iterable, Iterator, Optional, TextIO, Tuple, cast
 
 import radicale.item as radicale_item
 from radicale import pathutils
 from radicale.log import logger
+from radicale.storage.multifilesystem import records
 from radicale.storage.multifilesystem.base import CollectionBase
 from radicale.storage.multifilesystem.cache import CollectionPartCache
+from radicale.storage.multifilesystem.ctag import CollectionPartCtag, CtagState
 from radicale.storage.multifilesystem.get import CollectionPartGet
 from radicale.storage.multifilesystem.history import CollectionPartHistory
+from radicale.storage.multifilesystem.journal import CollectionPartJournal
+from radicale.storage.multifilesystem.uid import CollectionPartUid, UidIndex
 
 
-class CollectionPartUpload(CollectionPartGet, CollectionPartCache,
-                           CollectionPartHistory, CollectionBase):
+class CollectionPartUpload(CollectionPartJournal, CollectionPartCtag,
+                           CollectionPartUid, CollectionPartGet,
+                           CollectionPartCache, CollectionPartHistory,
+                           CollectionBase):
 
     def upload(self, href: str, item: radicale_item.Item
                ) -> Tuple[radicale_item.Item, Optional[radicale_item.Item]]:
@@ -41,13 +46,24 @@ class CollectionPartUpload(CollectionPartGet, CollectionPartCache,
             raise pathutils.UnsafePathError(href)
         path = pathutils.path_to_filesystem(self._filesystem_path, href)
         old_item = self._get(href, verify_href=False)
-        try:
-            with self._atomic_write(path, newline="") as fo:  # type: ignore
-                f = cast(TextIO, fo)
-                f.write(item.serialize())
-        except Exception as e:
-            raise ValueError("Failed to store item %r in collection %r: %s" %
-                             (href, self.path, e)) from e
+        with self._update_uid_index() as uid_index, \
+                self._update_ctag() as ctag_state, \
+                self._update_sync_journal() as journal_hrefs:
+            try:
+                with self._atomic_write(path, newline="") as fo:  # type: ignore
+                    f = cast(TextIO, fo)
+                    f.write(item.serialize())
+            except Exception as e:
+                raise ValueError("Failed to store item %r in collection %r: %s" %
+                                 (href, self.path, e)) from e
+            if uid_index is not None:
+                uid_index.set(href, item.uid)
+            if ctag_state is not None:
+                if old_item is not None:
+                    ctag_state.toggle(href, old_item.etag)
+                ctag_state.toggle(href, item.etag)
+            if journal_hrefs is not None:
+                journal_hrefs.append(href)
         # store cache file
         if self._storage._use_mtime_and_size_for_item_cache is True:
             cache_hash = self._item_cache_mtime_and_size(os.stat(path).st_size, os.stat(path).st_mtime_ns)
@@ -89,6 +105,9 @@ class CollectionPartUpload(CollectionPartGet, CollectionPartCache,
 
         cache_folder = self._storage._get_collection_cache_subfolder(self._filesystem_path, ".Radicale.cache", "item")
         self._storage._makedirs_synced(cache_folder)
+        packed_entries = []
+        uid_index = UidIndex() if self._storage._use_uid_index else None
+        ctag_state = CtagState() if self._storage._use_ctag_cache else None
         for item in items:
             uid = item.uid
             logger.debug("Store item from list with uid: '%s'" % uid)
@@ -119,6 +138,11 @@ class CollectionPartUpload(CollectionPartGet, CollectionPartCache,
                     "Failed to store item %r in temporary collection %r: %s" %
                     (uid, self.path, e)) from e
 
+            if uid_index is not None:
+                uid_index.set(href, uid)
+            if ctag_state is not None:
+                ctag_state.toggle(href, item.etag)
+
             # store cache file
             if self._storage._use_mtime_and_size_for_item_cache is True:
                 cache_hash = self._item_cache_mtime_and_size(os.stat(path).st_size, os.stat(path).st_mtime_ns)
@@ -128,12 +152,22 @@ class CollectionPartUpload(CollectionPartGet, CollectionPartCache,
                 cache_hash = self._item_cache_hash(item.serialize().encode(self._encoding))
                 if self._storage._debug_cache_actions is True:
                     logger.debug("Item cache store  for: %r with hash %r", path, cache_hash)
+            if self._storage._use_packed_item_cache is True:
+                packed_entries.append((href, (cache_hash, *cache_content)))
+                continue
             path_cache = os.path.join(cache_folder, href)
             if self._storage._debug_cache_actions is True:
                 logger.debug("Item cache store into: %r", path_cache)
             with open(os.path.join(cache_folder, href), "wb") as fb:
-                pickle.dump((cache_hash, *cache_content), fb)
+                fb.write(records.dumps(records.ITEM,
+                                       (cache_hash, *cache_content)))
                 fb.flush()
                 self._storage._fsync(fb)
+        if packed_entries:
+            self._get_packed_item_cache().store_many(packed_entries)
         self._storage._sync_directory(cache_folder)
         self._storage._sync_directory(self._filesystem_path)
+        if uid_index is not None:
+            self._save_uid_index(uid_index, self._items_signature())
+        if ctag_state is not None:
+            self._save_ctag_state(ctag_state, self._items_signature())
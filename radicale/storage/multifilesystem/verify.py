@@ -3,6 +3,7 @@
 # Copyright © 2012-2017 Guillaume Ayoub
 # Copyright © 2017-2021 Unrud <unrud@outlook.com>
 # Copyright © 2024-2024 Peter Bieringer <pb@bieringer.de>
+# Copyright © 2026-2026 agent <agent@local>
 #
 # This library is free software: you can redistribute it and/or modify
 # it under the terms of the GNU General Public License as published by
@@ -17,20 +18,144 @@
 # You should have received a copy of the GNU General Public License
 # along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
 
-from typing import Iterator, Optional, Set
+"""
+Verification of the storage.
 
-from radicale import pathutils, storage, types
+Collections are verified independently of each other, optionally by a pool
+of worker processes. In incremental mode the state of the files of every
+collection that was verified without errors is recorded in the file
+``.Radicale.verify`` and unchanged collections are skipped on later runs.
+
+"""
+
+import contextlib
+import hashlib
+import os
+import posixpath
+import tempfile
+import time
+from concurrent import futures
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, cast
+
+from radicale import config, pathutils, storage, types
 from radicale.log import logger
+from radicale.storage import multifilesystem
+from radicale.storage.multifilesystem import records
 from radicale.storage.multifilesystem.base import StorageBase
 from radicale.storage.multifilesystem.discover import StoragePartDiscover
 
+# Interval in seconds between progress reports
+PROGRESS_INTERVAL: float = 10
+
+# Storage of the worker process
+_worker_storage: Optional["multifilesystem.Storage"] = None
+
+
+class VerifyResult(NamedTuple):
+    sane_path: str
+    child_paths: List[str]
+    items: int
+    item_errors: int
+    collection_errors: int
+    # State of the files of the collection if it is valid
+    watermark: Optional[bytes]
+    skipped: bool
+
+
+def _init_worker(configuration: config.Configuration) -> None:
+    global _worker_storage
+    _worker_storage = cast(multifilesystem.Storage,
+                           storage.load(configuration))
+    _worker_storage._filesystem_fsync = False
+
+
+def _verify_collection_worker(sane_path: str, watermark: Optional[bytes]
+                              ) -> VerifyResult:
+    assert _worker_storage is not None
+    return _worker_storage._verify_collection(sane_path, watermark)
+
 
 class StoragePartVerify(StoragePartDiscover, StorageBase):
 
-    def verify(self) -> bool:
+    def _get_verify_watermarks_path(self) -> str:
+        return os.path.join(self._filesystem_folder, ".Radicale.verify")
+
+    def _load_verify_watermarks(self) -> Dict[str, bytes]:
+        try:
+            with open(self._get_verify_watermarks_path(), "rb") as f:
+                data = f.read()
+            (version,), start = records.loads_header(
+                data, records.VERIFY_STATE, b"b")
+            if version != storage.CACHE_VERSION:
+                # Items might be parsed differently
+                return {}
+            return {cast(str, sane_path): cast(bytes, watermark)
+                    for sane_path, watermark in records.loads_many(
+                        data, records.VERIFY_STATE, b"sb", start)}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning("Failed to load verification state, verifying "
+                           "all collections: %s", e)
+            return {}
+
+    def _store_verify_watermarks(self, watermarks: Dict[str, bytes]) -> None:
+        path = self._get_verify_watermarks_path()
+        with tempfile.NamedTemporaryFile(
+                "wb", prefix=".Radicale.tmp-", dir=os.path.dirname(path),
+                delete=False) as f:
+            try:
+                f.write(records.dumps(records.VERIFY_STATE,
+                                      (storage.CACHE_VERSION,)))
+                for sane_path, watermark in watermarks.items():
+                    f.write(records.dumps(records.VERIFY_STATE,
+                                          (sane_path, watermark)))
+            except BaseException:
+                os.remove(f.name)
+                raise
+        os.replace(f.name, path)
+
+    def _scan_collection(self, sane_path: str) -> Tuple[bytes, List[str]]:
+        """Get the state of the files of the collection and the names of
+        its child folders.
+
+        The state changes when items or properties are added, replaced,
+        removed or modified in place. The state of child collections and
+        caches is not included.
+
+        """
+        filesystem_path = pathutils.path_to_filesystem(
+            self._get_collection_root_folder(), sane_path)
+        entries = []
+        child_names = []
+        with os.scandir(filesystem_path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    if pathutils.is_safe_filesystem_path_component(
+                            entry.name):
+                        child_names.append(entry.name)
+                        entries.append("%s/" % entry.name)
+                elif (not entry.name.startswith(".Radicale.") or
+                      entry.name == ".Radicale.props"):
+                    st = entry.stat()
+                    entries.append("%s:%d:%d:%d" % (
+                        entry.name, st.st_ino, st.st_size, st.st_mtime_ns))
+        entries.sort()
+        child_names.sort()
+        return (hashlib.sha256("\0".join(entries).encode()).digest(),
+                child_names)
+
+    def _verify_collection(self, sane_path: str,
+                           watermark: Optional[bytes] = None
+                           ) -> VerifyResult:
+        """Verify the collection and all its items.
+
+        ``watermark`` is the state of the files of the collection at the
+        last successful verification, the verification is skipped if they
+        are unchanged.
+
+        """
         item_errors = collection_errors = 0
-        logger.info("Disable fsync during storage verification")
-        self._filesystem_fsync = False
 
         @types.contextmanager
         def exception_cm(sane_path: str, href: Optional[str]
@@ -47,46 +172,121 @@ class StoragePartVerify(StoragePartDiscover, StorageBase):
                     name = "collection %r" % sane_path
                 logger.error("Invalid %s: %s", name, e, exc_info=True)
 
-        remaining_sane_paths = [""]
-        while remaining_sane_paths:
-            sane_path = remaining_sane_paths.pop(0)
-            path = pathutils.unstrip_path(sane_path, True)
-            logger.info("Verifying   path %r", sane_path)
-            count = 0
-            is_collection = True
-            with exception_cm(sane_path, None):
-                saved_item_errors = item_errors
-                collection: Optional[storage.BaseCollection] = None
-                uids: Set[str] = set()
-                has_child_collections = False
-                for item in self.discover(path, "1", exception_cm):
-                    if not collection:
-                        assert isinstance(item, storage.BaseCollection)
-                        collection = item
-                        collection.get_meta()
-                        if not collection.tag:
-                            is_collection = False
-                            logger.info("Skip !collection %r", sane_path)
-                        continue
-                    if isinstance(item, storage.BaseCollection):
-                        has_child_collections = True
-                        remaining_sane_paths.append(item.path)
-                    elif item.uid in uids:
-                        logger.error("Invalid item %r in %r: UID conflict %r",
-                                     item.href, sane_path, item.uid)
-                    else:
-                        uids.add(item.uid)
-                        count += 1
-                        logger.debug("Verified in %r item %r",
-                                     sane_path, item.href)
-                assert collection
-                if item_errors == saved_item_errors:
-                    if is_collection:
-                        collection.sync()
-                if has_child_collections and collection.tag:
-                    logger.error("Invalid collection %r: %r must not have "
-                                 "child collections", sane_path,
-                                 collection.tag)
-            if is_collection:
-                logger.info("Verified collect %r (items: %d)", sane_path, count)
+        # Scanned before the verification, later modifications are detected
+        new_watermark: Optional[bytes] = None
+        with contextlib.suppress(OSError):
+            new_watermark, child_names = self._scan_collection(sane_path)
+        if watermark is not None and new_watermark == watermark:
+            logger.info("Skip unchanged %r", sane_path)
+            return VerifyResult(
+                sane_path,
+                [posixpath.join(sane_path, name) for name in child_names],
+                0, 0, 0, watermark, True)
+        path = pathutils.unstrip_path(sane_path, True)
+        logger.info("Verifying   path %r", sane_path)
+        child_paths: List[str] = []
+        count = 0
+        is_collection = True
+        with exception_cm(sane_path, None):
+            collection: Optional[storage.BaseCollection] = None
+            uids: Set[str] = set()
+            has_child_collections = False
+            for item in self.discover(path, "1", exception_cm):
+                if not collection:
+                    assert isinstance(item, storage.BaseCollection)
+                    collection = item
+                    collection.get_meta()
+                    if not collection.tag:
+                        is_collection = False
+                        logger.info("Skip !collection %r", sane_path)
+                    continue
+                if isinstance(item, storage.BaseCollection):
+                    has_child_collections = True
+                    child_paths.append(item.path)
+                elif item.uid in uids:
+                    logger.error("Invalid item %r in %r: UID conflict %r",
+                                 item.href, sane_path, item.uid)
+                    new_watermark = None
+                else:
+                    uids.add(item.uid)
+                    count += 1
+                    logger.debug("Verified in %r item %r",
+                                 sane_path, item.href)
+            assert collection
+            if item_errors == 0:
+                if is_collection:
+                    collection.sync()
+            if has_child_collections and collection.tag:
+                logger.error("Invalid collection %r: %r must not have "
+                             "child collections", sane_path,
+                             collection.tag)
+                new_watermark = None
+        if is_collection:
+            logger.info("Verified collect %r (items: %d)", sane_path, count)
+        if item_errors or collection_errors:
+            new_watermark = None
+        return VerifyResult(sane_path, child_paths, count, item_errors,
+                            collection_errors, new_watermark, False)
+
+    def verify(self, processes: int = 0, incremental: bool = False) -> bool:
+        logger.info("Disable fsync during storage verification")
+        self._filesystem_fsync = False
+        old_watermarks: Dict[str, bytes] = {}
+        if incremental:
+            old_watermarks = self._load_verify_watermarks()
+            logger.info("Incremental verification (unchanged collections: "
+                        "%d)", len(old_watermarks))
+        watermarks: Dict[str, bytes] = {}
+        collections = skipped = items = item_errors = collection_errors = 0
+        start = last_progress = time.monotonic()
+        with contextlib.ExitStack() as stack:
+            executor: Optional[futures.Executor] = None
+            if processes > 1:
+                logger.info("Verifying with %d processes", processes)
+                executor = stack.enter_context(futures.ProcessPoolExecutor(
+                    processes, initializer=_init_worker,
+                    initargs=(self.configuration,)))
+
+            def submit(sane_path: str) -> "futures.Future[VerifyResult]":
+                watermark = old_watermarks.get(sane_path)
+                if executor is not None:
+                    return executor.submit(_verify_collection_worker,
+                                           sane_path, watermark)
+                future: "futures.Future[VerifyResult]" = futures.Future()
+                future.set_result(self._verify_collection(sane_path,
+                                                          watermark))
+                return future
+
+            pending = {submit("")}
+            while pending:
+                done, pending = futures.wait(
+                    pending, timeout=PROGRESS_INTERVAL,
+                    return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    collections += 1
+                    skipped += result.skipped
+                    items += result.items
+                    item_errors += result.item_errors
+                    collection_errors += result.collection_errors
+                    for child_path in result.child_paths:
+                        pending.add(submit(child_path))
+                    if result.watermark is not None:
+                        watermarks[result.sane_path] = result.watermark
+                now = time.monotonic()
+                if now - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = now
+                    logger.info(
+                        "Verification progress: collections: %d (skipped: "
+                        "%d, pending: %d), items: %d (%.1f/s)", collections,
+                        skipped, len(pending), items,
+                        items / (now - start))
+        duration = time.monotonic() - start
+        logger.info("Verified storage in %.1f seconds (collections: %d, "
+                    "skipped: %d, items: %d (%.1f/s), item errors: %d, "
+                    "collection errors: %d)", duration, collections, skipped,
+                    items, items / duration if duration > 0 else 0,
+                    item_errors, collection_errors)
+        if incremental:
+            self._store_verify_watermarks(watermarks)
         return item_errors == 0 and collection_errors == 0
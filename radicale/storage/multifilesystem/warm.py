@@ -0,0 +1,124 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Warming of the 'item' cache.
+
+Every item of every collection is loaded once, items missing in the cache
+are parsed and stored. The storage is only locked for reading while a
+single collection is processed.
+
+"""
+
+import contextlib
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional, Tuple, cast
+
+from radicale import config, pathutils, storage
+from radicale.log import logger
+from radicale.storage import multifilesystem
+from radicale.storage.multifilesystem.base import StorageBase
+from radicale.storage.multifilesystem.lock import StoragePartLock
+
+# Storage of the worker process
+_worker_storage: Optional["multifilesystem.Storage"] = None
+
+
+def _init_worker(configuration: config.Configuration) -> None:
+    global _worker_storage
+    _worker_storage = cast(multifilesystem.Storage,
+                           storage.load(configuration))
+
+
+def _warm_collection_worker(sane_path: str) -> Tuple[int, int]:
+    assert _worker_storage is not None
+    return _worker_storage._warm_collection(sane_path)
+
+
+class StoragePartWarm(StoragePartLock, StorageBase):
+
+    def _iter_collection_paths(self) -> Iterator[str]:
+        """Sanitized paths of all collections, parents first."""
+        folder = self._get_collection_root_folder()
+        remaining_sane_paths = [""]
+        while remaining_sane_paths:
+            sane_path = remaining_sane_paths.pop(0)
+            yield sane_path
+            filesystem_path = pathutils.path_to_filesystem(folder, sane_path)
+            try:
+                with os.scandir(filesystem_path) as it:
+                    names = sorted(entry.name for entry in it
+                                   if entry.is_dir())
+            except FileNotFoundError:
+                continue
+            remaining_sane_paths.extend(
+                posixpath.join(sane_path, name) for name in names
+                if pathutils.is_safe_filesystem_path_component(name))
+
+    def _warm_collection(self, sane_path: str) -> Tuple[int, int]:
+        """Load all items of the collection.
+
+        Returns the number of items and the number of broken items.
+
+        """
+        count = errors = 0
+        path = pathutils.unstrip_path(sane_path, True)
+        with self.acquire_lock("r", path=path):
+            collection = self._collection_class(
+                cast(multifilesystem.Storage, self), path)
+            try:
+                hrefs = list(collection._list())
+            except FileNotFoundError:
+                # Deleted meanwhile
+                return 0, 0
+            for href in hrefs:
+                try:
+                    item = collection._get(href, verify_href=False)
+                except Exception as e:
+                    errors += 1
+                    logger.warning("Failed to warm cache of item %r in %r: "
+                                   "%s", href, sane_path, e)
+                    continue
+                if item is not None:
+                    count += 1
+        if count or errors:
+            logger.debug("Warmed cache of collection %r (items: %d, "
+                         "errors: %d)", sane_path, count, errors)
+        return count, errors
+
+    def warm_cache(self, processes: int = 0) -> bool:
+        logger.info("Warming 'item' cache%s",
+                    " with %d processes" % processes if processes > 1 else "")
+        sane_paths = self._iter_collection_paths()
+        results: Iterator[Tuple[int, int]]
+        with contextlib.ExitStack() as stack:
+            if processes > 1:
+                executor = stack.enter_context(ProcessPoolExecutor(
+                    processes, initializer=_init_worker,
+                    initargs=(self.configuration,)))
+                results = executor.map(_warm_collection_worker, sane_paths)
+            else:
+                results = map(self._warm_collection, sane_paths)
+            collections = count = errors = 0
+            for collection_count, collection_errors in results:
+                collections += 1
+                count += collection_count
+                errors += collection_errors
+        logger.info("Warmed 'item' cache (collections: %d, items: %d, "
+                    "errors: %d)", collections, count, errors)
+        return errors == 0
@@ -94,11 +94,12 @@ class Collection(multifilesystem.Collection):
     _storage: "Storage"
 
     @types.contextmanager
-    def _acquire_cache_lock(self, ns: str = "") -> Iterator[None]:
-        if self._storage._lock.locked == "w":
+    def _acquire_cache_lock(self, ns: str = "", key: str = ""
+                            ) -> Iterator[None]:
+        if self._storage._lock_mode(self.path) == "w":
             yield
             return
-        with self._storage._cache_lock.acquire((self.path, ns)):
+        with self._storage._cache_lock.acquire((self.path, ns, key)):
             yield
 
 
@@ -110,5 +111,7 @@ class Storage(multifilesystem.Storage):
 
     def __init__(self, configuration: config.Configuration) -> None:
         super().__init__(configuration)
-        self._lock = RwLock()
         self._cache_lock = LockDict()
+
+    def _create_lock(self, path: str) -> pathutils.RwLock:
+        return RwLock()
@@ -0,0 +1,677 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Storage backend that stores data in a SQLite database.
+
+Uses one table row per collection and one table row per collection entry.
+The history of items and the sync tokens are stored in the database too.
+
+"""
+
+import base64
+import binascii
+import contextlib
+import functools
+import json
+import os
+import posixpath
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from hashlib import sha256
+from typing import (AbstractSet, Callable, ClassVar, ContextManager, Dict,
+                    Iterable, Iterator, List, Mapping, Optional, Sequence, Set,
+                    Tuple, Union, overload)
+
+import radicale.item as radicale_item
+from radicale import config, pathutils, storage, types
+from radicale.item import filter as radicale_filter
+from radicale.log import logger
+from radicale.storage.multifilesystem.lock import StoragePartLock
+
+SCHEMA_VERSION: int = 1
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS collections (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    props TEXT NOT NULL DEFAULT '{}',
+    modified REAL NOT NULL,
+    sync_id TEXT NOT NULL,
+    sync_seq INTEGER NOT NULL DEFAULT 0,
+    sync_min_seq INTEGER NOT NULL DEFAULT 0);
+CREATE INDEX IF NOT EXISTS collections_parent ON collections (parent);
+CREATE TABLE IF NOT EXISTS items (
+    collection TEXT NOT NULL,
+    href TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    name TEXT NOT NULL,
+    component_name TEXT NOT NULL,
+    time_start INTEGER NOT NULL,
+    time_end INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    modified REAL NOT NULL,
+    PRIMARY KEY (collection, href));
+CREATE INDEX IF NOT EXISTS items_uid ON items (collection, uid);
+CREATE INDEX IF NOT EXISTS items_time_range
+    ON items (collection, component_name, time_start, time_end);
+CREATE TABLE IF NOT EXISTS history (
+    collection TEXT NOT NULL,
+    href TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    modified REAL NOT NULL,
+    PRIMARY KEY (collection, href));
+CREATE INDEX IF NOT EXISTS history_seq ON history (collection, seq);
+CREATE TABLE IF NOT EXISTS sync_tokens (
+    collection TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    modified REAL NOT NULL,
+    PRIMARY KEY (collection, seq));
+"""
+
+ITEM_COLUMNS: str = ("href, uid, etag, name, component_name, time_start, "
+                     "time_end, text, modified")
+# Without the text, it's loaded when it is accessed
+ITEM_META_COLUMNS: str = ("href, uid, etag, name, component_name, "
+                          "time_start, time_end, NULL, modified")
+
+TOKEN_PREFIX: str = "http://radicale.org/ns/sync/"
+
+
+def _http_date(timestamp: float) -> str:
+    return time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(timestamp))
+
+
+def _new_sync_id() -> str:
+    return binascii.hexlify(os.urandom(16)).decode("ascii")
+
+
+def _item_columns(projection: Optional[AbstractSet[str]]) -> str:
+    if projection is None or "text" in projection:
+        return ITEM_COLUMNS
+    return ITEM_META_COLUMNS
+
+
+def _descendants_condition(column: str) -> str:
+    # LIKE is not used, because paths can contain wildcard characters
+    return "substr(%s, 1, length(?) + 1) = ? || '/'" % column
+
+
+class Collection(storage.BaseCollection):
+
+    supports_projection: ClassVar[bool] = True
+    _storage: "Storage"
+    _path: str
+    _meta_cache: Optional[Mapping[str, str]]
+    _etag_cache: Optional[str]
+
+    def __init__(self, storage_: "Storage", path: str) -> None:
+        super().__init__()
+        self._storage = storage_
+        # Path should already be sanitized
+        self._path = pathutils.strip_path(path)
+        self._meta_cache = None
+        self._etag_cache = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _item_from_row(self, row: Sequence) -> radicale_item.Item:
+        href, uid, etag, name, component_name, start, end, text, modified = (
+            row)
+        return radicale_item.Item(
+            collection=self, href=href, last_modified=_http_date(modified),
+            etag=etag, text=text, uid=uid, name=name,
+            component_name=component_name, time_range=(start, end),
+            load_text=(None if text is not None else
+                       functools.partial(self._load_text, href, etag)))
+
+    def _load_text(self, href: str, etag: str) -> str:
+        row = self._storage._connection().execute(
+            "SELECT text FROM items WHERE collection = ? AND href = ? AND "
+            "etag = ?", (self._path, href, etag)).fetchone()
+        if row is None:
+            raise RuntimeError("Failed to load item %r in %r: item was "
+                               "modified or removed" % (href, self.path))
+        return row[0]
+
+    def _get(self, href: str, projection: Optional[AbstractSet[str]] = None
+             ) -> Optional[radicale_item.Item]:
+        row = self._storage._connection().execute(
+            "SELECT %s FROM items WHERE collection = ? AND href = ?" %
+            _item_columns(projection), (self._path, href)).fetchone()
+        return None if row is None else self._item_from_row(row)
+
+    def get_multi(self, hrefs: Iterable[str],
+                  projection: Optional[AbstractSet[str]] = None
+                  ) -> Iterator[Tuple[str, Optional[radicale_item.Item]]]:
+        connection = self._storage._connection()
+        hrefs = list(hrefs)
+        # Stay below the maximum number of host parameters of old SQLite
+        for i in range(0, len(hrefs), 500):
+            chunk = hrefs[i:i + 500]
+            items = {}
+            for row in connection.execute(
+                    "SELECT %s FROM items WHERE collection = ? AND href IN "
+                    "(%s)" % (_item_columns(projection),
+                              ", ".join("?" * len(chunk))),
+                    (self._path, *chunk)):
+                items[row[0]] = self._item_from_row(row)
+            for href in chunk:
+                yield href, items.get(href)
+
+    def get_all(self, projection: Optional[AbstractSet[str]] = None
+                ) -> Iterator[radicale_item.Item]:
+        for row in self._storage._connection().execute(
+                "SELECT %s FROM items WHERE collection = ? ORDER BY href" %
+                _item_columns(projection), (self._path,)):
+            yield self._item_from_row(row)
+
+    def get_filtered(self, filters: Iterable[ET.Element],
+                     projection: Optional[AbstractSet[str]] = None
+                     ) -> Iterator[Tuple[radicale_item.Item, bool]]:
+        if not self.tag:
+            return
+        tag, start, end, simple = radicale_filter.simplify_prefilters(
+            filters, self.tag)
+        query = ("SELECT %s FROM items WHERE collection = ? AND "
+                 "time_start < ? AND time_end > ?" %
+                 _item_columns(projection))
+        parameters: List[Union[str, int]] = [self._path, end, start]
+        if tag is not None:
+            query += " AND component_name = ?"
+            parameters.append(tag)
+        for row in self._storage._connection().execute(
+                query + " ORDER BY href", parameters):
+            item = self._item_from_row(row)
+            istart, iend = item.time_range
+            yield item, simple and (start <= istart or iend <= end)
+
+    def has_uid(self, uid: str) -> bool:
+        return self._storage._connection().execute(
+            "SELECT 1 FROM items WHERE collection = ? AND uid = ? LIMIT 1",
+            (self._path, uid)).fetchone() is not None
+
+    def upload(self, href: str, item: radicale_item.Item
+               ) -> Tuple[radicale_item.Item, Optional[radicale_item.Item]]:
+        if not pathutils.is_safe_filesystem_path_component(href):
+            raise pathutils.UnsafePathError(href)
+        old_item = self._get(href)
+        try:
+            with self._storage._transaction() as connection:
+                self._storage._store_item(connection, self._path, href, item)
+                self._storage._track_change(connection, self._path, href,
+                                            item.etag)
+                self._storage._clean_history(connection, self._path)
+        except (sqlite3.Error, ValueError) as e:
+            raise ValueError("Failed to store item %r in collection %r: %s" %
+                             (href, self.path, e)) from e
+        uploaded_item = self._get(href)
+        if uploaded_item is None:
+            raise RuntimeError("Storage modified externally")
+        return uploaded_item, old_item
+
+    def delete(self, href: Optional[str] = None) -> None:
+        with self._storage._transaction() as connection:
+            if href is None:
+                self._storage._delete_collection(connection, self._path)
+                return
+            if connection.execute(
+                    "DELETE FROM items WHERE collection = ? AND href = ?",
+                    (self._path, href)).rowcount == 0:
+                raise storage.ComponentNotFoundError(href)
+            self._storage._track_change(connection, self._path, href, "")
+            self._storage._clean_history(connection, self._path)
+
+    @overload
+    def get_meta(self, key: None = None) -> Mapping[str, str]: ...
+
+    @overload
+    def get_meta(self, key: str) -> Optional[str]: ...
+
+    def get_meta(self, key: Optional[str] = None) -> Union[Mapping[str, str],
+                                                           Optional[str]]:
+        # reuse cached value if the storage is read-only
+        if self._storage._lock_mode(self.path) == "w" or self._meta_cache is None:
+            row = self._storage._connection().execute(
+                "SELECT props FROM collections WHERE path = ?",
+                (self._path,)).fetchone()
+            try:
+                self._meta_cache = radicale_item.check_and_sanitize_props(
+                    json.loads(row[0]) if row else {})
+            except ValueError as e:
+                raise RuntimeError("Failed to load properties of collection "
+                                   "%r: %s" % (self.path, e)) from e
+        return self._meta_cache if key is None else self._meta_cache.get(key)
+
+    def set_meta(self, props: Mapping[str, str]) -> None:
+        try:
+            with self._storage._transaction() as connection:
+                connection.execute(
+                    "UPDATE collections SET props = ?, modified = ? "
+                    "WHERE path = ?",
+                    (json.dumps(props, sort_keys=True), time.time(),
+                     self._path))
+        except sqlite3.Error as e:
+            raise ValueError("Failed to write meta data of %r: %s" %
+                             (self.path, e)) from e
+
+    @property
+    def last_modified(self) -> str:
+        row = self._storage._connection().execute(
+            "SELECT modified FROM collections WHERE path = ?",
+            (self._path,)).fetchone()
+        return _http_date(row[0] if row else 0)
+
+    @property
+    def etag(self) -> str:
+        # reuse cached value if the storage is read-only
+        if self._storage._lock_mode(self.path) == "w" or self._etag_cache is None:
+            etag = sha256()
+            for href, item_etag in self._storage._connection().execute(
+                    "SELECT href, etag FROM items WHERE collection = ? "
+                    "ORDER BY href", (self._path,)):
+                etag.update((href + "/" + item_etag).encode())
+            etag.update(json.dumps(self.get_meta(), sort_keys=True).encode())
+            self._etag_cache = '"%s"' % etag.hexdigest()
+        return self._etag_cache
+
+    def sync(self, old_token: str = "") -> Tuple[str, Iterable[str]]:
+        connection = self._storage._connection()
+        row = connection.execute(
+            "SELECT sync_id, sync_seq, sync_min_seq FROM collections "
+            "WHERE path = ?", (self._path,)).fetchone()
+        if row is None:
+            raise ValueError("Collection not found: %r" % self.path)
+        sync_id, seq, min_seq = row
+        token = "%s%s-%d" % (TOKEN_PREFIX, sync_id, seq)
+        old_seq = None
+        if old_token:
+            # Extract the token name from the sync token
+            if not old_token.startswith(TOKEN_PREFIX):
+                raise ValueError("Malformed token: %r" % old_token)
+            old_sync_id, _, old_seq_str = old_token[len(TOKEN_PREFIX):
+                                                    ].partition("-")
+            try:
+                old_seq = int(old_seq_str)
+            except ValueError as e:
+                raise ValueError("Malformed token: %r" % old_token) from e
+            if (old_sync_id != sync_id or not min_seq <= old_seq <= seq or
+                    connection.execute(
+                        "SELECT 1 FROM sync_tokens WHERE collection = ? AND "
+                        "seq = ?", (self._path, old_seq)).fetchone() is None):
+                raise ValueError("Token not found: %r" % old_token)
+        with self._storage._transaction() as connection:
+            # store the new token or update the modification time of the
+            # existing token
+            connection.execute(
+                "INSERT OR REPLACE INTO sync_tokens (collection, seq, "
+                "modified) VALUES (?, ?, ?)", (self._path, seq, time.time()))
+            connection.execute(
+                "DELETE FROM sync_tokens WHERE collection = ? AND "
+                "modified < ?", (self._path, time.time() -
+                                 self._storage._max_sync_token_age))
+        if old_seq is None:
+            return token, [href for href, in connection.execute(
+                "SELECT href FROM items WHERE collection = ? ORDER BY href",
+                (self._path,))]
+        return token, [href for href, in connection.execute(
+            "SELECT href FROM history WHERE collection = ? AND seq > ? "
+            "ORDER BY seq", (self._path, old_seq))]
+
+
+class Storage(StoragePartLock):
+
+    supports_projection: ClassVar[bool] = True
+    supports_verify_options: ClassVar[bool] = True
+    _database_path: str
+    _max_sync_token_age: int
+    _local: threading.local
+
+    def __init__(self, configuration: config.Configuration) -> None:
+        super().__init__(configuration)
+        self._database_path = configuration.get("storage", "sqlite_file")
+        if not self._database_path:
+            self._database_path = os.path.join(self._filesystem_folder,
+                                               "radicale.sqlite")
+        self._max_sync_token_age = configuration.get(
+            "storage", "max_sync_token_age")
+        self._local = threading.local()
+        if self._folder_umask:
+            self._config_umask = int(self._folder_umask, 8)
+        logger.info("Storage SQLite database: %r", self._database_path)
+        self._makedirs_synced(self._filesystem_folder)
+        self._makedirs_synced(os.path.dirname(self._database_path))
+        with self._transaction() as connection:
+            user_version, = connection.execute(
+                "PRAGMA user_version").fetchone()
+            if user_version > SCHEMA_VERSION:
+                raise RuntimeError("Unsupported version of SQLite database "
+                                   "%r: %d" % (self._database_path,
+                                               user_version))
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    connection.execute(statement)
+            connection.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+            self._create_collection_row(connection, "")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the database connection of the current thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._database_path, timeout=60,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = %s" % (
+                "FULL" if self._filesystem_fsync else "OFF"))
+            self._local.connection = connection
+        return connection
+
+    @types.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        if connection.in_transaction:
+            yield connection
+            return
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _create_collection_row(self, connection: sqlite3.Connection,
+                               sane_path: str) -> None:
+        """Create the collection and its parents if they don't exist."""
+        parent: Optional[str] = None
+        if sane_path:
+            parent = posixpath.dirname(sane_path)
+            self._create_collection_row(connection, parent)
+        connection.execute(
+            "INSERT OR IGNORE INTO collections (path, parent, modified, "
+            "sync_id) VALUES (?, ?, ?, ?)",
+            (sane_path, parent, time.time(), _new_sync_id()))
+
+    def _delete_collection(self, connection: sqlite3.Connection,
+                           sane_path: str) -> None:
+        """Delete the collection, its items and all child collections."""
+        if not sane_path:
+            # The root collection must always exist
+            for table in ("collections", "items", "history", "sync_tokens"):
+                connection.execute("DELETE FROM %s" % table)
+            self._create_collection_row(connection, "")
+            return
+        for table, column in (("collections", "path"), ("items", "collection"),
+                              ("history", "collection"),
+                              ("sync_tokens", "collection")):
+            connection.execute(
+                "DELETE FROM %s WHERE %s = ? OR %s" % (
+                    table, column, _descendants_condition(column)),
+                (sane_path, sane_path, sane_path))
+
+    def _store_item(self, connection: sqlite3.Connection, sane_path: str,
+                    href: str, item: radicale_item.Item) -> None:
+        connection.execute(
+            "INSERT OR REPLACE INTO items (collection, %s) VALUES "
+            "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)" % ITEM_COLUMNS,
+            (sane_path, href, item.uid, item.etag, item.name,
+             item.component_name, *item.time_range, item.serialize(),
+             time.time()))
+
+    def _track_change(self, connection: sqlite3.Connection, sane_path: str,
+                      href: str, etag: str) -> None:
+        """Record the change of ``href`` in the history of the collection.
+
+        ``etag`` is empty for deleted items.
+
+        """
+        now = time.time()
+        connection.execute(
+            "UPDATE collections SET sync_seq = sync_seq + 1, modified = ? "
+            "WHERE path = ?", (now, sane_path))
+        connection.execute(
+            "INSERT OR REPLACE INTO history (collection, href, etag, seq, "
+            "modified) SELECT path, ?, ?, sync_seq, ? FROM collections "
+            "WHERE path = ?", (href, etag, now, sane_path))
+
+    def _clean_history(self, connection: sqlite3.Connection,
+                       sane_path: str) -> None:
+        # Delete all expired history entries of deleted items. Sync tokens
+        # from before the deletion become invalid.
+        age_limit = time.time() - self._max_sync_token_age
+        row = connection.execute(
+            "SELECT max(seq) FROM history WHERE collection = ? AND "
+            "etag = '' AND modified < ?", (sane_path, age_limit)).fetchone()
+        if row[0] is None:
+            return
+        connection.execute(
+            "DELETE FROM history WHERE collection = ? AND etag = '' AND "
+            "seq <= ?", (sane_path, row[0]))
+        connection.execute(
+            "UPDATE collections SET sync_min_seq = max(sync_min_seq, ?) "
+            "WHERE path = ?", (row[0], sane_path))
+
+    def discover(
+            self, path: str, depth: str = "0",
+            child_context_manager: Optional[
+            Callable[[str, Optional[str]], ContextManager[None]]] = None,
+            user_groups: Set[str] = set([]),
+            projection: Optional[AbstractSet[str]] = None
+            ) -> Iterator[types.CollectionOrItem]:
+        # Path should already be sanitized
+        sane_path = pathutils.strip_path(path)
+        attributes = sane_path.split("/") if sane_path else []
+        if not all(map(pathutils.is_safe_filesystem_path_component,
+                       attributes)):
+            logger.debug("Unsafe path %r requested from storage", sane_path)
+            return
+        connection = self._connection()
+
+        def collection_exists(sane_path: str) -> bool:
+            return connection.execute(
+                "SELECT 1 FROM collections WHERE path = ?",
+                (sane_path,)).fetchone() is not None
+
+        # Check if the path exists and if it leads to a collection or an item
+        href: Optional[str] = None
+        if not collection_exists(sane_path):
+            if not attributes:
+                return
+            href = attributes.pop()
+            if not collection_exists("/".join(attributes)):
+                return
+        sane_path = "/".join(attributes)
+        collection = Collection(self, pathutils.unstrip_path(sane_path, True))
+
+        if href:
+            item = collection._get(href, projection)
+            if item is not None:
+                yield item
+            return
+
+        yield collection
+
+        if depth == "0":
+            return
+
+        for item in collection.get_all(projection):
+            assert item.href
+            if child_context_manager is None:
+                yield item
+                continue
+            with child_context_manager(sane_path, item.href):
+                yield item
+
+        child_paths = [child_path for child_path, in connection.execute(
+            "SELECT path FROM collections WHERE parent = ? AND path != '' "
+            "ORDER BY path", (sane_path,))]
+        for group in user_groups:
+            href = base64.b64encode(group.encode('utf-8')).decode('ascii')
+            logger.debug(f"searching for group calendar {group} {href}")
+            if collection_exists(f"GROUPS/{href}"):
+                child_paths.append(f"GROUPS/{href}")
+        for sane_child_path in child_paths:
+            child_collection = Collection(
+                self, pathutils.unstrip_path(sane_child_path, True))
+            if child_context_manager is None:
+                yield child_collection
+                continue
+            with child_context_manager(sane_child_path, None):
+                yield child_collection
+
+    def move(self, item: radicale_item.Item,
+             to_collection: storage.BaseCollection, to_href: str) -> None:
+        if not pathutils.is_safe_filesystem_path_component(to_href):
+            raise pathutils.UnsafePathError(to_href)
+        assert isinstance(to_collection, Collection)
+        assert isinstance(item.collection, Collection)
+        assert item.href
+        from_path, to_path = item.collection.path, to_collection.path
+        try:
+            with self._transaction() as connection:
+                connection.execute(
+                    "DELETE FROM items WHERE collection = ? AND href = ?",
+                    (to_path, to_href))
+                connection.execute(
+                    "UPDATE items SET collection = ?, href = ?, modified = ? "
+                    "WHERE collection = ? AND href = ?",
+                    (to_path, to_href, time.time(), from_path, item.href))
+                # Track the change
+                self._track_change(connection, to_path, to_href, item.etag)
+                self._track_change(connection, from_path, item.href, "")
+                self._clean_history(connection, to_path)
+                if from_path != to_path:
+                    self._clean_history(connection, from_path)
+        except sqlite3.Error as e:
+            raise ValueError("Failed to move item %r => %r %s" % (
+                item.href, to_href, e)) from e
+
+    def create_collection(
+            self, href: str,
+            items: Optional[Iterable[radicale_item.Item]] = None,
+            props: Optional[Mapping[str, str]] = None) -> Tuple[
+                Collection, Dict[str, radicale_item.Item], List[str]]:
+        # Path should already be sanitized
+        sane_path = pathutils.strip_path(href)
+        logger.debug("Create collection: %r" % sane_path)
+        collection = Collection(self, pathutils.unstrip_path(sane_path, True))
+
+        if not props:
+            with self._transaction() as connection:
+                self._create_collection_row(connection, sane_path)
+            return collection, {}, []
+
+        suffix = {"VCALENDAR": ".ics", "VADDRESSBOOK": ".vcf"}.get(
+            props.get("tag", ""), "")
+        replaced_items: Dict[str, radicale_item.Item] = {}
+        new_item_hrefs: List[str] = []
+        try:
+            with self._transaction() as connection:
+                existing_items = {item.href: item for item in
+                                  collection.get_all()}
+                self._delete_collection(connection, sane_path)
+                self._create_collection_row(connection, sane_path)
+                connection.execute(
+                    "UPDATE collections SET props = ? WHERE path = ?",
+                    (json.dumps(props, sort_keys=True), sane_path))
+                used_hrefs: Set[str] = set()
+                for item in items if suffix and items is not None else ():
+                    item_href = self._find_free_href(item.uid, suffix,
+                                                     used_hrefs)
+                    used_hrefs.add(item_href)
+                    self._store_item(connection, sane_path, item_href, item)
+                    if item_href in existing_items:
+                        replaced_items[item_href] = existing_items[item_href]
+                    else:
+                        new_item_hrefs.append(item_href)
+        except (sqlite3.Error, ValueError) as e:
+            raise ValueError("Failed to create collection %r: %s" %
+                             (href, e)) from e
+        return collection, replaced_items, new_item_hrefs
+
+    @staticmethod
+    def _find_free_href(uid: str, suffix: str, used_hrefs: Set[str]) -> str:
+        def is_safe_free_href(href: str) -> bool:
+            return (pathutils.is_safe_filesystem_path_component(href) and
+                    href not in used_hrefs)
+
+        for href in [uid if uid.lower().endswith(suffix.lower())
+                     else uid + suffix,
+                     radicale_item.get_etag(uid).strip('"') + suffix]:
+            if is_safe_free_href(href):
+                return href
+        return radicale_item.find_available_uid(
+            lambda href: not is_safe_free_href(href), suffix)
+
+    def verify(self, processes: int = 0, incremental: bool = False) -> bool:
+        # The database is verified completely in the current thread
+        item_errors = collection_errors = 0
+        connection = self._connection()
+        result, = connection.execute("PRAGMA integrity_check").fetchone()
+        if result != "ok":
+            logger.error("Invalid database %r: %s", self._database_path,
+                         result)
+            collection_errors += 1
+        for sane_path, in connection.execute(
+                "SELECT path FROM collections ORDER BY path").fetchall():
+            logger.info("Verifying   path %r", sane_path)
+            collection = Collection(
+                self, pathutils.unstrip_path(sane_path, True))
+            try:
+                tag = collection.get_meta("tag")
+            except Exception as e:
+                collection_errors += 1
+                logger.error("Invalid collection %r: %s", sane_path, e,
+                             exc_info=True)
+                continue
+            if not tag:
+                logger.info("Skip !collection %r", sane_path)
+                continue
+            uids: Set[str] = set()
+            count = 0
+            for item in collection.get_all():
+                try:
+                    vobject_items = radicale_item.read_components(
+                        item.serialize())
+                    radicale_item.check_and_sanitize_items(
+                        vobject_items, tag=tag)
+                except Exception as e:
+                    item_errors += 1
+                    logger.error("Invalid item %r in %r: %s", item.href,
+                                 sane_path, e, exc_info=True)
+                    continue
+                if item.uid in uids:
+                    logger.error("Invalid item %r in %r: UID conflict %r",
+                                 item.href, sane_path, item.uid)
+                    continue
+                uids.add(item.uid)
+                count += 1
+                logger.debug("Verified in %r item %r", sane_path, item.href)
+            with contextlib.suppress(sqlite3.Error):
+                # Check for child collections
+                if connection.execute(
+                        "SELECT 1 FROM collections WHERE parent = ? LIMIT 1",
+                        (sane_path,)).fetchone() is not None:
+                    logger.error("Invalid collection %r: %r must not have "
+                                 "child collections", sane_path, tag)
+            logger.info("Verified collect %r (items: %d)", sane_path, count)
+        return item_errors == 0 and collection_errors == 0
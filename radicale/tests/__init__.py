@@ -119,11 +119,16 @@ class BaseTest:
             nonlocal status, headers
             status = int(status_.split()[0])
             headers = dict(headers_)
-        answers = list(self.application(environ, start_response))
+        result = self.application(environ, start_response)
+        try:
+            answer = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
         assert status is not None and headers is not None
         assert check is None or status == check, "%d != %d" % (status, check)
 
-        return status, headers, answers[0].decode() if answers else ""
+        return status, headers, answer.decode()
 
     @staticmethod
     def parse_responses(text: str) -> RESPONSES:
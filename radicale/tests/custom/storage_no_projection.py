@@ -0,0 +1,59 @@
+# This file is part of Radicale - CalDAV and CardDAV server
+# Copyright © 2026-2026 agent <agent@local>
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Custom storage backend.
+
+Copy of multifilesystem storage backend with the signatures of storage
+plugins that don't support the argument ``projection`` and the arguments
+of ``verify`` for testing.
+
+"""
+
+from radicale.storage import BaseCollection, multifilesystem
+
+
+class Collection(multifilesystem.Collection):
+
+    supports_projection = False
+
+    sync = BaseCollection.sync
+    has_uid = BaseCollection.has_uid
+
+    def get_multi(self, hrefs):  # type: ignore[override]
+        return super().get_multi(hrefs)
+
+    def get_all(self):  # type: ignore[override]
+        return super().get_all()
+
+    def get_filtered(self, filters):  # type: ignore[override]
+        return super().get_filtered(filters)
+
+
+class Storage(multifilesystem.Storage):
+
+    supports_projection = False
+    supports_verify_options = False
+
+    _collection_class = Collection
+
+    def discover(self, path, depth="0", child_context_manager=None,
+                 user_groups=set()):  # type: ignore[override]
+        return super().discover(path, depth, child_context_manager,
+                                user_groups)
+
+    def verify(self):  # type: ignore[override]
+        return super().verify()
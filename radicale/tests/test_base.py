@@ -32,6 +32,7 @@ import pytest
 import vobject
 
 from radicale import storage, utils, xmlutils
+from radicale.item import filter as radicale_filter
 from radicale.tests import RESPONSES, BaseTest
 from radicale.tests.helpers import get_file_content
 
@@ -1238,6 +1239,33 @@ permissions: RrWw""")
     </C:comp-filter>
 </C:comp-filter>"""])
 
+    def test_item_filter_compiled_once(self) -> None:
+        """Report request with a filter that is compiled once for all
+        items."""
+        compiled = []
+        compile_comp_filter = radicale_filter.compile_comp_filter
+
+        def counting_compile_comp_filter(filter_: Any, level: int = 0
+                                         ) -> radicale_filter.ItemPredicate:
+            compiled.append(filter_.get("name"))
+            return compile_comp_filter(filter_, level)
+        radicale_filter.compile_comp_filter = (  # type: ignore[assignment]
+            counting_compile_comp_filter)
+        try:
+            paths = self._test_filter(["""\
+<C:comp-filter name="VCALENDAR">
+    <C:comp-filter name="VEVENT">
+        <C:prop-filter name="SUMMARY">
+            <C:text-match>event</C:text-match>
+        </C:prop-filter>
+    </C:comp-filter>
+</C:comp-filter>"""], items=range(1, 4))
+        finally:
+            radicale_filter.compile_comp_filter = compile_comp_filter
+        assert sorted(paths) == ["/calendar.ics/event%d.ics" % i
+                                 for i in range(1, 4)]
+        assert compiled == ["VCALENDAR", "VEVENT"]
+
     def test_item_not_prop_filter(self) -> None:
         """Report request with prop-based is-not filter on an item."""
         assert "/calendar.ics/event1.ics" not in self._test_filter(["""\
@@ -1891,6 +1919,117 @@ permissions: RrWw""")
         status, prop = response["D:getetag"]
         assert status == 200 and prop.text
 
+    def test_stream_multistatus(self) -> None:
+        """PROPFIND and REPORT requests with streamed responses"""
+        calendar_path = "/calendar.ics/"
+        self.mkcalendar(calendar_path)
+        for i in range(1, 4):
+            self.put(posixpath.join(calendar_path, "event%d.ics" % i),
+                     get_file_content("event%d.ics" % i))
+        propfind_request = """\
+<?xml version="1.0" encoding="utf-8" ?>
+<D:propfind xmlns:D="DAV:">
+    <D:prop>
+        <D:getetag />
+    </D:prop>
+</D:propfind>"""
+        report_request = """\
+<?xml version="1.0" encoding="utf-8" ?>
+<C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+    <D:prop>
+        <D:getetag />
+        <C:calendar-data />
+    </D:prop>
+    <C:filter>
+        <C:comp-filter name="VCALENDAR">
+            <C:comp-filter name="VEVENT">
+                <C:prop-filter name="SUMMARY">
+                    <C:text-match>event</C:text-match>
+                </C:prop-filter>
+            </C:comp-filter>
+        </C:comp-filter>
+    </C:filter>
+</C:calendar-query>"""
+
+        def get_answers() -> List[Tuple[Any, Optional[str]]]:
+            answers = []
+            for method, data in (("PROPFIND", propfind_request),
+                                 ("REPORT", report_request)):
+                _, headers, answer = self.request(
+                    method, calendar_path, data, check=207, HTTP_DEPTH="1")
+                responses = {
+                    href: sorted((prop, status, element.text)
+                                 for prop, (status, element) in
+                                 response.items())
+                    for href, response in self.parse_responses(
+                        answer).items()
+                    if isinstance(response, dict)}
+                answers.append((responses, headers.get("Content-Length")))
+            return answers
+        answers = get_answers()
+        self.configure({"server": {"stream_multistatus": "True"}})
+        streamed_answers = get_answers()
+        assert [responses for responses, _ in streamed_answers] == [
+            responses for responses, _ in answers]
+        assert len(streamed_answers[1][0]) == 3
+        assert all(length is not None for _, length in answers)
+        assert all(length is None for _, length in streamed_answers)
+        # The storage is unlocked before the response is sent
+        application = self.application
+        lock = getattr(application._storage, "_lock", None)
+        locked = []
+
+        def check_unlocked(environ: dict, start_response: Callable
+                           ) -> Iterable[bytes]:
+            answer = application(environ, start_response)
+            locked.append(lock.locked if lock is not None else "")
+            return answer
+        self.application = check_unlocked  # type: ignore[assignment]
+        try:
+            get_answers()
+        finally:
+            self.application = application
+        assert locked == ["", ""]
+
+    def test_report_max_result_memory(self, caplog) -> None:
+        """Report request with retrieved items spilled to a temporary file"""
+        caplog.set_level(logging.DEBUG)
+        calendar_path = "/calendar.ics/"
+        self.mkcalendar(calendar_path)
+        for i in range(1, 4):
+            self.put(posixpath.join(calendar_path, "event%d.ics" % i),
+                     get_file_content("event%d.ics" % i))
+        request = """\
+<?xml version="1.0" encoding="utf-8" ?>
+<C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+    <D:prop>
+        <D:getetag />
+        <C:calendar-data />
+    </D:prop>
+    <C:filter>
+        <C:comp-filter name="VCALENDAR">
+            <C:comp-filter name="VEVENT">
+                <C:prop-filter name="SUMMARY">
+                    <C:text-match>event</C:text-match>
+                </C:prop-filter>
+            </C:comp-filter>
+        </C:comp-filter>
+    </C:filter>
+</C:calendar-query>"""
+
+        def get_responses() -> List[Tuple[str, str, Optional[str]]]:
+            _, responses = self.report(calendar_path, request)
+            return sorted((href, prop, element.text)
+                          for href, response in responses.items()
+                          if isinstance(response, dict)
+                          for prop, (_, element) in response.items())
+        responses = get_responses()
+        assert "Spilling" not in caplog.text
+        self.configure({"reporting": {"max_result_memory": "1"}})
+        assert get_responses() == responses
+        assert len(responses) == 6
+        assert "Spilling" in caplog.text
+
     def test_report_free_busy(self) -> None:
         """Test free busy report on a few items"""
         calendar_path = "/calendar.ics/"
@@ -89,3 +89,27 @@ class TestPathToFilesystem:
             # Backup files (ending with ~) are not safe
             with pytest.raises(pathutils.UnsafePathError):
                 pathutils.path_to_filesystem(tmpdir, "backup~")
+
+
+class TestTmpfile:
+    """Tests for open_tmpfile and link_tmpfile functions."""
+
+    def test_link_tmpfile(self) -> None:
+        """Test that unnamed files are created and replace existing files."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "file")
+            for content in (b"first", b"second"):
+                fd = pathutils.open_tmpfile(tmpdir)
+                if fd is None:
+                    pytest.skip("unnamed files not supported")
+                try:
+                    os.write(fd, content)
+                    try:
+                        pathutils.link_tmpfile(fd, path)
+                    except OSError as e:
+                        pytest.skip("linking of unnamed files failed: %s" % e)
+                finally:
+                    os.close(fd)
+                with open(path, "rb") as f:
+                    assert f.read() == content
+            assert os.listdir(tmpdir) == ["file"]
@@ -138,6 +138,16 @@ class TestBaseServerRequests(BaseTest):
         self.thread.start()
         self.get("/", check=302)
 
+    def test_stream_multistatus(self) -> None:
+        self.configure({"auth": {"type": "none"},
+                        "server": {"stream_multistatus": "True"}})
+        self.thread.start()
+        _, headers, answer = self.request(
+            "PROPFIND", "/", check=207, Depth="1")
+        assert headers.get("Transfer-Encoding") == "chunked"
+        assert "Content-Length" not in headers
+        assert "<multistatus" in answer and answer.endswith("</multistatus>")
+
     def test_bind_fail(self) -> None:
         for address_family, address in [(socket.AF_INET, "::1"),
                                         (socket.AF_INET6, "127.0.0.1")]:
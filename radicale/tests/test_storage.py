@@ -24,15 +24,24 @@ Tests for storage backends.
 import json
 import logging
 import os
+import pickle
 import re
 import shutil
-from typing import ClassVar, cast
+import subprocess
+import sys
+import threading
+import time
+from configparser import RawConfigParser
+from typing import ClassVar, List, cast
 
 import pytest
 
 import radicale.tests.custom.storage_simple_sync
+from radicale.storage import multifilesystem, sqlite
+from radicale.storage.multifilesystem import base, get, lock, records
+from radicale.storage.multifilesystem.timerange import TimeRangeIndex
 from radicale.tests import BaseTest
-from radicale.tests.helpers import get_file_content
+from radicale.tests.helpers import configuration_to_dict, get_file_content
 from radicale.tests.test_base import TestBaseRequests as _TestBaseRequests
 
 
@@ -141,6 +150,971 @@ class TestMultiFileSystem(BaseTest):
         assert answer1 == answer2
         assert os.path.exists(os.path.join(cache_folder, "event1.ics"))
 
+    @pytest.mark.parametrize("load_pickled", [True, False])
+    def test_item_cache_pickled(self, load_pickled: bool) -> None:
+        """Verify that item cache entries of Radicale < 3.6.1 are converted
+        or ignored."""
+        self.configure({"storage": {"load_pickled_cache": str(load_pickled)}})
+        self.mkcalendar("/calendar.ics/")
+        event = get_file_content("event1.ics")
+        path = "/calendar.ics/event1.ics"
+        self.put(path, event)
+        cache_path = os.path.join(self.colpath, "collection-root",
+                                  "calendar.ics", ".Radicale.cache", "item",
+                                  "event1.ics")
+        with open(cache_path, "rb") as f:
+            fields = records.loads(f.read(), records.ITEM, b"ssssssii")
+        # Mark the text to recognize the entry
+        fields[3] = cast(str, fields[3]).replace("SUMMARY:Event",
+                                                 "SUMMARY:Pickled")
+        with open(cache_path, "wb") as f:
+            pickle.dump(tuple(fields), f)
+        _, answer = self.get(path)
+        assert ("SUMMARY:Pickled" in answer) is load_pickled
+        with open(cache_path, "rb") as f:
+            assert records.is_record(f.read())
+
+    def test_item_meta_index(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Verify that etags are answered from the metadata index without
+        reading the item files and that the text of items is loaded only
+        when needed."""
+        self.configure({"storage": {"use_item_meta_index": "True"}})
+        self.mkcalendar("/calendar.ics/")
+        for uid in ("event1", "event2"):
+            self.put("/calendar.ics/%s.ics" % uid,
+                     get_file_content("%s.ics" % uid))
+        propfind = """\
+<?xml version="1.0" encoding="utf-8"?>
+<propfind xmlns="DAV:">
+  <prop>
+    <getetag />
+  </prop>
+</propfind>"""
+        _, responses = self.propfind("/calendar.ics/", propfind, HTTP_DEPTH="1")
+        loaded = []
+        load_item_cache = multifilesystem.Collection._load_item_cache
+
+        def counting_load_item_cache(collection: multifilesystem.Collection,
+                                     href: str, cache_hash: str):
+            loaded.append(href)
+            return load_item_cache(collection, href, cache_hash)
+        opened = []
+
+        def counting_open(path, *args, **kwargs):
+            opened.append(os.path.basename(path))
+            return open(path, *args, **kwargs)
+        Collection = multifilesystem.Collection
+        Collection._load_item_cache = counting_load_item_cache  # type: ignore
+        try:
+            monkeypatch.setattr(get, "open", counting_open, raising=False)
+            _, responses2 = self.propfind("/calendar.ics/", propfind,
+                                          HTTP_DEPTH="1")
+            monkeypatch.undo()
+            assert not loaded
+            assert not opened
+            _, answer = self.get("/calendar.ics/event1.ics")
+            assert loaded == ["event1.ics"]
+        finally:
+            Collection._load_item_cache = load_item_cache  # type: ignore
+        assert "UID:event1" in answer
+        for path in ("/calendar.ics/event1.ics", "/calendar.ics/event2.ics"):
+            response, response2 = responses[path], responses2[path]
+            assert not isinstance(response, int)
+            assert not isinstance(response2, int)
+            assert response["D:getetag"][1].text == (
+                response2["D:getetag"][1].text)
+        # The text is loaded from the item for filtering if the 'item' cache
+        # was cleaned
+        cache_folder = os.path.join(self.colpath, "collection-root",
+                                    "calendar.ics", ".Radicale.cache", "item")
+        os.remove(os.path.join(cache_folder, "event2.ics"))
+        _, responses = self.report("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8" ?>
+<C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+    <D:prop>
+        <D:getetag/>
+    </D:prop>
+    <C:filter>
+        <C:comp-filter name="VCALENDAR">
+            <C:comp-filter name="VEVENT">
+                <C:prop-filter name="UID">
+                    <C:text-match>event2</C:text-match>
+                </C:prop-filter>
+            </C:comp-filter>
+        </C:comp-filter>
+    </C:filter>
+</C:calendar-query>""")
+        assert responses is not None
+        assert list(responses) == ["/calendar.ics/event2.ics"]
+
+    def test_item_cache_corrupted(self) -> None:
+        """Verify that corrupted item cache entries are rebuild."""
+        self.mkcalendar("/calendar.ics/")
+        event = get_file_content("event1.ics")
+        path = "/calendar.ics/event1.ics"
+        self.put(path, event)
+        cache_path = os.path.join(self.colpath, "collection-root",
+                                  "calendar.ics", ".Radicale.cache", "item",
+                                  "event1.ics")
+        with open(cache_path, "rb") as f:
+            data = bytearray(f.read())
+        data[-10] ^= 0xff
+        with open(cache_path, "wb") as f:
+            f.write(data)
+        with pytest.raises(ValueError, match="checksum"):
+            records.loads(bytes(data), records.ITEM)
+        _, answer = self.get(path)
+        assert "SUMMARY:Event" in answer
+        with open(cache_path, "rb") as f:
+            records.loads(f.read(), records.ITEM, b"ssssssii")
+
+    @pytest.mark.parametrize("processes", [0, 2])
+    def test_warm_cache(self, processes: int) -> None:
+        """Delete the item cache and verify that it is filled by warming."""
+        self.configure({"storage": {"skip_broken_item": "False"}})
+        self.mkcalendar("/calendar.ics/")
+        self.mkcalendar("/calendar2.ics/")
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        self.put("/calendar2.ics/event2.ics", get_file_content("event2.ics"))
+        cache_folders = [os.path.join(self.colpath, "collection-root", name,
+                                      ".Radicale.cache", "item")
+                         for name in ("calendar.ics", "calendar2.ics")]
+        for cache_folder in cache_folders:
+            shutil.rmtree(cache_folder)
+        assert self.application._storage.warm_cache(processes)
+        assert os.path.exists(os.path.join(cache_folders[0], "event1.ics"))
+        assert os.path.exists(os.path.join(cache_folders[1], "event2.ics"))
+        with open(os.path.join(self.colpath, "collection-root",
+                               "calendar.ics", "broken.ics"), "w") as f:
+            f.write("BEGIN:VCALENDAR\n")
+        assert not self.application._storage.warm_cache(processes)
+
+    def test_warm_cache_background(self) -> None:
+        """Verify that the item cache is filled in the background."""
+        self.mkcalendar("/calendar.ics/")
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        cache_folder = os.path.join(self.colpath, "collection-root",
+                                    "calendar.ics", ".Radicale.cache", "item")
+        shutil.rmtree(cache_folder)
+        self.application._storage.start_cache_warmer().join()
+        assert os.path.exists(os.path.join(cache_folder, "event1.ics"))
+
+    @pytest.mark.parametrize("processes", [0, 2])
+    def test_verify(self, processes: int) -> None:
+        """Verify the storage with and without worker processes."""
+        self.configure({"storage": {"skip_broken_item": "False"}})
+        self.mkcalendar("/calendar.ics/")
+        self.mkcalendar("/calendar2.ics/")
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        self.put("/calendar2.ics/event2.ics", get_file_content("event2.ics"))
+        assert self.application._storage.verify(processes)
+        with open(os.path.join(self.colpath, "collection-root",
+                               "calendar2.ics", "broken.ics"), "w") as f:
+            f.write("BEGIN:VCALENDAR\n")
+        assert not self.application._storage.verify(processes)
+
+    def test_verify_incremental(self, caplog: pytest.LogCaptureFixture
+                                ) -> None:
+        """Verify that unchanged collections are skipped."""
+        self.configure({"storage": {"skip_broken_item": "False"}})
+        self.mkcalendar("/calendar.ics/")
+        self.mkcalendar("/calendar2.ics/")
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        self.put("/calendar2.ics/event2.ics", get_file_content("event2.ics"))
+        storage = self.application._storage
+
+        def skipped() -> set:
+            return {record.args[0] for record in caplog.records
+                    if record.msg == "Skip unchanged %r"
+                    and isinstance(record.args, tuple)}
+        caplog.set_level(logging.INFO)
+        assert storage.verify(incremental=True)
+        assert skipped() == set()
+        caplog.clear()
+        assert storage.verify(incremental=True)
+        assert skipped() == {"", "calendar.ics", "calendar2.ics"}
+        caplog.clear()
+        self.put("/calendar2.ics/event3.ics", get_file_content("event3.ics"))
+        assert storage.verify(incremental=True)
+        assert skipped() == {"", "calendar.ics"}
+        with open(os.path.join(self.colpath, "collection-root",
+                               "calendar2.ics", "broken.ics"), "w") as f:
+            f.write("BEGIN:VCALENDAR\n")
+        caplog.clear()
+        assert not storage.verify(incremental=True)
+        caplog.clear()
+        # The broken collection is verified again
+        assert not storage.verify(incremental=True)
+        assert skipped() == {"", "calendar.ics"}
+
+    def test_index_files_records(self, monkeypatch: pytest.MonkeyPatch
+                                 ) -> None:
+        """Verify that the index files are stored as binary records."""
+        # Trust the mtime of files modified just now
+        monkeypatch.setattr(base, "LISTING_RACY_NS", 0)
+        self.configure({"storage": {"use_time_range_index": "True",
+                                    "use_uid_index": "True",
+                                    "use_ctag_cache": "True"}})
+        self.mkcalendar("/calendar.ics/")
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        self.report("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8" ?>
+<C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+    <D:prop><D:getetag /></D:prop>
+    <C:filter><C:comp-filter name="VCALENDAR"><C:comp-filter name="VEVENT">
+        <C:time-range start="20130801T000000Z" end="20131001T000000Z"/>
+    </C:comp-filter></C:comp-filter></C:filter>
+</C:calendar-query>""")
+        self.propfind("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8"?>
+<propfind xmlns="DAV:" xmlns:CS="http://calendarserver.org/ns/">
+    <prop><CS:getctag /></prop>
+</propfind>""")
+        storage = self.application._storage
+        assert isinstance(storage, multifilesystem.Storage)
+        assert storage.verify(incremental=True)
+        cache_folder = os.path.join(self.colpath, "collection-root",
+                                    "calendar.ics", ".Radicale.cache", "item")
+        for path, kind in [
+                (os.path.join(cache_folder, ".Radicale.timerange"),
+                 records.TIME_RANGE_INDEX),
+                (os.path.join(cache_folder, ".Radicale.uids"),
+                 records.UID_INDEX),
+                (os.path.join(cache_folder, ".Radicale.ctag"),
+                 records.CTAG_STATE),
+                (os.path.join(self.colpath, ".Radicale.verify"),
+                 records.VERIFY_STATE)]:
+            with open(path, "rb") as f:
+                assert records.get_kind(f.read()) == kind
+        assert {"", "calendar.ics"} <= set(
+            storage._load_verify_watermarks())
+
+    def test_item_cache_lock_per_entry(self) -> None:
+        """Verify that cache misses of different items don't block each
+        other while misses of the same item are serialized."""
+        self.mkcalendar("/calendar.ics/")
+        collection = next(iter(self.application._storage.discover(
+            "/calendar.ics/")))
+        assert isinstance(collection, multifilesystem.Collection)
+        other_href = next(
+            href for href in ("event%d.ics" % i for i in range(100))
+            if lock.cache_lock_bucket(href) !=
+            lock.cache_lock_bucket("event1.ics"))
+        acquired = []
+
+        def fill(href: str) -> None:
+            with self.application._storage.acquire_lock("r"), \
+                    collection._acquire_cache_lock("item", href):
+                acquired.append(href)
+
+        with self.application._storage.acquire_lock("r"), \
+                collection._acquire_cache_lock("item", "event1.ics"):
+            threads = [threading.Thread(target=fill, args=(href,))
+                       for href in ("event1.ics", other_href)]
+            for thread in threads:
+                thread.start()
+            threads[1].join(10)
+            assert acquired == [other_href]
+        threads[0].join(10)
+        assert acquired == [other_href, "event1.ics"]
+
+    def test_lock_granularity_principal(self) -> None:
+        """Verify that the collections of other principals are not locked
+        by a writer."""
+        self.configure({"storage": {"lock_granularity": "principal"}})
+        storage = cast(multifilesystem.Storage, self.application._storage)
+
+        def acquired(mode: str, **kwargs) -> bool:
+            done = threading.Event()
+
+            def run() -> None:
+                with storage.acquire_lock(mode, **kwargs):
+                    done.set()
+            threading.Thread(target=run, daemon=True).start()
+            return done.wait(0.2)
+        with storage.acquire_lock("w", path="/user1/calendar.ics/"):
+            assert acquired("r", path="/user2/calendar.ics/")
+            assert acquired("w", path="/user2/calendar.ics/")
+            assert acquired("r", path="/")
+            assert not acquired("r", path="/user1/")
+        with storage.acquire_lock("r", path="/user1/calendar.ics/"):
+            assert acquired("r", path="/user1/")
+            assert not acquired("w", path="/user2/", to_path="/user1/")
+            assert not acquired("w")
+        with storage.acquire_lock("r", path="/user1/",
+                                  user_groups={"group1"}):
+            assert not acquired("w", path="/GROUPS/")
+        assert storage._lock_mode("/user1/") == ""
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock() -> None:
+            with storage.acquire_lock("w", path="/GROUPS/"):
+                locked.set()
+                release.wait(10)
+        thread = threading.Thread(target=hold_lock, daemon=True)
+        thread.start()
+        assert locked.wait(10)
+        try:
+            # The lock of another thread doesn't grant exclusive access
+            with storage.acquire_lock("r", path="/user1/"):
+                assert storage._lock_mode("/user1/") == "r"
+                assert storage._lock_mode("/GROUPS/") == "r"
+        finally:
+            release.set()
+            thread.join(10)
+        with storage.acquire_lock("w", path="/user1/"):
+            assert storage._lock_mode("/user1/calendar.ics/") == "w"
+            assert storage._lock_mode("/user2/") == "r"
+        for principal in ("user1", "user2"):
+            self.mkcol("/%s/" % principal)
+            self.mkcalendar("/%s/calendar.ics/" % principal)
+        self.put("/user1/calendar.ics/event1.ics",
+                 get_file_content("event1.ics"))
+        self.request("MOVE", "/user1/calendar.ics/event1.ics", check=201,
+                     HTTP_DESTINATION="http://127.0.0.1/user2/calendar.ics/"
+                     "event1.ics")
+        self.get("/user2/calendar.ics/event1.ics")
+
+    def test_lock_statistics(self, caplog: pytest.LogCaptureFixture) -> None:
+        """Verify that wait and hold times of locks are recorded."""
+        self.configure({"logging": {"storage_lock_wait_warning": "0.05"}})
+        storage = cast(multifilesystem.Storage, self.application._storage)
+        assert storage._lock_stats is not None
+        self.mkcalendar("/calendar.ics/")
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        self.get("/calendar.ics/event1.ics")
+        wait, hold, waiters = storage._lock_stats.snapshot()
+        assert wait[("storage", "w", "PUT")].count == 1
+        assert hold[("storage", "r", "GET")].count == 1
+        assert waiters == {"storage": 0}
+        acquired = threading.Event()
+        release = threading.Event()
+
+        def hold_lock() -> None:
+            with storage.acquire_lock("w", path="/calendar.ics/",
+                                      request="DELETE"):
+                acquired.set()
+                release.wait()
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        acquired.wait()
+        threading.Timer(0.1, release.set).start()
+        with caplog.at_level(logging.WARNING):
+            with storage.acquire_lock("r", path="/calendar.ics/",
+                                      request="REPORT"):
+                pass
+        thread.join()
+        assert any("for REPORT '/calendar.ics/', held by: DELETE "
+                   "'/calendar.ics/'" in record.getMessage()
+                   for record in caplog.records)
+        with caplog.at_level(logging.INFO):
+            storage._lock_stats.log()
+        assert "storage w PUT: wait count=1" in caplog.text
+
+    def test_item_cache_rebuild_packed(self) -> None:
+        """Delete the packed item cache and verify that it is rebuild."""
+        self.configure({"storage": {"use_packed_item_cache": "True"}})
+        self.mkcalendar("/calendar.ics/")
+        event = get_file_content("event1.ics")
+        path = "/calendar.ics/event1.ics"
+        self.put(path, event)
+        _, answer1 = self.get(path)
+        cache_folder = os.path.join(self.colpath, "collection-root",
+                                    "calendar.ics", ".Radicale.cache", "item")
+        assert os.path.exists(os.path.join(cache_folder, ".Radicale.pack"))
+        assert os.path.exists(os.path.join(cache_folder, ".Radicale.index"))
+        assert not os.path.exists(os.path.join(cache_folder, "event1.ics"))
+        shutil.rmtree(cache_folder)
+        _, answer2 = self.get(path)
+        assert answer1 == answer2
+        assert os.path.exists(os.path.join(cache_folder, ".Radicale.pack"))
+
+    def test_packed_item_cache_parallel_misses(self) -> None:
+        """Fill the packed item cache from parallel cache misses and verify
+        that no entries are lost."""
+        self.configure({"storage": {"use_packed_item_cache": "True"}})
+        self.mkcalendar("/calendar.ics/")
+        event = get_file_content("event1.ics")
+        hrefs = ["event%d.ics" % i for i in range(64)]
+        for href in hrefs:
+            self.put("/calendar.ics/%s" % href,
+                     event.replace("UID:event1", "UID:%s" % href[:-4]))
+        storage = self.application._storage
+        cache_folder = os.path.join(self.colpath, "collection-root",
+                                    "calendar.ics", ".Radicale.cache", "item")
+        shutil.rmtree(cache_folder)
+
+        def fill(hrefs: List[str]) -> None:
+            # Every request uses its own collection
+            collection = next(iter(storage.discover("/calendar.ics/")))
+            assert isinstance(collection, multifilesystem.Collection)
+            with storage.acquire_lock("r"):
+                for href in hrefs:
+                    assert collection._get(href) is not None
+
+        threads = [threading.Thread(target=fill, args=(hrefs[i::8],))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        collection = next(iter(storage.discover("/calendar.ics/")))
+        assert isinstance(collection, multifilesystem.Collection)
+        packed_item_cache = collection._get_packed_item_cache()
+        for href in hrefs:
+            assert packed_item_cache.load(href) is not None
+
+    def test_packed_item_cache_move_and_delete(self) -> None:
+        """Move and delete items with packed item cache."""
+        self.configure({"storage": {"use_packed_item_cache": "True"}})
+        self.mkcalendar("/calendar1.ics/")
+        self.mkcalendar("/calendar2.ics/")
+        self.put("/calendar1.ics/event1.ics", get_file_content("event1.ics"))
+        self.request("MOVE", "/calendar1.ics/event1.ics", check=201,
+                     HTTP_DESTINATION="http://127.0.0.1/calendar2.ics/event1.ics")
+        self.get("/calendar1.ics/event1.ics", check=404)
+        _, answer = self.get("/calendar2.ics/event1.ics")
+        assert "UID:event1" in answer
+        self.delete("/calendar2.ics/event1.ics")
+        self.get("/calendar2.ics/event1.ics", check=404)
+
+    def test_packed_item_cache_compaction(self) -> None:
+        """Replace an item repeatedly and verify that the packed item cache
+        is compacted."""
+        self.configure({"storage": {"use_packed_item_cache": "True"}})
+        self.mkcalendar("/calendar.ics/")
+        event = get_file_content("event1.ics")
+        path = "/calendar.ics/event1.ics"
+        self.put(path, event)
+        pack_path = os.path.join(self.colpath, "collection-root",
+                                 "calendar.ics", ".Radicale.cache", "item",
+                                 ".Radicale.pack")
+        record_size = os.path.getsize(pack_path)
+        for i in range(300):
+            self.put(path, event.replace("SUMMARY:Event",
+                                         "SUMMARY:Event %d" % i), check=None)
+        _, answer = self.get(path)
+        assert "SUMMARY:Event 299" in answer
+        assert os.path.getsize(pack_path) < 100 * record_size
+
+    def test_item_cache_memory(self) -> None:
+        """Read an item repeatedly and verify that it is served from the
+        memory cache until the file is modified externally."""
+        self.configure({"storage": {"item_cache_memory_entries": "10"}})
+        self.mkcalendar("/calendar.ics/")
+        event = get_file_content("event1.ics")
+        path = "/calendar.ics/event1.ics"
+        self.put(path, event)
+        memory_cache = cast(multifilesystem.Storage,
+                            self.application._storage)._item_cache_memory
+        assert memory_cache is not None
+        self.get(path)
+        hits = memory_cache.hits
+        self.get(path)
+        assert memory_cache.hits > hits
+        file_path = os.path.join(self.colpath, "collection-root",
+                                 "calendar.ics", "event1.ics")
+        with open(file_path, "w", encoding="utf-8", newline="") as f:
+            f.write(event.replace("SUMMARY:Event", "SUMMARY:Changed"))
+        st = os.stat(file_path)
+        os.utime(file_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        _, answer = self.get(path)
+        assert "SUMMARY:Changed" in answer
+
+    def test_item_cache_memory_eviction(self) -> None:
+        """Verify that the memory cache is bounded."""
+        self.configure({"storage": {"item_cache_memory_entries": "1"}})
+        self.mkcalendar("/calendar.ics/")
+        for uid in ("event1", "event2"):
+            self.put("/calendar.ics/%s.ics" % uid,
+                     get_file_content("%s.ics" % uid))
+        self.get("/calendar.ics/")
+        memory_cache = cast(multifilesystem.Storage,
+                            self.application._storage)._item_cache_memory
+        assert memory_cache is not None
+        assert len(memory_cache) == 1
+        assert memory_cache.evictions > 0
+
+    def test_listing_cache(self) -> None:
+        """Verify that the listing of a collection is cached until the
+        folder is modified and that recently modified folders are not
+        cached."""
+        self.configure({"storage": {"listing_cache_entries": "10"}})
+        self.mkcalendar("/calendar.ics/")
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        listing_cache = cast(multifilesystem.Storage,
+                             self.application._storage)._listing_cache
+        assert listing_cache is not None
+        folder = os.path.join(self.colpath, "collection-root", "calendar.ics")
+        self.get("/calendar.ics/")
+        assert listing_cache.get(folder) is None
+        st = os.stat(folder)
+        os.utime(folder, ns=(st.st_atime_ns, st.st_mtime_ns - 10 * 10**9))
+        self.get("/calendar.ics/")
+        hits = listing_cache.hits
+        _, answer = self.get("/calendar.ics/")
+        assert listing_cache.hits > hits
+        assert "UID:event1" in answer and "UID:event2" not in answer
+        shutil.copy(os.path.join(os.path.dirname(__file__), "static",
+                                 "event2.ics"),
+                    os.path.join(folder, "event2.ics"))
+        os.utime(folder, ns=(st.st_atime_ns, st.st_mtime_ns - 5 * 10**9))
+        _, answer = self.get("/calendar.ics/")
+        assert "UID:event1" in answer and "UID:event2" in answer
+
+    @pytest.mark.skipif(sys.platform != "linux", reason="Linux only")
+    def test_inotify(self) -> None:
+        """Verify that in-memory caches are trusted until inotify reports
+        modifications of the collection."""
+        self.configure({"storage": {"use_inotify": "True",
+                                    "listing_cache_entries": "10",
+                                    "item_cache_memory_entries": "10"}})
+        storage = cast(multifilesystem.Storage, self.application._storage)
+        assert storage._inotify is not None
+        assert storage._listing_cache is not None
+        assert storage._item_cache_memory is not None
+        self.mkcalendar("/calendar.ics/")
+        event = get_file_content("event1.ics")
+        self.put("/calendar.ics/event1.ics", event)
+        self.get("/calendar.ics/")
+        listing_hits = storage._listing_cache.hits
+        item_hits = storage._item_cache_memory.hits
+        _, answer = self.get("/calendar.ics/")
+        assert storage._listing_cache.hits > listing_hits
+        assert storage._item_cache_memory.hits > item_hits
+        # External modifications without change of mtime
+        folder = os.path.join(self.colpath, "collection-root", "calendar.ics")
+        st = os.stat(folder)
+        file_path = os.path.join(folder, "event1.ics")
+        file_st = os.stat(file_path)
+        with open(file_path, "w", encoding="utf-8", newline="") as f:
+            f.write(event.replace("SUMMARY:Event", "SUMMARY:Other"))
+        os.utime(file_path, ns=(file_st.st_atime_ns, file_st.st_mtime_ns))
+        shutil.copy(os.path.join(os.path.dirname(__file__), "static",
+                                 "event2.ics"),
+                    os.path.join(folder, "event2.ics"))
+        with open(os.path.join(folder, ".Radicale.props"), "w") as f:
+            json.dump({"tag": "VCALENDAR", "C:calendar-description": "Test"},
+                      f)
+        os.utime(folder, ns=(st.st_atime_ns, st.st_mtime_ns))
+        _, answer = self.get("/calendar.ics/")
+        assert "SUMMARY:Other" in answer and "UID:event2" in answer
+        _, responses = self.propfind("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8"?>
+<propfind xmlns="DAV:"
+          xmlns:C="urn:ietf:params:xml:ns:caldav">
+  <prop>
+    <C:calendar-description />
+  </prop>
+</propfind>""")
+        response = responses["/calendar.ics/"]
+        assert not isinstance(response, int)
+        status, prop = response["C:calendar-description"]
+        assert status == 200 and prop.text == "Test"
+
+    def test_group_commit(self) -> None:
+        """Verify that concurrent write requests complete with group commit
+        and that their directory syncs are coalesced."""
+        self.configure({"storage": {"_filesystem_fsync": "True",
+                                    "group_commit": "True",
+                                    "group_commit_window": "0"}})
+        group_commit = cast(multifilesystem.Storage,
+                            self.application._storage)._group_commit
+        assert group_commit is not None
+        self.mkcalendar("/calendar.ics/")
+        event = get_file_content("event1.ics")
+        # Create the cache folders
+        self.put("/calendar.ics/event8.ics",
+                 event.replace("UID:event1", "UID:event8"))
+        statuses = []
+        requested = group_commit._requested
+        syncs = group_commit.syncs
+        synced: List[str] = []
+        sync_directory = group_commit._sync_directory
+
+        def blocking_sync_directory(directory: str) -> None:
+            if not synced:
+                # Block the first commit until all other PUTs wait for it
+                deadline = time.monotonic() + 10
+                while (group_commit._requested < requested + 8 and
+                       time.monotonic() < deadline):
+                    time.sleep(0.001)
+            synced.append(directory)
+            sync_directory(directory)
+        group_commit._sync_directory = blocking_sync_directory
+
+        def put(i: int) -> None:
+            status, _, _ = self.request(
+                "PUT", "/calendar.ics/event%d.ics" % i,
+                event.replace("UID:event1", "UID:event%d" % i))
+            statuses.append(status)
+        threads = [threading.Thread(target=put, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert statuses == [201] * 8
+        assert group_commit.pending is None
+        assert group_commit.commits == 10
+        # The first PUT is synced alone, the directories of the other PUTs
+        # are synced together once
+        half = len(synced) // 2
+        assert half > 0 and len(set(synced)) == half
+        assert synced[:half] == synced[half:]
+        assert group_commit.syncs == syncs + len(synced)
+        _, responses = self.report("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8" ?>
+<C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+    <D:prop><D:getetag /></D:prop>
+</C:calendar-query>""")
+        assert len(responses) == 9
+
+    def test_multiget_workers(self) -> None:
+        """Verify that items loaded in parallel are returned in the requested
+        order."""
+        self.configure({"storage": {"multiget_workers": "2"}})
+        self.mkcalendar("/calendar.ics/")
+        event = get_file_content("event1.ics")
+        for i in range(10):
+            self.put("/calendar.ics/event%d.ics" % i,
+                     event.replace("UID:event1", "UID:event%d" % i))
+        hrefs = ["event%d.ics" % i for i in (7, 2, 9, 0, 5, 3, 8)]
+        hrefs.insert(2, "missing.ics")
+        hrefs.insert(4, ".Radicale.props")
+        collection = next(iter(self.application._storage.discover(
+            "/calendar.ics/")))
+        assert isinstance(collection, multifilesystem.Collection)
+        results = list(collection.get_multi(hrefs))
+        assert [href for href, _ in results] == hrefs
+        for href, item in results:
+            if href in ("missing.ics", ".Radicale.props"):
+                assert item is None
+            else:
+                assert item is not None and item.href == href
+        # Stop early
+        for href, item in collection.get_multi(hrefs):
+            break
+        assert item is not None and item.href == hrefs[0]
+        _, responses = self.report("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8" ?>
+<C:calendar-multiget xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+    <D:prop><D:getetag /></D:prop>
+%s
+</C:calendar-multiget>""" % "\n".join(
+            "    <D:href>/calendar.ics/%s</D:href>" % href for href in hrefs))
+        assert responses["/calendar.ics/missing.ics"] == 404
+        assert all(isinstance(responses["/calendar.ics/" + href], dict)
+                   for href in hrefs if href.startswith("event"))
+
+    def test_multiget_workers_cold_cache(
+            self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Verify that items requested more than once in a parallel
+        multi-get are only parsed once with an empty item cache."""
+        self.configure({"storage": {"multiget_workers": "4"}})
+        self.mkcalendar("/calendar.ics/")
+        event = get_file_content("event1.ics")
+        for i in range(5):
+            self.put("/calendar.ics/event%d.ics" % i,
+                     event.replace("UID:event1", "UID:event%d" % i))
+        collection = next(iter(self.application._storage.discover(
+            "/calendar.ics/")))
+        assert isinstance(collection, multifilesystem.Collection)
+        shutil.rmtree(os.path.join(self.colpath, "collection-root",
+                                   "calendar.ics", ".Radicale.cache"))
+        stored = []
+        store_item_cache = collection._store_item_cache
+
+        def counting_store_item_cache(href, item, cache_hash):
+            stored.append(href)
+            # Give the other workers time to wait for the entry lock
+            time.sleep(0.05)
+            return store_item_cache(href, item, cache_hash)
+        monkeypatch.setattr(collection, "_store_item_cache",
+                            counting_store_item_cache)
+        hrefs = ["event%d.ics" % (i // 4) for i in range(20)]
+        with self.application._storage.acquire_lock("r"):
+            results = list(collection.get_multi(hrefs))
+        assert [href for href, _ in results] == hrefs
+        assert all(item is not None for _, item in results)
+        assert sorted(stored) == ["event%d.ics" % i for i in range(5)]
+
+    def test_uid_index(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Verify that the UID index is kept up to date by PUT, DELETE and
+        MOVE and rebuilt after the file system was edited externally."""
+        # Trust the mtime of files modified just now
+        monkeypatch.setattr(base, "LISTING_RACY_NS", 0)
+        self.configure({"storage": {"use_uid_index": "True"}})
+        self.put("/calendar.ics/", get_file_content("event_multiple.ics"))
+        self.mkcalendar("/calendar2.ics/")
+        collection = next(iter(self.application._storage.discover(
+            "/calendar.ics/")))
+        collection2 = next(iter(self.application._storage.discover(
+            "/calendar2.ics/")))
+        assert isinstance(collection, multifilesystem.Collection)
+        assert isinstance(collection2, multifilesystem.Collection)
+        # Created together with the collection
+        assert collection._load_uid_index() is not None
+        assert collection.has_uid("event") and collection.has_uid("todo")
+        assert not collection.has_uid("event1")
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        status, _ = self.put("/calendar.ics/event1-duplicate.ics",
+                             get_file_content("event1.ics"), check=None)
+        assert status in (403, 409)
+        self.delete("/calendar.ics/event.ics")
+        self.request("MOVE", "/calendar.ics/event1.ics", check=201,
+                     HTTP_DESTINATION="http://127.0.0.1/calendar2.ics/e.ics")
+        uid_index = collection._load_uid_index()
+        uid_index2 = collection2._load_uid_index()
+        assert uid_index is not None and uid_index2 is not None
+        assert set(uid_index.uids) == {"todo"}
+        assert set(uid_index2.uids) == {"event1"}
+        # Edit in place without modifying the collection folder
+        file_path = os.path.join(self.colpath, "collection-root",
+                                 "calendar.ics", "todo.ics")
+        with open(file_path, "r+", encoding="utf-8", newline="") as f:
+            text = f.read()
+            f.seek(0)
+            f.write(text.replace("UID:todo", "UID:tod2"))
+        assert collection._load_uid_index() is None
+        assert not collection.has_uid("todo")
+        assert collection.has_uid("tod2")
+        os.remove(file_path)
+        assert collection._load_uid_index() is None
+        assert not collection.has_uid("tod2")
+
+    def test_ctag_cache(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Verify that the incrementally updated ctag matches the ctag
+        calculated from all items and follows external modifications."""
+        # Trust the mtime of files modified just now
+        monkeypatch.setattr(base, "LISTING_RACY_NS", 0)
+        self.configure({"storage": {"use_ctag_cache": "True"}})
+        self.put("/calendar.ics/", get_file_content("event_multiple.ics"))
+        self.mkcalendar("/calendar2.ics/")
+        storage = self.application._storage
+
+        def check(path: str) -> str:
+            collection = next(iter(storage.discover(path)))
+            assert isinstance(collection, multifilesystem.Collection)
+            state = collection._load_ctag_state()
+            assert state is not None
+            etag = collection.etag
+            os.remove(collection._ctag_path)
+            assert collection._load_ctag_state() is None
+            rebuilt_collection = next(iter(storage.discover(path)))
+            assert rebuilt_collection.etag == etag
+            return etag
+
+        # Created on first access for collections without items
+        assert next(iter(storage.discover("/calendar2.ics/"))).etag
+        etags = {check("/calendar.ics/"), check("/calendar2.ics/")}
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        etags.add(check("/calendar.ics/"))
+        self.put("/calendar.ics/event1.ics", get_file_content(
+            "event1.ics").replace("SUMMARY:Event", "SUMMARY:Changed"),
+            check=204)
+        etags.add(check("/calendar.ics/"))
+        self.delete("/calendar.ics/event.ics")
+        etags.add(check("/calendar.ics/"))
+        self.request("MOVE", "/calendar.ics/event1.ics", check=201,
+                     HTTP_DESTINATION="http://127.0.0.1/calendar2.ics/e.ics")
+        etags.add(check("/calendar.ics/"))
+        etags.add(check("/calendar2.ics/"))
+        self.proppatch("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8"?>
+<propertyupdate xmlns="DAV:">
+  <set>
+    <prop>
+      <displayname>Changed</displayname>
+    </prop>
+  </set>
+</propertyupdate>""")
+        etags.add(check("/calendar.ics/"))
+        assert len(etags) == 8
+        os.remove(os.path.join(self.colpath, "collection-root",
+                               "calendar.ics", "todo.ics"))
+        collection = next(iter(storage.discover("/calendar.ics/")))
+        assert isinstance(collection, multifilesystem.Collection)
+        assert collection._load_ctag_state() is None
+        assert collection.etag not in etags
+
+    def test_ctag_cache_last_modified(
+            self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Verify that the last modification time of collections is taken
+        from the ctag cache and matches the one calculated from all
+        items."""
+        monkeypatch.setattr(base, "LISTING_RACY_NS", 0)
+        self.configure({"storage": {"use_ctag_cache": "True"}})
+        self.put("/calendar.ics/", get_file_content("event_multiple.ics"))
+        storage = cast(multifilesystem.Storage, self.application._storage)
+        # Modification time in the future, found when the cache is rebuilt
+        file_path = os.path.join(self.colpath, "collection-root",
+                                 "calendar.ics", "todo.ics")
+        future = int(time.time()) + 3600
+        os.utime(file_path, (future, future))
+        collection = next(iter(storage.discover("/calendar.ics/")))
+        assert isinstance(collection, multifilesystem.Collection)
+        os.remove(collection._ctag_path)
+
+        def check() -> str:
+            collection = next(iter(storage.discover("/calendar.ics/")))
+            assert isinstance(collection, multifilesystem.Collection)
+            last_modified = collection.last_modified
+            assert collection._load_ctag_state() is not None
+            storage._use_ctag_cache = False
+            try:
+                assert collection.last_modified == last_modified
+            finally:
+                storage._use_ctag_cache = True
+            return last_modified
+
+        last_modified = check()
+        assert last_modified == time.strftime(
+            "%a, %d %b %Y %H:%M:%S GMT", time.gmtime(future))
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        assert check() == last_modified
+        # External modification of the collection folder
+        os.remove(file_path)
+        assert check() != last_modified
+
+    def test_ctag_cache_edit_in_place(self) -> None:
+        """Verify that the ctag changes if an item file is edited in place
+        without modifying the collection folder."""
+        self.configure({"storage": {"use_ctag_cache": "True"}})
+        self.mkcalendar("/calendar.ics/")
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        folder = os.path.join(self.colpath, "collection-root", "calendar.ics")
+        file_path = os.path.join(folder, "event1.ics")
+        past_ns = time.time_ns() - 10 * 10**9
+        for name in (*os.listdir(folder), ""):
+            os.utime(os.path.join(folder, name), ns=(past_ns, past_ns))
+        storage = self.application._storage
+
+        def getctag() -> str:
+            _, responses = self.propfind("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8"?>
+<propfind xmlns="DAV:" xmlns:CS="http://calendarserver.org/ns/">
+  <prop>
+    <CS:getctag />
+  </prop>
+</propfind>""")
+            response = responses["/calendar.ics/"]
+            assert not isinstance(response, int)
+            status, prop = response["CS:getctag"]
+            assert status == 200 and prop.text
+            return prop.text
+
+        def cached() -> bool:
+            collection = next(iter(storage.discover("/calendar.ics/")))
+            assert isinstance(collection, multifilesystem.Collection)
+            return collection._load_ctag_state() is not None
+
+        ctag = getctag()
+        assert cached()
+        with open(file_path, "r+", encoding="utf-8", newline="") as f:
+            text = f.read()
+            f.seek(0)
+            f.write(text.replace("SUMMARY:Event", "SUMMARY:Evenx"))
+        # Recently modified files are not trusted
+        assert not cached()
+        os.utime(file_path, ns=(past_ns, past_ns + 10**9))
+        assert os.stat(folder).st_mtime_ns == past_ns
+        assert not cached()
+        new_ctag = getctag()
+        assert new_ctag != ctag
+        assert cached()
+        assert getctag() == new_ctag
+
+    def test_sync_journal(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Verify that the sync journal records changes and follows
+        external modifications."""
+        # Trust the mtime of files modified just now
+        monkeypatch.setattr(base, "LISTING_RACY_NS", 0)
+        self.configure({"storage": {"use_sync_journal": "True"}})
+        calendar_path = "/calendar.ics/"
+        self.mkcalendar(calendar_path)
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        sync_token, responses = _TestBaseRequests._report_sync_token(
+            cast(_TestBaseRequests, self), calendar_path)
+        assert set(responses) == {"/calendar.ics/event1.ics"}
+        journal_path = os.path.join(
+            self.colpath, "collection-root", "calendar.ics",
+            ".Radicale.cache", "sync-token", ".Radicale.journal")
+        journal_size = os.path.getsize(journal_path)
+        new_sync_token, responses = _TestBaseRequests._report_sync_token(
+            cast(_TestBaseRequests, self), calendar_path, sync_token)
+        assert new_sync_token == sync_token and not responses
+        assert os.path.getsize(journal_path) == journal_size
+        self.put("/calendar.ics/event2.ics", get_file_content("event2.ics"))
+        sync_token, responses = _TestBaseRequests._report_sync_token(
+            cast(_TestBaseRequests, self), calendar_path, sync_token)
+        assert responses == {"/calendar.ics/event2.ics": 200}
+        # Modify the collection externally
+        collection_path = os.path.dirname(os.path.dirname(
+            os.path.dirname(journal_path)))
+        os.remove(os.path.join(collection_path, "event1.ics"))
+        with open(os.path.join(collection_path, "event3.ics"), "w",
+                  encoding="utf-8", newline="") as f:
+            f.write(get_file_content("event3.ics"))
+        sync_token, responses = _TestBaseRequests._report_sync_token(
+            cast(_TestBaseRequests, self), calendar_path, sync_token)
+        assert responses == {"/calendar.ics/event1.ics": 404,
+                             "/calendar.ics/event3.ics": 200}
+        # Edit in place without modifying the collection folder
+        with open(os.path.join(collection_path, "event2.ics"), "r+",
+                  encoding="utf-8", newline="") as f:
+            text = f.read()
+            f.seek(0)
+            f.write(text.replace("SUMMARY:Event", "SUMMARY:Evenx"))
+        sync_token, responses = _TestBaseRequests._report_sync_token(
+            cast(_TestBaseRequests, self), calendar_path, sync_token)
+        assert responses == {"/calendar.ics/event2.ics": 200}
+        # Tokens of other journals are invalid
+        os.remove(journal_path)
+        sync_token, responses = _TestBaseRequests._report_sync_token(
+            cast(_TestBaseRequests, self), calendar_path, sync_token)
+        assert not sync_token and not responses
+
+    def test_sync_token_state_delta(self) -> None:
+        """Verify that sync token states are stored as deltas and that
+        states in the old format are still accepted."""
+        calendar_path = "/calendar.ics/"
+        self.mkcalendar(calendar_path)
+        event = get_file_content("event1.ics")
+        for i in range(8):
+            self.put("/calendar.ics/event%d.ics" % i,
+                     event.replace("UID:event1", "UID:event%d" % i))
+        sync_token, responses = _TestBaseRequests._report_sync_token(
+            cast(_TestBaseRequests, self), calendar_path)
+        assert len(responses) == 8
+        token_folder = os.path.join(self.colpath, "collection-root",
+                                    "calendar.ics", ".Radicale.cache",
+                                    "sync-token")
+        full_path = os.path.join(token_folder, sync_token.split("/")[-1])
+        with open(full_path, "rb") as f:
+            assert records.get_kind(f.read()) == records.TOKEN_STATE_FULL
+        self.delete("/calendar.ics/event0.ics")
+        sync_token, responses = _TestBaseRequests._report_sync_token(
+            cast(_TestBaseRequests, self), calendar_path, sync_token)
+        assert responses == {"/calendar.ics/event0.ics": 404}
+        delta_path = os.path.join(token_folder, sync_token.split("/")[-1])
+        with open(delta_path, "rb") as f:
+            assert records.get_kind(f.read()) == records.TOKEN_STATE_DELTA
+        assert os.path.getsize(delta_path) < os.path.getsize(full_path)
+        # Convert the full state to the old format
+        collection = next(iter(self.application._storage.discover(
+            calendar_path)))
+        assert isinstance(collection, multifilesystem.Collection)
+        state, _ = collection._load_token_state(
+            token_folder, os.path.basename(full_path))
+        with open(full_path, "wb") as f:
+            pickle.dump(state, f)
+        self.put("/calendar.ics/event1.ics", event.replace(
+            "SUMMARY:Event", "SUMMARY:Changed"), check=204)
+        sync_token, responses = _TestBaseRequests._report_sync_token(
+            cast(_TestBaseRequests, self), calendar_path, sync_token)
+        assert responses == {"/calendar.ics/event1.ics": 200}
+
     def test_put_whole_calendar_uids_used_as_file_names(self) -> None:
         """Test if UIDs are used as file names."""
         _TestBaseRequests.test_put_whole_calendar(
@@ -470,3 +1444,135 @@ class TestCustomStorageSystemCallable(BaseTest):
             "type": radicale.tests.custom.storage_simple_sync.Storage}})
 
     test_add_event = _TestBaseRequests.test_add_event
+
+
+class TestCustomStorageSystemNoProjection(BaseTest):
+    """Test custom backend without support for ``projection``."""
+
+    def setup_method(self) -> None:
+        _TestBaseRequests.setup_method(cast(_TestBaseRequests, self))
+        self.configure({"storage": {
+            "type": "radicale.tests.custom.storage_no_projection"}})
+
+    test_add_event = _TestBaseRequests.test_add_event
+    test_propfind_allprop = _TestBaseRequests.test_propfind_allprop
+    _test_filter = _TestBaseRequests._test_filter
+    test_time_range_filter_events = (
+        _TestBaseRequests.test_time_range_filter_events)
+    test_report_item = _TestBaseRequests.test_report_item
+    test_report_free_busy = _TestBaseRequests.test_report_free_busy
+
+    def test_verify_command_line(self) -> None:
+        """Verify the storage from the command line with a plugin that
+        doesn't accept the arguments of ``verify``."""
+        self.mkcalendar("/calendar.ics/")
+        self.put("/calendar.ics/event1.ics", get_file_content("event1.ics"))
+        config_path = os.path.join(self.colpath, "config")
+        parser = RawConfigParser()
+        parser.read_dict(configuration_to_dict(self.configuration))
+        with open(config_path, "w") as f:
+            parser.write(f)
+        p = subprocess.run(
+            [sys.executable, "-m", "radicale", "--config", config_path,
+             "--verify-storage", "--verify-storage-incremental"],
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)})
+        assert p.returncode == 0
+
+
+class TestMultiFileSystemTimeRangeIndex(_TestBaseRequests):
+    """Tests for multifilesystem with time range index."""
+
+    def setup_method(self) -> None:
+        _TestBaseRequests.setup_method(self)
+        self.configure({"storage": {"type": "multifilesystem",
+                                    "use_time_range_index": "True"}})
+
+    def test_time_range_index_external_edit(self) -> None:
+        """Verify that the time range index is updated after the file
+        system was edited externally."""
+        self.test_time_range_filter_events()
+        collection_path = os.path.join(self.colpath, "collection-root",
+                                       "calendar.ics")
+        index = TimeRangeIndex(os.path.join(collection_path,
+                                            ".Radicale.cache", "item"))
+        index.load()
+        assert set(index.entries) == set(
+            name for name in os.listdir(collection_path)
+            if not name.startswith("."))
+        href = sorted(index.entries)[0]
+        os.remove(os.path.join(collection_path, href))
+        _, responses = self.report("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8" ?>
+<C:calendar-query xmlns:C="urn:ietf:params:xml:ns:caldav">
+    <D:prop xmlns:D="DAV:">
+        <D:getetag/>
+    </D:prop>
+    <C:filter>
+        <C:comp-filter name="VCALENDAR">
+            <C:comp-filter name="VEVENT">
+                <C:time-range start="20130801T000000Z"/>
+            </C:comp-filter>
+        </C:comp-filter>
+    </C:filter>
+</C:calendar-query>""")
+        assert responses is not None
+        assert "/calendar.ics/" + href not in responses
+        index.load()
+        assert href not in index.entries
+
+
+class TestSQLite(_TestBaseRequests):
+    """Tests for sqlite."""
+
+    def setup_method(self) -> None:
+        _TestBaseRequests.setup_method(self)
+        self.configure({"storage": {"type": "sqlite"}})
+
+    def test_projection(self) -> None:
+        """Verify that the text of items is only loaded if the request
+        needs it."""
+        self.mkcalendar("/calendar.ics/")
+        for uid in ("event1", "event2"):
+            self.put("/calendar.ics/%s.ics" % uid,
+                     get_file_content("%s.ics" % uid))
+        loaded = []
+        load_text = sqlite.Collection._load_text
+
+        def counting_load_text(collection: sqlite.Collection, href: str,
+                               etag: str) -> str:
+            loaded.append(href)
+            return load_text(collection, href, etag)
+        Collection = sqlite.Collection
+        Collection._load_text = counting_load_text  # type: ignore
+        try:
+            _, responses = self.propfind("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8"?>
+<propfind xmlns="DAV:">
+  <prop>
+    <getetag />
+    <getcontenttype />
+  </prop>
+</propfind>""", HTTP_DEPTH="1")
+            assert len(responses) == 3
+            _, responses = self.report("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8" ?>
+<D:sync-collection xmlns:D="DAV:">
+    <D:sync-token />
+    <D:prop>
+        <D:getetag />
+    </D:prop>
+</D:sync-collection>""")
+            assert len(responses) == 2
+            assert not loaded
+            # The text is selected together with the other fields
+            _, responses = self.propfind("/calendar.ics/", """\
+<?xml version="1.0" encoding="utf-8"?>
+<propfind xmlns="DAV:">
+  <prop>
+    <getcontentlength />
+  </prop>
+</propfind>""", HTTP_DEPTH="1")
+            assert len(responses) == 3
+            assert not loaded
+        finally:
+            Collection._load_text = load_text  # type: ignore
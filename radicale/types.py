@@ -16,12 +16,12 @@
 # along with Radicale.  If not, see <http://www.gnu.org/licenses/>.
 
 import contextlib
-from typing import (Any, Callable, ContextManager, Iterator, List, Mapping,
-                    MutableMapping, Protocol, Sequence, Tuple, TypeVar, Union,
-                    runtime_checkable)
+from typing import (Any, Callable, ContextManager, Iterable, Iterator, List,
+                    Mapping, MutableMapping, Protocol, Sequence, Tuple,
+                    TypeVar, Union, runtime_checkable)
 
 WSGIResponseHeaders = Union[Mapping[str, str], Sequence[Tuple[str, str]]]
-WSGIResponse = Tuple[int, WSGIResponseHeaders, Union[None, str, bytes], Union[None, str]]
+WSGIResponse = Tuple[int, WSGIResponseHeaders, Union[None, str, bytes, Iterable[bytes]], Union[None, str]]
 WSGIEnviron = Mapping[str, Any]
 WSGIStartResponse = Callable[[str, List[Tuple[str, str]]], Any]
 
@@ -27,7 +27,7 @@ import copy
 import xml.etree.ElementTree as ET
 from collections import OrderedDict
 from http import client
-from typing import Dict, Mapping, Optional, Union
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Union
 from urllib.parse import quote
 
 from radicale import item, pathutils
@@ -141,6 +141,31 @@ def webdav_error(human_tag: str) -> ET.Element:
     return root
 
 
+def iter_multistatus(elements: Iterable[ET.Element], encoding: str,
+                     chunk_size: int = 65536) -> Iterator[bytes]:
+    """Serialize a ``D:multistatus`` element with the children ``elements``
+    as XML document in chunks of about ``chunk_size`` bytes.
+
+    ``elements`` are consumed while the document is serialized.
+
+    """
+    start, end = ET.tostring(ET.Element(make_clark("D:multistatus")),
+                             "unicode", short_empty_elements=False
+                             ).split("></", 1)
+    chunk = ["<?xml version='1.0' encoding='%s'?>\n%s>" % (encoding, start)]
+    size = 0
+    for element in elements:
+        text = ET.tostring(element, "unicode")
+        chunk.append(text)
+        size += len(text)
+        if size >= chunk_size:
+            yield "".join(chunk).encode(encoding, "xmlcharrefreplace")
+            chunk.clear()
+            size = 0
+    chunk.append("</%s" % end)
+    yield "".join(chunk).encode(encoding, "xmlcharrefreplace")
+
+
 def get_content_type(item: "item.Item", encoding: str) -> str:
     """Get the content-type of an item with charset and component parameters.
     """